@@ -0,0 +1,143 @@
+"""Vectorized attendance analytics.
+
+``load_attendance(db)`` pulls Attendance joined to Students.batch in one query
+and packs it into a students × dates ``int8`` matrix (1 present, 0 absent,
+-1 no record). Everything else – rates, rolling windows, weekly trends and
+absence streaks – is computed with NumPy on that matrix. Date columns are the
+days that have at least one record, so windows count class days rather than
+calendar days.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+PRESENT, ABSENT, NO_RECORD = 1, 0, -1
+
+
+@dataclass
+class AttendanceMatrix:
+    student_ids: np.ndarray   # (students,) int64
+    names: List[str]          # (students,)
+    batches: np.ndarray       # (students,) object – batch name or ''
+    dates: np.ndarray         # (dates,) datetime64[D], ascending
+    values: np.ndarray        # (students, dates) int8
+
+    @property
+    def empty(self) -> bool:
+        return self.values.size == 0
+
+    @property
+    def present(self) -> np.ndarray:
+        return self.values == PRESENT
+
+    @property
+    def marked(self) -> np.ndarray:
+        return self.values != NO_RECORD
+
+    def student_rates(self) -> np.ndarray:
+        """Attendance rate per student (nan for students with no records)."""
+        return _rate(self.present.sum(axis=1), self.marked.sum(axis=1))
+
+    def daily_rates(self) -> np.ndarray:
+        """Attendance rate per date across everyone marked that day."""
+        return _rate(self.present.sum(axis=0), self.marked.sum(axis=0))
+
+    def batch_daily_rates(self) -> Tuple[List[str], np.ndarray]:
+        """(batches, batches × dates rate matrix) – nan where a batch had no class."""
+        names, rows = np.unique(self.batches.astype(str), return_inverse=True)
+        present = np.zeros((len(names), len(self.dates)))
+        marked = np.zeros_like(present)
+        np.add.at(present, rows, self.present)
+        np.add.at(marked, rows, self.marked)
+        return [str(n) for n in names], _rate(present, marked)
+
+    def rolling_rates(self, window: int = 7) -> np.ndarray:
+        """Overall attendance rate over the trailing *window* class days, per date."""
+        present = _rolling_sum(self.present.sum(axis=0), window)
+        marked = _rolling_sum(self.marked.sum(axis=0), window)
+        return _rate(present, marked)
+
+    def weekly_trend(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(week start Mondays, attendance rate per week)."""
+        if not len(self.dates):
+            return self.dates, np.zeros(0)
+        # datetime64 day 0 (1970-01-01) was a Thursday, hence the +3
+        mondays = self.dates - ((self.dates.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+        weeks, idx = np.unique(mondays, return_inverse=True)
+        present = np.bincount(idx, weights=self.present.sum(axis=0), minlength=len(weeks))
+        marked = np.bincount(idx, weights=self.marked.sum(axis=0), minlength=len(weeks))
+        return weeks, _rate(present, marked)
+
+    def absence_streaks(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(current, longest) run of consecutive absences per student.
+
+        Days without a record neither extend nor break a run.
+        """
+        if self.empty:
+            n = len(self.student_ids)
+            return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+        absences = np.cumsum(self.values == ABSENT, axis=1)
+        # absence count at the most recent present day, carried forward
+        last_present = np.maximum.accumulate(np.where(self.present, absences, 0), axis=1)
+        runs = absences - last_present
+        return runs[:, -1], runs.max(axis=1)
+
+    def chronic_absentees(self, threshold: float = 0.75, min_days: int = 5) -> List[Tuple]:
+        """Students below *threshold* attendance with at least *min_days* records.
+
+        Returns (student_id, name, batch, rate, days marked, current streak,
+        longest streak), lowest rate first.
+        """
+        rates = self.student_rates()
+        marked = self.marked.sum(axis=1)
+        current, longest = self.absence_streaks()
+        hits = np.flatnonzero((marked >= min_days) & (rates < threshold))
+        hits = hits[np.argsort(rates[hits], kind="stable")]
+        return [
+            (int(self.student_ids[i]), self.names[i], self.batches[i], float(rates[i]),
+             int(marked[i]), int(current[i]), int(longest[i]))
+            for i in hits
+        ]
+
+
+def build_matrix(records) -> AttendanceMatrix:
+    """Pack ``Database.attendance_records`` rows into an ``AttendanceMatrix``."""
+    if not records:
+        return AttendanceMatrix(
+            np.zeros(0, dtype=np.int64), [], np.zeros(0, dtype=object),
+            np.zeros(0, dtype="datetime64[D]"), np.zeros((0, 0), dtype=np.int8),
+        )
+    sids, names, batches, dates, present = zip(*records)
+    student_ids, first, rows = np.unique(np.asarray(sids, dtype=np.int64), return_index=True, return_inverse=True)
+    days, cols = np.unique(np.asarray(dates, dtype="datetime64[D]"), return_inverse=True)
+    values = np.full((len(student_ids), len(days)), NO_RECORD, dtype=np.int8)
+    values[rows, cols] = np.asarray(present, dtype=np.int8)
+    return AttendanceMatrix(
+        student_ids=student_ids,
+        names=[names[i] or "" for i in first],
+        batches=np.array([batches[i] or "" for i in first], dtype=object),
+        dates=days,
+        values=values,
+    )
+
+
+def load_attendance(db, batch: Optional[str] = None, start: Optional[str] = None,
+                    end: Optional[str] = None) -> AttendanceMatrix:
+    return build_matrix(db.attendance_records(batch=batch, start=start, end=end))
+
+
+def _rate(present, marked) -> np.ndarray:
+    present = np.asarray(present, dtype=np.float64)
+    marked = np.asarray(marked, dtype=np.float64)
+    out = np.full(np.broadcast(present, marked).shape, np.nan)
+    np.divide(present, marked, out=out, where=marked > 0)
+    return out
+
+
+def _rolling_sum(a: np.ndarray, window: int) -> np.ndarray:
+    # trailing sum over the last axis; the first window-1 entries use what is available
+    c = np.cumsum(a, axis=-1, dtype=np.float64)
+    out = c.copy()
+    out[..., window:] -= c[..., :-window]
+    return out
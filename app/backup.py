@@ -0,0 +1,139 @@
+"""Online backups of the tuition database.
+
+Snapshots are taken with SQLite's backup API (``Database.backup_to``), so the
+app can keep writing while a copy is made. Each snapshot is written to a
+``.part`` file, integrity-checked, then renamed to
+``<dir>/app-YYYYmmdd-HHMMSS.db``; older snapshots beyond ``keep`` are removed.
+Restores verify the snapshot and take a safety snapshot of the current data
+before overwriting it.
+"""
+import datetime
+import os
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from app import migrations
+from app.config import BACKUP_SETTINGS
+
+PREFIX = "app-"
+SUFFIX = ".db"
+
+
+class BackupError(Exception):
+    pass
+
+
+@dataclass
+class Snapshot:
+    path: str
+    size: int
+    created: datetime.datetime
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.path)
+
+
+def verify(path: str) -> List[str]:
+    """Problems found in the database at *path*; an empty list means it is sound."""
+    if not os.path.isfile(path):
+        return [f"{path} does not exist"]
+    try:
+        con = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        return [str(e)]
+    try:
+        rows = [r[0] for r in con.execute("PRAGMA integrity_check")]
+        problems = [] if rows == ["ok"] else rows
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        if version > migrations.LATEST_VERSION:
+            problems.append(f"schema version {version} is newer than this app ({migrations.LATEST_VERSION})")
+        tables = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        if not {"Admin", "Students"} <= tables:
+            problems.append("not a tuition database (Admin/Students tables missing)")
+        return problems
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        con.close()
+
+
+def list_snapshots(directory: Optional[str] = None) -> List[Snapshot]:
+    """Snapshots in *directory*, newest first."""
+    directory = directory or BACKUP_SETTINGS["dir"]
+    if not os.path.isdir(directory):
+        return []
+    snaps = []
+    for name in os.listdir(directory):
+        if name.startswith(PREFIX) and name.endswith(SUFFIX):
+            path = os.path.join(directory, name)
+            st = os.stat(path)
+            snaps.append((st.st_mtime_ns, name, Snapshot(path, st.st_size, datetime.datetime.fromtimestamp(st.st_mtime))))
+    # a snapshot is never modified after its rename, so mtime orders them
+    snaps.sort(key=lambda s: s[:2], reverse=True)
+    return [snap for _mtime, _name, snap in snaps]
+
+
+def rotate(directory: Optional[str] = None, keep: Optional[int] = None) -> List[str]:
+    """Delete all but the newest *keep* snapshots; returns the removed paths."""
+    keep = BACKUP_SETTINGS["keep"] if keep is None else keep
+    removed = []
+    for snap in list_snapshots(directory)[max(keep, 1):]:
+        os.remove(snap.path)
+        removed.append(snap.path)
+    return removed
+
+
+def create(db, directory: Optional[str] = None, keep: Optional[int] = None,
+           progress: Optional[Callable[[int, int], None]] = None, label: str = "") -> Snapshot:
+    """Snapshot *db* into *directory*, verify it and rotate old snapshots.
+
+    *progress(copied_pages, total_pages)* is called after every backup step;
+    it runs on the calling thread, so call this from a worker for UI use.
+    """
+    directory = directory or BACKUP_SETTINGS["dir"]
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    suffix = f"-{label}" if label else ""
+    path = os.path.join(directory, f"{PREFIX}{stamp}{suffix}{SUFFIX}")
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(directory, f"{PREFIX}{stamp}{suffix}-{n}{SUFFIX}")
+    tmp = path + ".part"
+    try:
+        db.backup_to(tmp, pages=BACKUP_SETTINGS["pages_per_step"], progress=progress)
+        problems = verify(tmp)
+        if problems:
+            raise BackupError("Snapshot failed verification: " + "; ".join(problems[:5]))
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    rotate(directory, keep)
+    st = os.stat(path)
+    return Snapshot(path, st.st_size, datetime.datetime.fromtimestamp(st.st_mtime))
+
+
+def restore(db, path: str, directory: Optional[str] = None,
+            progress: Optional[Callable[[int, int], None]] = None) -> Snapshot:
+    """Replace *db*'s contents with the snapshot at *path*.
+
+    The snapshot is verified first and the current data is saved as a
+    ``pre-restore`` snapshot (returned), so a bad restore can be undone.
+    Older snapshots are upgraded to the current schema afterwards. Nothing
+    is rotated here; the next ``create`` applies the retention limit.
+    """
+    problems = verify(path)
+    if problems:
+        raise BackupError(f"{os.path.basename(path)} failed verification: " + "; ".join(problems[:5]))
+    # no rotation: at the retention limit it would delete *path* itself
+    safety = create(db, directory, keep=len(list_snapshots(directory)) + 1, label="pre-restore")
+    db.restore_from(path, pages=BACKUP_SETTINGS["pages_per_step"], progress=progress)
+    db.init_db()
+    problems = verify(db.path)
+    if problems:
+        raise BackupError("Restored database failed verification: " + "; ".join(problems[:5])
+                          + f". The previous data is in {safety.path}")
+    return safety
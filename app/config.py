@@ -1,3 +1,5 @@
+import os
+
 import customtkinter as ctk
 
 DARK_COLORS = {
@@ -20,8 +22,42 @@ LIGHT_COLORS = {
     "muted": "#555555",
 }
 
-# Mutable palette used by the UI; toggled via set_mode()
-COLORS = DARK_COLORS.copy()
+AQUA_COLORS = {
+    "bg1": "#062a30",
+    "bg2": "#0b3a42",
+    "panel": "#08323a",
+    "gold": "#3fd0c9",
+    "gold_dim": "#2aa39d",
+    "white": "#e8fbfa",
+    "muted": "#8fb8b6",
+}
+
+# name -> (palette, CTk appearance mode)
+THEMES = {
+    "aqua": (AQUA_COLORS, "dark"),
+    "light": (LIGHT_COLORS, "light"),
+    "dark": (DARK_COLORS, "dark"),
+}
+
+
+class ThemeColor(str):
+    """A palette colour that remembers its ``COLORS`` key.
+
+    Widgets built with ``COLORS[...]`` keep these objects as option values,
+    which is how ``app.ui.theme.restyle`` knows what to recolour.
+    """
+
+    def __new__(cls, key: str, value: str):
+        color = super().__new__(cls, value)
+        color.key = key
+        return color
+
+
+# built once so switching themes only swaps references
+_PALETTES = {name: {k: ThemeColor(k, v) for k, v in colors.items()} for name, (colors, _mode) in THEMES.items()}
+
+# Mutable palette used by the UI; switched in place via set_theme()
+COLORS = dict(_PALETTES["dark"])
 CURRENT_MODE = "dark"
 
 APP_INFO = {
@@ -29,25 +65,69 @@ APP_INFO = {
     "version": "1.0.0",
 }
 
+# SQLite storage profile applied to every pooled connection (see Database.connect)
+DB_SETTINGS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -16000,         # negative = KiB, i.e. ~16 MB page cache
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "recursive_triggers": True,   # REPLACE deletes must fire summary triggers
+    "busy_timeout_ms": 5000,
+    "cached_statements": 256,     # prepared statements kept per connection
+    "query_cache_size": 0,        # Database read cache entries; 0 = off (opt-in)
+}
+
+# Snapshots written by app.backup / `manage.py backup`
+BACKUP_SETTINGS = {
+    "dir": "backups",
+    "keep": 10,                   # newest snapshots kept by rotation
+    "pages_per_step": 256,        # backup API step size; smaller = more responsive writers
+}
+
+# Database call tracing (app.tracing); off unless enabled here or from Reports > Diagnostics
+TRACE_SETTINGS = {
+    "enabled": False,             # start tracing when the app launches
+    "slow_ms": 100,               # calls this slow get EXPLAIN QUERY PLAN logged
+    "log_path": os.path.join("data", "slow_queries.log"),
+    "log_bytes": 1024 * 1024,     # rotate the slow-query log at this size
+    "log_backups": 3,             # rotated logs kept
+    "top_n": 50,                  # slowest calls kept per session
+}
+
+# Tk event-loop lag probe and UI timings (app.ui.monitor); F12 toggles the overlay
+UI_MONITOR_SETTINGS = {
+    "enabled": True,
+    "probe_ms": 100,              # probe interval; lag = how late each probe fires
+    "record_lag_ms": 10,          # lag samples at least this large are kept in the ring buffer
+    "capacity": 5000,             # ring buffer size (samples)
+    "overlay": False,             # show the overlay at startup
+}
+
 FONTS = {
     "h1": ("Segoe UI", 24, "bold"),
     "h2": ("Segoe UI", 18, "bold"),
     "body": ("Segoe UI", 12),
 }
 
-def set_mode(mode: str = "dark"):
-    """Switch between light/dark modes.
-    Updates the global COLORS palette and CTk appearance mode.
+def set_theme(name: str = "dark") -> bool:
+    """Switch to one of ``THEMES``; returns False if it is already active.
+
+    ``COLORS`` is updated in place (modules import it by reference). Existing
+    widgets keep their old colours until ``app.ui.theme.restyle`` runs.
     """
-    global CURRENT_MODE, COLORS
-    mode = mode.lower()
-    if mode == CURRENT_MODE:
-        return
-    if mode == "light":
-        COLORS.clear(); COLORS.update(LIGHT_COLORS)
-        ctk.set_appearance_mode("light")
-        CURRENT_MODE = "light"
-    else:
-        COLORS.clear(); COLORS.update(DARK_COLORS)
-        ctk.set_appearance_mode("dark")
-        CURRENT_MODE = "dark"
+    global CURRENT_MODE
+    name = name.lower()
+    if name not in THEMES:
+        raise ValueError(f"Unknown theme {name!r}")
+    if name == CURRENT_MODE:
+        return False
+    COLORS.update(_PALETTES[name])
+    ctk.set_appearance_mode(THEMES[name][1])
+    CURRENT_MODE = name
+    return True
+
+
+def set_mode(mode: str = "dark") -> bool:
+    """Switch between light/dark modes (see ``set_theme`` for Aqua)."""
+    return set_theme("light" if mode.lower() == "light" else "dark")
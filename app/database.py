@@ -1,167 +1,321 @@
+import datetime
+import functools
 import os
+import re
 import sqlite3
-from typing import Optional, List, Tuple, Any, Dict
+import threading
+from typing import Optional, List, Tuple, Any, Dict, Iterable, Iterator
+
+from app import migrations
+from app.cache import QueryCache
+from app.config import DB_SETTINGS
+from app.lookup import StudentIndex, id_prefix_ranges
+from app.schedule import MINUTES_PER_WEEK, day_index, week_minute
 
 DB_PATH = os.path.join("data", "app.db")
 
+STUDENT_COLUMNS = "id, name, age, class, contact, email, username, batch, parent_contact, student_contact"
+STUDENT_FULL_COLUMNS = "id, username, password, name, age, class, contact, email, batch, parent_contact, student_contact"
+
+# Export datasets: (column headers, query with a {where} slot, filter -> condition).
+# Queries stream in index order so exporting never needs a full sort in memory.
+EXPORTS: Dict[str, Tuple[Tuple[str, ...], str, Dict[str, str]]] = {
+    "students": (
+        ("ID", "Username", "Name", "Age", "Class", "Contact", "Email", "Batch", "Parent Contact", "Student Contact"),
+        "SELECT id, username, name, age, class, contact, email, batch, parent_contact, student_contact "
+        "FROM Students {where} ORDER BY name, id",
+        {"batch": "batch = ?"},
+    ),
+    "attendance": (
+        ("Date", "Student ID", "Name", "Batch", "Status"),
+        "SELECT a.date, a.student_id, s.name, s.batch, a.status "
+        "FROM Attendance a LEFT JOIN Students s ON s.id = a.student_id {where} ORDER BY a.date",
+        {"start": "a.date >= ?", "end": "a.date <= ?", "batch": "s.batch = ?"},
+    ),
+    "fees": (
+        ("Student ID", "Name", "Batch", "Amount Paid", "Pending", "Last Payment"),
+        "SELECT f.student_id, s.name, s.batch, f.amount_paid, f.pending_amount, f.last_payment_date "
+        "FROM Fees f LEFT JOIN Students s ON s.id = f.student_id {where} ORDER BY f.student_id",
+        {"batch": "s.batch = ?"},
+    ),
+    "payments": (
+        ("ID", "Date", "Student ID", "Name", "Batch", "Amount", "Pending After", "Note"),
+        "SELECT p.id, p.date, p.student_id, s.name, p.batch, p.amount, p.pending_after, p.note "
+        "FROM Payments p LEFT JOIN Students s ON s.id = p.student_id {where} ORDER BY p.id",
+        {"start": "p.date >= ?", "end": "p.date <= ?", "batch": "p.batch = ?"},
+    ),
+    "performance": (
+        ("Student ID", "Name", "Batch", "Subject", "Marks", "Date"),
+        "SELECT p.student_id, s.name, s.batch, p.subject, p.marks, p.date "
+        "FROM Performance p LEFT JOIN Students s ON s.id = p.student_id {where} ORDER BY p.student_id",
+        {"start": "p.date >= ?", "end": "p.date <= ?", "batch": "s.batch = ?"},
+    ),
+    "messages": (
+        ("ID", "Date", "Sender", "Recipient", "Message"),
+        "SELECT id, date_sent, sender_type, recipient, message_text "
+        "FROM Messages {where} ORDER BY date_sent DESC, id DESC",
+        {"start": "date_sent >= ?", "end": "date_sent <= ?"},
+    ),
+    "timetable": (
+        ("ID", "Batch", "Day", "Time", "Subject", "TeacherID"),
+        "SELECT id, batch, day, time_slot, subject, teacher_id FROM Timetable {where} "
+        "ORDER BY batch, week_minute IS NULL, week_minute, id",
+        {"batch": "batch = ?"},
+    ),
+}
+
+# Tables tracked by @reads/@writes; summary tables (AttendanceSummary,
+# PaymentTotals) are covered by the table that feeds them.
+TABLES = (
+    "Admin", "Students", "Batches", "Attendance", "Fees", "Payments", "Performance",
+    "Messages", "MessageReads", "Teachers", "Timetable", "Homework",
+)
+
+
+def reads(*tables: str):
+    """Mark a read method as cacheable; its result depends on *tables*.
+
+    With the query cache enabled, results are memoised per method, arguments
+    and the current write generation of each table.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            cache = self._cache
+            if cache is None:
+                return fn(self, *args, **kwargs)
+            key = (fn.__name__, args, tuple(sorted(kwargs.items())), self._generations_of(tables))
+            try:
+                value = cache.get(key)
+            except TypeError:  # unhashable argument: don't cache
+                return fn(self, *args, **kwargs)
+            if value is QueryCache.MISSING:
+                value = fn(self, *args, **kwargs)
+                cache.put(key, value)
+            return _detach(value)
+        wrapper.reads_tables = tables
+        return wrapper
+    return decorator
+
+
+def writes(*tables: str):
+    """Mark a write method; bumps the generation of *tables* once it returns."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return fn(self, *args, **kwargs)
+            finally:
+                self._bump(tables)
+        wrapper.writes_tables = tables
+        return wrapper
+    return decorator
+
+
+TIMETABLE_INSERT = (
+    "INSERT INTO Timetable(batch, day, time_slot, subject, teacher_id, day_index, week_minute) VALUES(?,?,?,?,?,?,?)"
+)
+
+
+def _timetable_row(row: Tuple) -> Tuple:
+    # (batch, day, time_slot, subject, teacher_id) plus the parsed day and start of week
+    batch, day, time_slot, subject, teacher_id = row
+    return batch, day, time_slot, subject, teacher_id, day_index(day), week_minute(day, time_slot)
+
+
+def _detach(value):
+    # hand callers their own list/dict so in-place edits can't corrupt the cache
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return {k: _detach(v) for k, v in value.items()}
+    return value
+
 
 class Database:
-    def __init__(self, path: str = DB_PATH):
+    def __init__(self, path: str = DB_PATH, settings: Optional[Dict[str, Any]] = None):
         self.path = path
-        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self.settings = {**DB_SETTINGS, **(settings or {})}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # one connection per thread, opened lazily and reused for every call
+        self._local = threading.local()
+        self._pool: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._fts: Optional[bool] = None
+        # write generation per table, bumped by @writes methods
+        self._generations: Dict[str, int] = {}
+        self._gen_lock = threading.Lock()
+        size = self.settings.get("query_cache_size", 0)
+        self._cache: Optional[QueryCache] = QueryCache(size) if size else None
+        self._tracer = None  # app.tracing.Tracer while tracing is on
+        self._student_index: Optional[StudentIndex] = None
 
-    def connect(self):
-        return sqlite3.connect(self.path)
+    def connect(self) -> sqlite3.Connection:
+        """Return this thread's pooled connection, opening it on first use.
 
-    def _column_exists(self, cur, table: str, column: str) -> bool:
-        cur.execute(f"PRAGMA table_info({table})")
-        return any(row[1] == column for row in cur.fetchall())
+        The connection is meant to be used as ``with db.connect() as con:`` –
+        the context manager commits or rolls back but leaves it open.
+        """
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._open()
+            if self._tracer is not None:
+                self._tracer.attach(con)
+            self._local.con = con
+            with self._pool_lock:
+                self._pool.append(con)
+        return con
 
-    def init_db(self):
-        with self.connect() as con:
-            cur = con.cursor()
-            # core tables
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Admin (
-                    username TEXT PRIMARY KEY,
-                    password TEXT NOT NULL
-                )
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Students (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    age INTEGER,
-                    class TEXT,
-                    contact TEXT,
-                    email TEXT,
-                    username TEXT UNIQUE,
-                    password TEXT,
-                    batch TEXT,
-                    parent_contact TEXT DEFAULT '' NOT NULL,
-                    student_contact TEXT
-                )
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Batches (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT UNIQUE,
-                    subject TEXT,
-                    time TEXT
-                )
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Attendance (
-                    student_id INTEGER,
-                    date TEXT,
-                    status TEXT,
-                    PRIMARY KEY (student_id, date)
-                )
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Fees (
-                    student_id INTEGER PRIMARY KEY,
-                    amount_paid REAL DEFAULT 0,
-                    pending_amount REAL DEFAULT 0,
-                    last_payment_date TEXT
-                )
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Performance (
-                    student_id INTEGER,
-                    subject TEXT,
-                    marks REAL,
-                    date TEXT
-                )
-                """
-            )
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Messages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    message_text TEXT,
-                    date_sent TEXT,
-                    sender_type TEXT,
-                    recipient TEXT
-                )
-                """
-            )
+    def _open(self) -> sqlite3.Connection:
+        s = self.settings
+        con = sqlite3.connect(
+            self.path,
+            timeout=s["busy_timeout_ms"] / 1000,
+            cached_statements=s["cached_statements"],
+            check_same_thread=False,
+        )
+        con.execute(f"PRAGMA journal_mode={s['journal_mode']}")
+        con.execute(f"PRAGMA synchronous={s['synchronous']}")
+        con.execute(f"PRAGMA cache_size={int(s['cache_size'])}")
+        con.execute(f"PRAGMA mmap_size={int(s['mmap_size'])}")
+        con.execute(f"PRAGMA temp_store={s['temp_store']}")
+        con.execute(f"PRAGMA recursive_triggers={'ON' if s['recursive_triggers'] else 'OFF'}")
+        return con
 
-            # Teachers
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Teachers (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    subjects TEXT,
-                    availability TEXT
-                )
-                """
-            )
-            # Timetable
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Timetable (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    batch TEXT,
-                    day TEXT,
-                    time_slot TEXT,
-                    subject TEXT,
-                    teacher_id INTEGER
-                )
-                """
-            )
-            # Homework (assigned per batch)
-            cur.execute(
-                """
-                CREATE TABLE IF NOT EXISTS Homework (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    batch TEXT,
-                    title TEXT,
-                    due_date TEXT,
-                    description TEXT,
-                    posted_at TEXT,
-                    is_optional INTEGER DEFAULT 0
-                )
-                """
-            )
+    def close(self):
+        """Close the calling thread's connection (if any)."""
+        con = getattr(self._local, "con", None)
+        if con is None:
+            return
+        self._local.con = None
+        with self._pool_lock:
+            if con in self._pool:
+                self._pool.remove(con)
+        con.close()
 
-            # Migrations for existing DBs
+    def close_all(self):
+        """Close every pooled connection; used on shutdown."""
+        with self._pool_lock:
+            pool, self._pool = self._pool, []
+        for con in pool:
             try:
-                if not self._column_exists(cur, "Students", "parent_contact"):
-                    cur.execute("ALTER TABLE Students ADD COLUMN parent_contact TEXT DEFAULT '' NOT NULL")
-                if not self._column_exists(cur, "Students", "student_contact"):
-                    cur.execute("ALTER TABLE Students ADD COLUMN student_contact TEXT")
-            except Exception:
-                pass
-            try:
-                if not self._column_exists(cur, "Batches", "time"):
-                    cur.execute("ALTER TABLE Batches ADD COLUMN time TEXT")
-            except Exception:
+                con.close()
+            except sqlite3.ProgrammingError:
                 pass
+        self._local = threading.local()
 
-            # default admin
-            cur.execute("INSERT OR IGNORE INTO Admin(username, password) VALUES(?, ?)", ("admin", "admin1"))
-            con.commit()
+    def init_db(self) -> List[int]:
+        """Bring the schema up to date; returns the migration versions applied.
+
+        On an up-to-date database this is a single ``PRAGMA user_version`` read.
+        """
+        applied = migrations.migrate(self.connect())
+        if applied and self._cache is not None:
+            self._cache.clear()
+        return applied
+
+    # --- Query cache ---
+    def enable_cache(self, maxsize: int = 256):
+        """Memoise @reads methods in an LRU of *maxsize* entries.
+
+        Invalidation relies on this process's @writes methods, so only enable
+        it when no other program writes to the database concurrently.
+        """
+        self._cache = QueryCache(maxsize)
+
+    def disable_cache(self):
+        self._cache = None
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size of the query cache (empty when disabled)."""
+        return self._cache.stats() if self._cache is not None else {}
+
+    def generation(self, table: str) -> int:
+        """Number of writes made to *table* through this Database so far."""
+        with self._gen_lock:
+            return self._generations.get(table, 0)
+
+    def _generations_of(self, tables) -> Tuple[int, ...]:
+        with self._gen_lock:
+            return tuple(self._generations.get(t, 0) for t in tables)
+
+    def _bump(self, tables):
+        with self._gen_lock:
+            for t in tables:
+                self._generations[t] = self._generations.get(t, 0) + 1
+
+    # --- Tracing ---
+    def enable_tracing(self, **options) -> "Tracer":
+        """Record timings, SQL and callers of every query method (see ``app.tracing``).
+
+        *options* are passed to ``Tracer`` (``slow_ms``, ``log_path``, ``top_n``).
+        Calling it again returns the running tracer.
+        """
+        if self._tracer is None:
+            from app.tracing import Tracer  # imported on demand: tracing is opt-in
+            tracer = Tracer(**options)
+            tracer.install(self)
+            self._tracer = tracer
+        return self._tracer
+
+    def disable_tracing(self):
+        tracer, self._tracer = self._tracer, None
+        if tracer is not None:
+            tracer.uninstall()
+
+    @property
+    def tracer(self) -> Optional["Tracer"]:
+        return self._tracer
+
+    def query_plan(self, sql: str, params: Tuple = ()) -> List[str]:
+        """Return the ``EXPLAIN QUERY PLAN`` detail lines for *sql*."""
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[3] for row in cur.fetchall()]
+
+    # --- Backup ---
+    def backup_to(self, path: str, pages: int = 256, progress=None):
+        """Copy the live database into a new file at *path* while it stays in use.
+
+        Uses SQLite's online backup API, *pages* pages per step, calling
+        ``progress(copied, total)`` after each step. The copy is switched to a
+        rollback journal so it is a single self-contained file.
+        """
+        dst = sqlite3.connect(path)
+        try:
+            src = self.connect()
+            src.backup(dst, pages=pages, progress=_backup_progress(progress))
+            dst.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            dst.close()
+
+    @writes(*TABLES)
+    def restore_from(self, path: str, pages: int = 256, progress=None):
+        """Overwrite the live database with the contents of the database at *path*.
+
+        Runs through the backup API on this thread's connection, so other
+        connections see either the old or the new database, never a mix.
+        Callers should verify *path* first (see ``app.backup``).
+        """
+        src = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            src.backup(self.connect(), pages=pages, progress=_backup_progress(progress))
+        finally:
+            src.close()
+        self._fts = None
+        if self._cache is not None:
+            self._cache.clear()
 
     # --- Admin / Student Auth ---
+    @reads("Admin")
     def get_admin(self, username: str) -> Optional[Tuple]:
         with self.connect() as con:
             cur = con.cursor()
             cur.execute("SELECT username, password FROM Admin WHERE username=?", (username,))
             return cur.fetchone()
 
+    @reads("Students")
     def get_student_by_username(self, username: str) -> Optional[Tuple]:
         with self.connect() as con:
             cur = con.cursor()
@@ -174,6 +328,7 @@ class Database:
             )
             return cur.fetchone()
 
+    @reads("Students")
     def get_student_by_id(self, sid: int) -> Optional[Tuple]:
         with self.connect() as con:
             cur = con.cursor()
@@ -186,21 +341,58 @@ class Database:
             )
             return cur.fetchone()
 
+    @reads("Students")
     def search_students_by_id_prefix(self, prefix: str) -> List[Tuple]:
+        # one primary-key range per id length (12, 120-129, ...) instead of a
+        # CAST(id AS TEXT) LIKE scan; lookups as you type use student_index
         with self.connect() as con:
             cur = con.cursor()
+            upper = cur.execute("SELECT MAX(id) FROM Students").fetchone()[0] or 0
+            ranges = id_prefix_ranges(prefix.strip(), upper)
+            if not ranges:
+                return []
             cur.execute(
-                """
+                f"""
                 SELECT id, name, class, username, batch
                 FROM Students
-                WHERE CAST(id AS TEXT) LIKE ?
+                WHERE {" OR ".join(["id BETWEEN ? AND ?"] * len(ranges))}
                 ORDER BY id
                 """,
-                (f"{prefix}%",),
+                [bound for r in ranges for bound in r],
             )
             return cur.fetchall()
 
+    @reads("Students")
+    def student_directory(self) -> List[Tuple]:
+        """(id, name, class, username, batch) of every student, for ``StudentIndex``."""
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute("SELECT id, name, class, username, batch FROM Students ORDER BY id")
+            return cur.fetchall()
+
+    @property
+    def student_index(self) -> StudentIndex:
+        """Shared in-memory id/username/name prefix index (see ``app.lookup``)."""
+        if self._student_index is None:
+            self._student_index = StudentIndex(self)
+        return self._student_index
+
+    @reads("Students")
+    def list_students_by_ids(self, ids: List[int], full_order: bool = False) -> List[Tuple]:
+        """Students with the given *ids*, in that order; shaped like ``search_students``."""
+        cols = STUDENT_FULL_COLUMNS if full_order else STUDENT_COLUMNS
+        ids = list(ids)
+        found = {}
+        with self.connect() as con:
+            cur = con.cursor()
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                cur.execute(f"SELECT {cols} FROM Students WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                found.update((row[0], row) for row in cur.fetchall())
+        return [found[sid] for sid in ids if sid in found]
+
     # --- Students ---
+    @writes("Students", "Fees")
     def add_student(self, data: Dict[str, Any]) -> int:
         with self.connect() as con:
             cur = con.cursor()
@@ -225,6 +417,7 @@ class Database:
             con.commit()
             return sid
 
+    @writes("Students")
     def update_student(self, sid: int, data: Dict[str, Any]):
         with self.connect() as con:
             cur = con.cursor()
@@ -241,57 +434,111 @@ class Database:
             )
             con.commit()
 
+    @writes("Students", "Fees", "Attendance", "Performance")
     def delete_student(self, sid: int):
         with self.connect() as con:
             cur = con.cursor()
-            cur.execute("DELETE FROM Students WHERE id=?", (sid,))
-            cur.execute("DELETE FROM Fees WHERE student_id=?", (sid,))
+            # Attendance goes first: its summary trigger looks up the student's batch
             cur.execute("DELETE FROM Attendance WHERE student_id=?", (sid,))
+            cur.execute("DELETE FROM Fees WHERE student_id=?", (sid,))
             cur.execute("DELETE FROM Performance WHERE student_id=?", (sid,))
+            cur.execute("DELETE FROM Students WHERE id=?", (sid,))
             con.commit()
 
-    def list_students(self, search: str = "") -> List[Tuple]:
+    @reads("Students")
+    def list_students(self, search: str = "", limit: Optional[int] = None) -> List[Tuple]:
+        if search:
+            return self.search_students(search, limit=limit)
         with self.connect() as con:
             cur = con.cursor()
-            if search:
-                like = f"%{search}%"
-                cur.execute(
-                    """
-                    SELECT id, name, age, class, contact, email, username, batch, parent_contact, student_contact
-                    FROM Students
-                    WHERE name LIKE ? OR class LIKE ? OR batch LIKE ?
-                    ORDER BY name
-                    """,
-                    (like, like, like),
-                )
-            else:
-                cur.execute(
-                    "SELECT id, name, age, class, contact, email, username, batch, parent_contact, student_contact FROM Students ORDER BY name"
-                )
+            cur.execute(f"SELECT {STUDENT_COLUMNS} FROM Students ORDER BY name LIMIT ?", (_sql_limit(limit),))
             return cur.fetchall()
 
-    def list_students_full_order(self, search: str = "") -> List[Tuple]:
+    @reads("Students")
+    def list_students_full_order(self, search: str = "", limit: Optional[int] = None) -> List[Tuple]:
         """Return rows ordered as: id, username, password, name, age, class, contact, email, batch, parent_contact, student_contact"""
+        if search:
+            return self.search_students(search, limit=limit, full_order=True)
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT {STUDENT_FULL_COLUMNS} FROM Students ORDER BY name LIMIT ?", (_sql_limit(limit),))
+            return cur.fetchall()
+
+    @reads("Students")
+    def list_students_page(self, after: Optional[Tuple[Any, int]] = None, limit: int = 100,
+                           full_order: bool = False) -> List[Tuple]:
+        """Keyset page of students ordered by (name, id).
+
+        *after* is the ``(name, id)`` of the last row already shown (None for the
+        first page). Rows are shaped like ``list_students`` or, with
+        *full_order*, like ``list_students_full_order``.
+        """
+        cols = STUDENT_FULL_COLUMNS if full_order else STUDENT_COLUMNS
+        if after is None:
+            where, params = "", ()
+        elif after[0] is None:
+            # NULL names sort first; continue within them, then everything named
+            where, params = "WHERE (name IS NULL AND id > ?) OR name IS NOT NULL", (after[1],)
+        else:
+            where, params = "WHERE (name, id) > (?, ?)", tuple(after)
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(f"SELECT {cols} FROM Students {where} ORDER BY name, id LIMIT ?", params + (limit,))
+            return cur.fetchall()
+
+    @property
+    def has_fts(self) -> bool:
+        """True when the StudentsFTS index exists and this SQLite build can query it."""
+        if self._fts is None:
+            try:
+                with self.connect() as con:
+                    con.execute("SELECT rowid FROM StudentsFTS LIMIT 0")
+                self._fts = True
+            except sqlite3.OperationalError:
+                self._fts = False
+        return self._fts
+
+    @reads("Students")
+    def search_students(self, search: str, limit: Optional[int] = 200, full_order: bool = False) -> List[Tuple]:
+        """Ranked prefix search over name, class, batch and username.
+
+        Each word in *search* must prefix-match some column; best matches come
+        first. Uses FTS5 when available, otherwise a ``LIKE`` scan ordered by
+        name. Rows are shaped like ``list_students`` (or
+        ``list_students_full_order`` when *full_order* is set).
+        """
+        cols = STUDENT_FULL_COLUMNS if full_order else STUDENT_COLUMNS
+        match = _fts_query(search)
         with self.connect() as con:
             cur = con.cursor()
-            if search:
+            if match and self.has_fts:
+                qualified = ", ".join(f"s.{c.strip()}" for c in cols.split(","))
+                cur.execute(
+                    f"""
+                    SELECT {qualified}
+                    FROM StudentsFTS JOIN Students s ON s.id = StudentsFTS.rowid
+                    WHERE StudentsFTS MATCH ?
+                    ORDER BY bm25(StudentsFTS, 10.0, 2.0, 2.0, 4.0), s.name
+                    LIMIT ?
+                    """,
+                    (match, _sql_limit(limit)),
+                )
+            else:
                 like = f"%{search}%"
                 cur.execute(
-                    """
-                    SELECT id, username, password, name, age, class, contact, email, batch, parent_contact, student_contact
+                    f"""
+                    SELECT {cols}
                     FROM Students
                     WHERE username LIKE ? OR name LIKE ? OR class LIKE ? OR batch LIKE ?
                     ORDER BY name
+                    LIMIT ?
                     """,
-                    (like, like, like, like),
-                )
-            else:
-                cur.execute(
-                    "SELECT id, username, password, name, age, class, contact, email, batch, parent_contact, student_contact FROM Students ORDER BY name"
+                    (like, like, like, like, _sql_limit(limit)),
                 )
             return cur.fetchall()
 
     # --- Batches ---
+    @writes("Batches")
     def upsert_batch(self, name: str, subject: str = "", time: str = ""):
         with self.connect() as con:
             cur = con.cursor()
@@ -305,12 +552,14 @@ class Database:
             )
             con.commit()
 
+    @writes("Batches")
     def delete_batch(self, name: str):
         with self.connect() as con:
             cur = con.cursor()
             cur.execute("DELETE FROM Batches WHERE name=?", (name,))
             con.commit()
 
+    @reads("Batches")
     def list_batches(self) -> List[Tuple]:
         with self.connect() as con:
             cur = con.cursor()
@@ -318,15 +567,56 @@ class Database:
             return cur.fetchall()
 
     # --- Attendance ---
+    @writes("Attendance")
     def mark_attendance(self, student_id: int, date: str, status: str):
         with self.connect() as con:
             cur = con.cursor()
             cur.execute(
-                "INSERT OR REPLACE INTO Attendance(student_id, date, status) VALUES(?,?,?)",
+                """
+                INSERT INTO Attendance(student_id, date, status) VALUES(?,?,?)
+                ON CONFLICT(student_id, date) DO UPDATE SET status=excluded.status
+                """,
                 (student_id, date, status),
             )
             con.commit()
 
+    @writes("Attendance")
+    def mark_attendance_many(self, date: str, statuses: Iterable[Tuple[int, str]]) -> int:
+        """Save ``(student_id, status)`` pairs for *date* in one transaction.
+
+        Returns the number of rows inserted or changed; rows that already hold
+        the same status are left alone.
+        """
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.executemany(
+                """
+                INSERT INTO Attendance(student_id, date, status) VALUES(?,?,?)
+                ON CONFLICT(student_id, date) DO UPDATE SET status=excluded.status
+                WHERE status IS NOT excluded.status
+                """,
+                ((sid, date, status) for sid, status in statuses),
+            )
+            return max(cur.rowcount, 0)
+
+    @reads("Students", "Attendance")
+    def attendance_roster(self, batch: str, date: str) -> List[Tuple]:
+        """Students of *batch* with their status on *date* (None if unmarked): id, name, batch, status"""
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT s.id, s.name, s.batch, a.status
+                FROM Students s
+                LEFT JOIN Attendance a ON a.student_id = s.id AND a.date = ?
+                WHERE s.batch = ?
+                ORDER BY s.name
+                """,
+                (date, batch),
+            )
+            return cur.fetchall()
+
+    @reads("Attendance")
     def get_attendance(self, student_id: int) -> List[Tuple]:
         with self.connect() as con:
             cur = con.cursor()
@@ -336,41 +626,125 @@ class Database:
             )
             return cur.fetchall()
 
-    def attendance_percentage(self, student_id: Optional[int] = None) -> float:
+    @reads("Attendance", "Students")
+    def attendance_records(self, batch: Optional[str] = None, start: Optional[str] = None,
+                           end: Optional[str] = None) -> List[Tuple]:
+        """(student_id, name, batch, date, present) for every well-formed record, in one query.
+
+        Feeds ``app.analytics``; rows with non-ISO dates are skipped.
+        """
+        conds = ["a.date GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"]
+        params: List[Any] = []
+        if batch:
+            conds.append("s.batch = ?")
+            params.append(batch)
+        if start:
+            conds.append("a.date >= ?")
+            params.append(start)
+        if end:
+            conds.append("a.date <= ?")
+            params.append(end)
         with self.connect() as con:
             cur = con.cursor()
-            if student_id is None:
-                cur.execute("SELECT COUNT(*) FROM Attendance")
-                total = cur.fetchone()[0]
-                cur.execute("SELECT COUNT(*) FROM Attendance WHERE status='Present'")
-                present = cur.fetchone()[0]
-            else:
-                cur.execute("SELECT COUNT(*) FROM Attendance WHERE student_id=?", (student_id,))
-                total = cur.fetchone()[0]
-                cur.execute(
-                    "SELECT COUNT(*) FROM Attendance WHERE student_id=? AND status='Present'",
-                    (student_id,),
-                )
-                present = cur.fetchone()[0]
-            return round((present / total) * 100, 2) if total else 0.0
+            cur.execute(
+                f"""
+                SELECT a.student_id, s.name, s.batch, a.date, a.status = 'Present'
+                FROM Attendance a JOIN Students s ON s.id = a.student_id
+                WHERE {' AND '.join(conds)}
+                """,
+                params,
+            )
+            return cur.fetchall()
+
+    @reads("Attendance", "Students")
+    def attendance_summary(self, student_id: Optional[int] = None, batch: Optional[str] = None) -> Tuple[int, int]:
+        """(total, present) for a student, a batch, or everyone when neither is given."""
+        if student_id is not None:
+            scope, key = "student", str(student_id)
+        elif batch:
+            scope, key = "batch", batch
+        else:
+            scope, key = "all", ""
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute("SELECT total, present FROM AttendanceSummary WHERE scope=? AND key=?", (scope, key))
+            return cur.fetchone() or (0, 0)
+
+    def attendance_percentage(self, student_id: Optional[int] = None, batch: Optional[str] = None) -> float:
+        total, present = self.attendance_summary(student_id, batch)
+        return round((present / total) * 100, 2) if total else 0.0
+
+    @writes("Attendance")
+    def rebuild_attendance_summary(self):
+        """Recompute AttendanceSummary from scratch (e.g. after edits made outside the app)."""
+        with self.connect() as con:
+            migrations.rebuild_attendance_summary(con.cursor())
+            con.commit()
 
     # --- Fees ---
-    def record_payment(self, student_id: int, amount_paid: float, pending_amount: float, date: str):
+    @writes("Payments", "Fees")
+    def record_payment(self, student_id: int, amount_paid: float, pending_amount: Optional[float] = None,
+                       date: Optional[str] = None, note: str = "") -> int:
+        """Append a payment to the ledger and return its id.
+
+        *pending_amount* is the balance still owed afterwards; when omitted the
+        previous balance is reduced by *amount_paid*. The Fees row and the
+        collection rollups are updated by triggers.
+        """
+        date = date or datetime.date.today().isoformat()
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                "SELECT s.batch, f.pending_amount FROM Students s LEFT JOIN Fees f ON f.student_id = s.id WHERE s.id=?",
+                (student_id,),
+            )
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"Unknown student id {student_id}")
+            batch, previous = row
+            if pending_amount is None:
+                pending_amount = max((previous or 0) - amount_paid, 0)
+            cur.execute(
+                "INSERT INTO Payments(student_id, date, amount, pending_after, batch, note) VALUES(?,?,?,?,?,?)",
+                (student_id, date, amount_paid, pending_amount, batch, note),
+            )
+            con.commit()
+            return cur.lastrowid
+
+    @writes("Payments", "Fees")
+    def reverse_payment(self, payment_id: int, date: Optional[str] = None) -> int:
+        """Cancel a payment by appending an equal negative entry; returns the new id."""
         with self.connect() as con:
             cur = con.cursor()
             cur.execute(
                 """
-                INSERT INTO Fees(student_id, amount_paid, pending_amount, last_payment_date)
-                VALUES(?,?,?,?)
-                ON CONFLICT(student_id) DO UPDATE SET
-                    amount_paid=excluded.amount_paid,
-                    pending_amount=excluded.pending_amount,
-                    last_payment_date=excluded.last_payment_date
+                SELECT p.student_id, p.amount, p.date, f.pending_amount
+                FROM Payments p LEFT JOIN Fees f ON f.student_id = p.student_id WHERE p.id=?
                 """,
-                (student_id, amount_paid, pending_amount, date),
+                (payment_id,),
             )
-            con.commit()
+            row = cur.fetchone()
+        if row is None:
+            raise ValueError(f"Unknown payment id {payment_id}")
+        student_id, amount, paid_on, pending = row
+        return self.record_payment(student_id, -amount, (pending or 0) + amount, date,
+                                   note=f"Reversal of #{payment_id} ({paid_on})")
+
+    @reads("Payments")
+    def list_payments(self, student_id: int, limit: Optional[int] = None) -> List[Tuple]:
+        """Ledger entries for one student, newest first: (id, date, amount, pending_after, note)."""
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT id, date, amount, pending_after, note FROM Payments
+                WHERE student_id=? ORDER BY date DESC, id DESC LIMIT ?
+                """,
+                (student_id, _sql_limit(limit)),
+            )
+            return cur.fetchall()
 
+    @reads("Fees")
     def get_fees(self, student_id: Optional[int] = None):
         with self.connect() as con:
             cur = con.cursor()
@@ -385,7 +759,312 @@ class Database:
                 )
                 return cur.fetchone()
 
+    @reads("Payments")
+    def collections_by_day(self, start: str, end: str, batch: Optional[str] = None) -> List[Tuple]:
+        """(day, total, entries) for start <= day <= end, from the PaymentTotals rollup."""
+        with self.connect() as con:
+            cur = con.cursor()
+            where, params = "day BETWEEN ? AND ?", [start, end]
+            if batch is not None:
+                where, params = "batch=? AND " + where, [batch] + params
+            cur.execute(
+                f"SELECT day, SUM(total), SUM(entries) FROM PaymentTotals WHERE {where} GROUP BY day ORDER BY day",
+                params,
+            )
+            return cur.fetchall()
+
+    @reads("Payments")
+    def collections_by_month(self, start: Optional[str] = None, end: Optional[str] = None,
+                             batch: Optional[str] = None) -> List[Tuple]:
+        """(YYYY-MM, total, entries) per month; *start*/*end* are 'YYYY-MM' and inclusive."""
+        with self.connect() as con:
+            cur = con.cursor()
+            conds, params = [], []
+            if batch is not None:
+                conds.append("batch=?")
+                params.append(batch)
+            if start:
+                conds.append("day >= ?")
+                params.append(f"{start}-01")
+            if end:
+                conds.append("day <= ?")
+                params.append(f"{end}-31")
+            where = f"WHERE {' AND '.join(conds)}" if conds else ""
+            cur.execute(
+                f"""
+                SELECT substr(day, 1, 7) AS month, SUM(total), SUM(entries) FROM PaymentTotals
+                {where} GROUP BY month ORDER BY month
+                """,
+                params,
+            )
+            return cur.fetchall()
+
+    @reads("Payments")
+    def collections_by_batch(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Tuple]:
+        """(batch, total, entries) per batch for an optional inclusive day range."""
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT batch, SUM(total), SUM(entries) FROM PaymentTotals
+                WHERE day BETWEEN COALESCE(?, '') AND COALESCE(?, '9999-12-31')
+                GROUP BY batch ORDER BY SUM(total) DESC
+                """,
+                (start, end),
+            )
+            return cur.fetchall()
+
+    @writes("Payments", "Fees")
+    def rebuild_fees(self):
+        """Recompute the Fees balances and PaymentTotals rollup from the Payments ledger."""
+        with self.connect() as con:
+            migrations.rebuild_fees(con.cursor())
+            con.commit()
+
+    # --- Performance ---
+    @writes("Performance")
+    def add_marks(self, student_id: int, subject: str, marks: float, date: Optional[str] = None):
+        """Record (or correct) one student's marks for a test."""
+        self.record_marks_many(subject, date, [(student_id, marks)])
+
+    @writes("Performance")
+    def record_marks_many(self, subject: str, date: Optional[str], marks: Iterable[Tuple[int, float]]) -> int:
+        """Set ``(student_id, marks)`` pairs for one test in a single transaction.
+
+        A student's existing marks for the test are replaced unless they are
+        already equal. Returns the number of marks written.
+        """
+        date = date or datetime.date.today().isoformat()
+        rows = [(sid, subject, m, date) for sid, m in marks]
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.executemany(
+                "DELETE FROM Performance WHERE student_id=? AND subject=? AND marks IS NOT ? AND date=?",
+                rows,
+            )
+            before = con.total_changes
+            cur.executemany(
+                """
+                INSERT INTO Performance(student_id, subject, marks, date)
+                SELECT ?, ?, ?, ?
+                WHERE NOT EXISTS (SELECT 1 FROM Performance WHERE student_id=? AND subject=? AND date=?)
+                """,
+                [(sid, subj, m, d, sid, subj, d) for sid, subj, m, d in rows],
+            )
+            written = con.total_changes - before
+            con.commit()
+            return written
+
+    @reads("Performance")
+    def get_marks(self, student_id: int, subject: Optional[str] = None) -> List[Tuple]:
+        """(subject, marks, date) for a student, newest first."""
+        with self.connect() as con:
+            cur = con.cursor()
+            if subject is None:
+                cur.execute(
+                    "SELECT subject, marks, date FROM Performance WHERE student_id=? ORDER BY date DESC, subject",
+                    (student_id,),
+                )
+            else:
+                cur.execute(
+                    "SELECT subject, marks, date FROM Performance WHERE student_id=? AND subject=? ORDER BY date DESC",
+                    (student_id, subject),
+                )
+            return cur.fetchall()
+
+    @reads("Performance", "Students")
+    def subject_averages(self, student_id: Optional[int] = None, batch: Optional[str] = None) -> List[Tuple]:
+        """(subject, average, tests, best) for a student, a batch, or everyone."""
+        with self.connect() as con:
+            cur = con.cursor()
+            if student_id is not None:
+                where, params = "WHERE p.student_id = ?", (student_id,)
+            elif batch is not None:
+                where, params = "JOIN Students s ON s.id = p.student_id WHERE s.batch = ?", (batch,)
+            else:
+                where, params = "", ()
+            cur.execute(
+                f"""
+                SELECT p.subject, ROUND(AVG(p.marks), 2), COUNT(p.marks), MAX(p.marks)
+                FROM Performance p {where}
+                GROUP BY p.subject ORDER BY p.subject
+                """,
+                params,
+            )
+            return cur.fetchall()
+
+    @reads("Performance")
+    def list_tests(self, subject: Optional[str] = None, limit: Optional[int] = None) -> List[Tuple]:
+        """(subject, date, students marked) per test, newest first."""
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT subject, date, COUNT(*) FROM Performance
+                WHERE ? IS NULL OR subject = ?
+                GROUP BY subject, date ORDER BY date DESC, subject LIMIT ?
+                """,
+                (subject, subject, _sql_limit(limit)),
+            )
+            return cur.fetchall()
+
+    @reads("Performance", "Students")
+    def test_ranks(self, subject: str, date: str, batch: Optional[str] = None) -> List[Tuple]:
+        """Rank everyone who sat a test within their batch.
+
+        Rows are (student_id, name, batch, marks, rank, percentile), where
+        percentile is the share of the batch scoring at or below the student.
+        """
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT p.student_id, s.name, s.batch, p.marks,
+                       RANK() OVER w_desc,
+                       ROUND(100.0 * CUME_DIST() OVER w_asc, 1)
+                FROM Performance p JOIN Students s ON s.id = p.student_id
+                WHERE p.subject = ? AND p.date = ? AND p.marks IS NOT NULL
+                  AND (? IS NULL OR s.batch = ?)
+                WINDOW w_desc AS (PARTITION BY s.batch ORDER BY p.marks DESC),
+                       w_asc AS (PARTITION BY s.batch ORDER BY p.marks)
+                ORDER BY s.batch, p.marks DESC, s.name
+                """,
+                (subject, date, batch, batch),
+            )
+            return cur.fetchall()
+
+    @reads("Performance", "Students")
+    def student_ranks(self, student_id: int, limit: Optional[int] = None) -> List[Tuple]:
+        """A student's standing in each test, newest first.
+
+        Rows are (subject, date, marks, rank, batch size, percentile) against
+        the student's current batch.
+        """
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                WITH mine AS (
+                    SELECT p.subject, p.date, s.batch FROM Performance p JOIN Students s ON s.id = p.student_id
+                    WHERE p.student_id = ? AND p.marks IS NOT NULL
+                ),
+                ranked AS (
+                    SELECT p.student_id, p.subject, p.date, p.marks,
+                           RANK() OVER (PARTITION BY p.subject, p.date ORDER BY p.marks DESC) AS rnk,
+                           COUNT(*) OVER (PARTITION BY p.subject, p.date) AS sat,
+                           ROUND(100.0 * CUME_DIST() OVER (PARTITION BY p.subject, p.date ORDER BY p.marks), 1) AS pct
+                    FROM mine m
+                    JOIN Performance p ON p.subject = m.subject AND p.date = m.date
+                    JOIN Students s ON s.id = p.student_id AND s.batch = m.batch
+                    WHERE p.marks IS NOT NULL
+                )
+                SELECT subject, date, marks, rnk, sat, pct FROM ranked
+                WHERE student_id = ? ORDER BY date DESC, subject LIMIT ?
+                """,
+                (student_id, student_id, _sql_limit(limit)),
+            )
+            return cur.fetchall()
+
+    @reads("Performance", "Students")
+    def marks_sheet(self, batch: str, subject: str, date: str) -> List[Tuple]:
+        """Every student in *batch* with their marks, rank and percentile for one test.
+
+        Students without marks come last with None in the last three columns.
+        Rows are (student_id, name, marks, rank, percentile).
+        """
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                WITH sheet AS (
+                    SELECT s.id, s.name, p.marks
+                    FROM Students s
+                    LEFT JOIN Performance p ON p.student_id = s.id AND p.subject = ? AND p.date = ?
+                    WHERE s.batch = ?
+                )
+                SELECT id, name, marks,
+                       CASE WHEN marks IS NOT NULL THEN RANK() OVER w_desc END,
+                       CASE WHEN marks IS NOT NULL THEN ROUND(100.0 * CUME_DIST() OVER w_asc, 1) END
+                FROM sheet
+                WINDOW w_desc AS (PARTITION BY marks IS NULL ORDER BY marks DESC),
+                       w_asc AS (PARTITION BY marks IS NULL ORDER BY marks)
+                ORDER BY marks IS NULL, marks DESC, name
+                """,
+                (subject, date, batch),
+            )
+            return cur.fetchall()
+
+    # --- Dashboard ---
+    @reads("Students", "Batches", "Fees", "Attendance")
+    def dashboard_summary(self, recent: int = 10) -> Dict[str, Any]:
+        """Admin dashboard figures from aggregate SQL.
+
+        Keys: students, batches, fees_collected, fees_pending, attendance_pct and
+        recent_students (newest first: id, name, class, batch).
+        """
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT
+                    (SELECT COUNT(*) FROM Students),
+                    (SELECT COUNT(*) FROM Batches),
+                    (SELECT COALESCE(SUM(amount_paid), 0) FROM Fees),
+                    (SELECT COALESCE(SUM(pending_amount), 0) FROM Fees),
+                    (SELECT total FROM AttendanceSummary WHERE scope='all' AND key=''),
+                    (SELECT present FROM AttendanceSummary WHERE scope='all' AND key='')
+                """
+            )
+            students, batches, collected, pending, total, present = cur.fetchone()
+            cur.execute(
+                "SELECT id, name, class, batch FROM Students ORDER BY id DESC LIMIT ?",
+                (recent,),
+            )
+            return {
+                "students": students,
+                "batches": batches,
+                "fees_collected": collected,
+                "fees_pending": pending,
+                "attendance_pct": round((present / total) * 100, 2) if total else 0.0,
+                "recent_students": cur.fetchall(),
+            }
+
+    # --- Export ---
+    def export_rows(self, dataset: str, chunk_size: int = 500, **filters) -> Tuple[Tuple[str, ...], int, Iterator[Tuple]]:
+        """Return ``(headers, row_count, rows)`` for an ``EXPORTS`` dataset.
+
+        *rows* is a generator reading the cursor *chunk_size* rows at a time,
+        so memory stays bounded whatever the table size. Filters with a value
+        of None are ignored; unknown filters raise ``ValueError``.
+        """
+        headers, sql, allowed = EXPORTS[dataset]
+        conditions, params = [], []
+        for name, value in filters.items():
+            if name not in allowed:
+                raise ValueError(f"{dataset} export cannot be filtered by {name!r}")
+            if value not in (None, ""):
+                conditions.append(allowed[name])
+                params.append(value)
+        query = sql.format(where="WHERE " + " AND ".join(conditions) if conditions else "")
+        with self.connect() as con:
+            total = con.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
+
+        def rows():
+            cur = self.connect().cursor()
+            try:
+                cur.execute(query, params)
+                while True:
+                    chunk = cur.fetchmany(chunk_size)
+                    if not chunk:
+                        break
+                    yield from chunk
+            finally:
+                cur.close()
+
+        return headers, total, rows()
+
     # --- Teachers ---
+    @writes("Teachers")
     def add_teacher(self, name: str, subjects: str = "", availability: str = "") -> int:
         with self.connect() as con:
             cur = con.cursor()
@@ -393,12 +1072,14 @@ class Database:
             con.commit()
             return cur.lastrowid
 
+    @reads("Teachers")
     def list_teachers(self):
         with self.connect() as con:
             cur = con.cursor()
             cur.execute("SELECT id, name, subjects, availability FROM Teachers ORDER BY name")
             return cur.fetchall()
 
+    @writes("Teachers")
     def delete_teacher(self, tid: int):
         with self.connect() as con:
             cur = con.cursor()
@@ -406,49 +1087,103 @@ class Database:
             con.commit()
 
     # --- Timetable ---
+    @writes("Timetable")
     def upsert_timetable_entry(self, batch: str, day: str, time_slot: str, subject: str, teacher_id: int = None):
         with self.connect() as con:
             cur = con.cursor()
-            cur.execute(
-                "INSERT INTO Timetable(batch, day, time_slot, subject, teacher_id) VALUES(?,?,?,?,?)",
-                (batch, day, time_slot, subject, teacher_id),
-            )
+            cur.execute(TIMETABLE_INSERT, _timetable_row((batch, day, time_slot, subject, teacher_id)))
             con.commit()
 
+    @writes("Timetable")
+    def replace_timetable(self, batch: str, rows: Iterable[Tuple]) -> int:
+        """Atomically replace *batch*'s timetable.
+
+        *rows* are ``(batch, day, time_slot, subject, teacher_id)`` and may be a
+        generator; it is consumed by one ``executemany`` inside the same
+        transaction as the delete, so an exception raised while iterating rolls
+        everything back. Every row must belong to *batch* (``ValueError``
+        otherwise). Returns the number of rows inserted.
+        """
+        def checked():
+            for r in rows:
+                if r[0] != batch:
+                    raise ValueError(f"Timetable row for batch {r[0]!r} in replace of {batch!r}")
+                yield _timetable_row(r)
+
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute("DELETE FROM Timetable WHERE batch=?", (batch,))
+            cur.executemany(TIMETABLE_INSERT, checked())
+            return max(cur.rowcount, 0)
+
+    @writes("Timetable")
     def delete_timetable_entry(self, entry_id: int):
         with self.connect() as con:
             cur = con.cursor()
             cur.execute("DELETE FROM Timetable WHERE id=?", (entry_id,))
             con.commit()
 
+    @writes("Timetable")
     def clear_timetable_for_batch(self, batch: str):
         with self.connect() as con:
             cur = con.cursor()
             cur.execute("DELETE FROM Timetable WHERE batch=?", (batch,))
             con.commit()
 
+    @reads("Timetable")
     def list_timetable(self, batch: str = None):
         with self.connect() as con:
             cur = con.cursor()
+            # in week order; slots that can't be parsed (NULL week_minute) come last
             if batch:
-                cur.execute("SELECT id, batch, day, time_slot, subject, teacher_id FROM Timetable WHERE batch=? ORDER BY day, time_slot", (batch,))
+                cur.execute(
+                    "SELECT id, batch, day, time_slot, subject, teacher_id FROM Timetable WHERE batch=? "
+                    "ORDER BY week_minute IS NULL, week_minute, id",
+                    (batch,),
+                )
             else:
-                cur.execute("SELECT id, batch, day, time_slot, subject, teacher_id FROM Timetable ORDER BY batch, day, time_slot")
+                cur.execute(
+                    "SELECT id, batch, day, time_slot, subject, teacher_id FROM Timetable "
+                    "ORDER BY batch, week_minute IS NULL, week_minute, id"
+                )
             return cur.fetchall()
 
-    def next_classes_for(self, batch: str, limit: int = 5):
-        import datetime as _dt
-        days_order = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
-        today_idx = _dt.datetime.today().weekday()  # 0=Mon
-        all_rows = self.list_timetable(batch)
-        # Simple ordering by day index then time_slot lexicographically
-        def day_idx(d):
-            d3 = d[:3].title()
-            return days_order.index(d3) if d3 in days_order else 7
-        all_rows.sort(key=lambda r: (day_idx(r[2]), r[3]))
-        return all_rows[:limit]
+    # not @reads: the answer depends on the clock, not only on the arguments
+    def next_classes_for(self, batch: str, limit: int = 5,
+                         now: Optional[datetime.datetime] = None) -> List[Tuple]:
+        """The next *limit* class occurrences for *batch* from *now* (default: the current time).
+
+        Rows are ``(id, batch, day, time_slot, subject, teacher_id, starts_at)``
+        with ``starts_at`` a datetime. The rest of this week is read from the
+        ``(batch, week_minute)`` index and the search wraps around to next
+        week; a short timetable repeats in later weeks until *limit* is
+        reached. A class starting at *now* counts as upcoming.
+        """
+        now = now or datetime.datetime.now()
+        week_start = datetime.datetime.combine(now.date() - datetime.timedelta(days=now.weekday()), datetime.time())
+        minute = (now - week_start) // datetime.timedelta(minutes=1)
+        sql = (
+            "SELECT id, batch, day, time_slot, subject, teacher_id, week_minute FROM Timetable "
+            "WHERE batch=? AND week_minute {} ? ORDER BY week_minute, id LIMIT ?"
+        )
+        with self.connect() as con:
+            cur = con.cursor()
+            later = cur.execute(sql.format(">="), (batch, minute, limit)).fetchall()
+            earlier = []
+            if len(later) < limit:
+                earlier = cur.execute(sql.format("<"), (batch, minute, limit - len(later))).fetchall()
+        # the week from now on: the rest of this one, then the start of the next
+        week = [(r, 0) for r in later] + [(r, 1) for r in earlier]
+        out = []
+        for k in range(limit if week else 0):
+            row, weeks = week[k % len(week)]
+            weeks += k // len(week)
+            starts_at = week_start + datetime.timedelta(minutes=row[6] + weeks * MINUTES_PER_WEEK)
+            out.append(row[:6] + (starts_at,))
+        return out
 
     # --- Homework ---
+    @reads("Homework")
     def list_homework_for(self, batch: str):
         with self.connect() as con:
             cur = con.cursor()
@@ -456,6 +1191,7 @@ class Database:
             return cur.fetchall()
 
     # --- Messages ---
+    @writes("Messages")
     def send_message(self, text: str, date: str, sender_type: str, recipient: str = "all"):
         with self.connect() as con:
             cur = con.cursor()
@@ -465,15 +1201,100 @@ class Database:
             )
             con.commit()
 
+    @reads("Messages")
     def list_messages_for(self, recipient: str) -> List[Tuple]:
         with self.connect() as con:
             cur = con.cursor()
             cur.execute(
-                "SELECT message_text, date_sent, sender_type FROM Messages WHERE recipient=? OR recipient='all' ORDER BY date_sent DESC",
+                "SELECT message_text, date_sent, sender_type FROM Messages WHERE recipient IN (?, 'all') ORDER BY date_sent DESC",
                 (recipient,),
             )
             return cur.fetchall()
 
+    @reads("Messages")
+    def inbox(self, username: str, since_id: int = 0, limit: Optional[int] = None) -> List[Tuple]:
+        """Messages for *username* (direct and 'all') with id > *since_id*, newest first.
+
+        Rows are (id, message_text, date_sent, sender_type). Pass the largest id
+        already shown as *since_id* to fetch only what arrived since.
+        """
+        # for 'all' itself a single index range is read backwards, without a sort
+        where = "recipient = ?" if username == "all" else "recipient IN (?, 'all')"
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"""
+                SELECT id, message_text, date_sent, sender_type FROM Messages
+                WHERE {where} AND id > ?
+                ORDER BY id DESC LIMIT ?
+                """,
+                (username, since_id, _sql_limit(limit)),
+            )
+            return cur.fetchall()
+
+    @reads("MessageReads")
+    def last_read_id(self, username: str) -> int:
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute("SELECT last_read_id FROM MessageReads WHERE username=?", (username,))
+            row = cur.fetchone()
+            return row[0] if row else 0
+
+    @reads("Messages", "MessageReads")
+    def unread_count(self, username: str) -> int:
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                """
+                SELECT COUNT(*) FROM Messages
+                WHERE recipient IN (?, 'all')
+                  AND id > COALESCE((SELECT last_read_id FROM MessageReads WHERE username = ?), 0)
+                """,
+                (username, username),
+            )
+            return cur.fetchone()[0]
+
+    @writes("MessageReads")
+    def mark_read(self, username: str, up_to_id: Optional[int] = None):
+        """Mark *username*'s inbox read up to *up_to_id* (default: everything so far).
+
+        The read mark only moves forward.
+        """
+        with self.connect() as con:
+            cur = con.cursor()
+            if up_to_id is None:
+                cur.execute("SELECT COALESCE(MAX(id), 0) FROM Messages WHERE recipient IN (?, 'all')", (username,))
+                up_to_id = cur.fetchone()[0]
+            cur.execute(
+                """
+                INSERT INTO MessageReads(username, last_read_id) VALUES(?, ?)
+                ON CONFLICT(username) DO UPDATE SET last_read_id = MAX(last_read_id, excluded.last_read_id)
+                """,
+                (username, up_to_id),
+            )
+            con.commit()
+
+    @reads("Messages")
+    def list_all_messages_page(self, before: Optional[Tuple[str, int]] = None, limit: int = 100) -> List[Tuple]:
+        """Keyset page of messages, newest first: id, message_text, date_sent, sender_type, recipient.
+
+        *before* is the ``(date_sent, id)`` of the last row already shown.
+        """
+        where, params = ("", ()) if before is None else ("WHERE (date_sent, id) < (?, ?)", tuple(before))
+        with self.connect() as con:
+            cur = con.cursor()
+            cur.execute(
+                f"""
+                SELECT id, message_text, date_sent, sender_type, recipient
+                FROM Messages {where}
+                ORDER BY date_sent DESC, id DESC
+                LIMIT ?
+                """,
+                params + (limit,),
+            )
+            return cur.fetchall()
+
+    @reads("Messages")
     def list_all_messages(self) -> List[Tuple]:
         with self.connect() as con:
             cur = con.cursor()
@@ -481,3 +1302,21 @@ class Database:
                 "SELECT message_text, date_sent, sender_type, recipient FROM Messages ORDER BY date_sent DESC"
             )
             return cur.fetchall()
+
+
+def _backup_progress(progress):
+    # sqlite3 reports (status, remaining, total); callers want (copied, total)
+    if progress is None:
+        return None
+    return lambda _status, remaining, total: progress(total - remaining, total)
+
+
+def _sql_limit(limit: Optional[int]) -> int:
+    # SQLite treats a negative LIMIT as "no limit"
+    return -1 if limit is None else int(limit)
+
+
+def _fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query of quoted prefix terms (ANDed)."""
+    terms = re.findall(r"\w+", text or "")
+    return " ".join(f'"{t}"*' for t in terms)
@@ -0,0 +1,137 @@
+"""Streaming exports of Database tables to CSV, XLSX and PDF.
+
+Rows are pulled from ``Database.export_rows`` a chunk at a time and written
+straight to the output, so memory use does not grow with the table. Exports
+accept a ``progress(done, total)`` callback and a ``threading.Event`` for
+cancellation; both are safe to use from a worker thread. Output goes to a
+temporary ``.part`` file that only replaces *path* once the export completes.
+"""
+import csv
+import os
+import threading
+from typing import Callable, Iterable, Optional, Sequence
+
+from app.database import EXPORTS
+
+FORMATS = ("csv", "xlsx", "pdf")
+DATASETS = tuple(name for name in EXPORTS if name != "timetable")
+
+PROGRESS_EVERY = 500
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class _Tracked:
+    """Iterate *rows*, reporting progress and stopping early on cancellation.
+
+    Cancelling ends the iteration (rather than raising inside a writer) so
+    every writer can close its file normally; ``export`` then discards it.
+    """
+
+    def __init__(self, rows: Iterable, total: int, progress, cancel):
+        self.rows, self.total, self.progress, self.cancel = rows, total, progress, cancel
+        self.count = 0
+        self.cancelled = False
+
+    def __iter__(self):
+        for row in self.rows:
+            if self.count % PROGRESS_EVERY == 0 and not self._tick():
+                return
+            yield row
+            self.count += 1
+        self._tick()
+
+    def _tick(self) -> bool:
+        if self.cancel is not None and self.cancel.is_set():
+            self.cancelled = True
+            return False
+        if self.progress is not None:
+            self.progress(self.count, self.total)
+        return True
+
+
+def write_csv(path: str, headers: Sequence[str], rows: Iterable[Sequence], title: str = ""):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(headers)
+        w.writerows(rows)
+
+
+def write_xlsx(path: str, headers: Sequence[str], rows: Iterable[Sequence], title: str = ""):
+    from openpyxl import Workbook
+    # write_only streams rows to disk instead of building the sheet in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=(title or "Export")[:31])
+    ws.append(list(headers))
+    for r in rows:
+        ws.append(list(r))
+    wb.save(path)
+
+
+def write_pdf(path: str, headers: Sequence[str], rows: Iterable[Sequence], title: str = ""):
+    from reportlab.lib.pagesizes import A4, landscape
+    from reportlab.pdfgen import canvas
+
+    width, height = landscape(A4)
+    margin, line = 36, 14
+    col_w = (width - 2 * margin) / max(len(headers), 1)
+    max_chars = max(int(col_w / 5.2), 4)
+    c = canvas.Canvas(path, pagesize=(width, height))
+    page = 0
+
+    def cell(v) -> str:
+        text = "" if v is None else str(v).replace("\n", " ")
+        return text if len(text) <= max_chars else text[: max_chars - 1] + "…"
+
+    def new_page() -> float:
+        nonlocal page
+        if page:
+            c.showPage()
+        page += 1
+        y = height - margin
+        c.setFont("Helvetica-Bold", 13)
+        c.drawString(margin, y, f"{title}  (page {page})" if title else f"Page {page}")
+        y -= line * 1.6
+        c.setFont("Helvetica-Bold", 9)
+        for i, h in enumerate(headers):
+            c.drawString(margin + i * col_w, y, cell(h))
+        c.setFont("Helvetica", 9)
+        return y - line
+
+    y = new_page()
+    for r in rows:
+        if y < margin:
+            y = new_page()
+        for i, v in enumerate(r):
+            c.drawString(margin + i * col_w, y, cell(v))
+        y -= line
+    c.save()
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx, "pdf": write_pdf}
+
+
+def export(db, dataset: str, fmt: str, path: str,
+           progress: Optional[Callable[[int, int], None]] = None,
+           cancel: Optional[threading.Event] = None, **filters) -> int:
+    """Write *dataset* (see ``database.EXPORTS``) to *path*; returns rows written.
+
+    Raises ``ExportCancelled`` if *cancel* is set before the export finishes,
+    in which case *path* is left untouched.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}")
+    headers, total, rows = db.export_rows(dataset, **filters)
+    tracked = _Tracked(rows, total, progress, cancel)
+    tmp = path + ".part"
+    try:
+        WRITERS[fmt](tmp, headers, tracked, title=dataset.title())
+        if tracked.cancelled:
+            raise ExportCancelled()
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return tracked.count
@@ -0,0 +1,113 @@
+"""Streaming timetable import from CSV or XLSX.
+
+Expected columns (first row is a header): Batch, Day, Time, Subject, TeacherID.
+A blank Batch falls back to the batch being imported into; any other batch is
+reported as an error for that row.
+"""
+import csv
+import os
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from app.schedule import format_time_slot, normalize_day, start_minute
+
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (row number, message)
+    rolled_back: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    def summary(self, max_errors: int = 15) -> str:
+        if self.ok:
+            return f"Imported {self.inserted} timetable rows"
+        head = "Nothing imported" if self.rolled_back else f"Imported {self.inserted} rows, skipped {len(self.errors)}"
+        lines = [f"Row {n}: {msg}" for n, msg in self.errors[:max_errors]]
+        if len(self.errors) > max_errors:
+            lines.append(f"… {len(self.errors) - max_errors} more")
+        return head + ":\n" + "\n".join(lines)
+
+
+class _Abort(Exception):
+    """Raised from the row stream so the surrounding transaction rolls back."""
+
+
+def iter_source_rows(path: str) -> Iterator[Tuple[int, Sequence]]:
+    """Yield ``(row_number, values)`` for each data row without loading the whole file."""
+    if os.path.splitext(path)[1].lower() in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            for n, row in enumerate(wb.active.iter_rows(min_row=2, values_only=True), start=2):
+                yield n, row
+        finally:
+            wb.close()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            for n, row in enumerate(reader, start=2):
+                yield n, row
+
+
+def validate_row(values: Sequence, default_batch: str, teacher_ids) -> Tuple[Optional[tuple], Optional[str]]:
+    """Return ``((batch, day, time_slot, subject, teacher_id), None)`` or ``(None, error)``."""
+    batch, day, tm, subj, tid = (list(values) + [None] * 5)[:5]
+    batch = str(batch).strip() if batch not in (None, "") else default_batch
+    if not batch:
+        return None, "missing batch"
+    if batch != default_batch:
+        return None, f"batch {batch!r} does not match {default_batch!r}"
+    d = normalize_day(day)
+    if d is None:
+        return None, f"invalid day {day!r}"
+    slot = format_time_slot(tm)
+    if start_minute(slot) is None:
+        return None, f"invalid time {tm!r}"
+    subj = str(subj or "").strip()
+    if not subj:
+        return None, "missing subject"
+    if tid in (None, ""):
+        teacher = None
+    else:
+        try:
+            teacher = int(float(str(tid).strip()))
+        except ValueError:
+            return None, f"invalid teacher id {tid!r}"
+        if teacher not in teacher_ids:
+            return None, f"unknown teacher id {teacher}"
+    return (batch, d, slot, subj, teacher), None
+
+
+def import_timetable(db, path: str, batch: str, strict: bool = True) -> ImportReport:
+    """Replace *batch*'s timetable with the rows in *path*.
+
+    Rows are streamed, validated and written with a single ``executemany`` in
+    one transaction. With *strict* any invalid row rolls the whole import
+    back (the existing timetable stays untouched); otherwise invalid rows are
+    skipped. Either way the report lists every rejected row.
+    """
+    report = ImportReport()
+    teacher_ids = {t[0] for t in db.list_teachers()}
+
+    def rows():
+        for n, values in iter_source_rows(path):
+            if all(v in (None, "") or str(v).strip() == "" for v in values):
+                continue
+            row, error = validate_row(values, batch, teacher_ids)
+            if error:
+                report.errors.append((n, error))
+            elif not (strict and report.errors):
+                yield row
+        if strict and report.errors:
+            raise _Abort()
+
+    try:
+        report.inserted = db.replace_timetable(batch, rows())
+    except _Abort:
+        report.rolled_back = True
+    return report
@@ -0,0 +1,92 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+def id_prefix_ranges(prefix: str, upper: int) -> List[Tuple[int, int]]:
+    """Inclusive id ranges whose decimal form starts with *prefix*, up to *upper*.
+
+    "12" with upper 1500 gives (12, 12), (120, 129), (1200, 1299): ascending
+    and disjoint, so reading them in turn lists the matches in id order.
+    """
+    if not prefix.isdigit() or prefix.startswith("0"):
+        return []
+    lo = hi = int(prefix)
+    ranges = []
+    while lo <= upper:
+        ranges.append((lo, min(hi, upper)))
+        lo, hi = lo * 10, hi * 10 + 9
+    return ranges
+
+
+class StudentIndex:
+    """Sorted in-memory prefix index over student ids, usernames and names.
+
+    Usage:
+        index = db.student_index
+        index.match("12")     # ids 12, 120-129, 1200-...
+        index.match("riya s") # name, any name word or username prefix
+
+    Rows are ``(id, name, class, username, batch)``, as returned by
+    ``Database.student_directory``. The index reloads itself on the next
+    lookup after a write to Students through the same Database (tracked by
+    ``Database.generation``), so the first lookup after an edit pays for
+    one full read; every other lookup is a couple of bisects.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._generation: Optional[int] = None
+        self._rows: Dict[int, Tuple] = {}
+        self._ids: List[int] = []
+        # (casefolded text, id): username, full name and each later name word
+        self._keys: List[Tuple[str, int]] = []
+
+    def _current(self):
+        with self._lock:
+            generation = self.db.generation("Students")
+            if generation != self._generation:
+                self._load(self.db.student_directory())
+                self._generation = generation
+            return self._rows, self._ids, self._keys
+
+    def _load(self, rows):
+        self._rows = {r[0]: r for r in rows}
+        self._ids = sorted(self._rows)
+        keys = []
+        for sid, name, _cls, username, _batch in rows:
+            if username:
+                keys.append((username.casefold(), sid))
+            words = (name or "").casefold().split()
+            if words:
+                keys.append((" ".join(words), sid))
+                keys.extend((word, sid) for word in words[1:])
+        keys.sort()
+        self._keys = keys
+
+    def match(self, text: str, limit: int = 20) -> List[Tuple]:
+        """Students whose id, username, name or a name word starts with *text*.
+
+        Id matches come first in id order, then the rest alphabetically.
+        """
+        text = " ".join(text.casefold().split())
+        if not text:
+            return []
+        rows, ids, keys = self._current()
+        found: Dict[int, None] = {}
+        if ids:
+            for lo, hi in id_prefix_ranges(text, ids[-1]):
+                start = bisect.bisect_left(ids, lo)
+                for sid in ids[start:bisect.bisect_right(ids, hi, lo=start)][:limit - len(found)]:
+                    found[sid] = None
+                if len(found) >= limit:
+                    break
+        i = bisect.bisect_left(keys, (text,))
+        while len(found) < limit and i < len(keys) and keys[i][0].startswith(text):
+            found[keys[i][1]] = None
+            i += 1
+        return [rows[sid] for sid in found]
+
+    def __len__(self) -> int:
+        return len(self._current()[0])
@@ -0,0 +1,519 @@
+"""Numbered schema migrations tracked with ``PRAGMA user_version``.
+
+Each migration runs exactly once, in order, inside the same transaction as the
+``user_version`` bump. To change the schema append a new ``(version, func)``
+entry to ``MIGRATIONS``; never edit one that has already shipped.
+"""
+import sqlite3
+from typing import Callable, List, Tuple
+
+from app.schedule import day_index, week_minute
+
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    cur.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cur.fetchall())
+
+
+def _m001_baseline(cur):
+    # Tables as they existed before versioning; IF NOT EXISTS keeps this safe
+    # for databases created by earlier releases.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Admin (
+            username TEXT PRIMARY KEY,
+            password TEXT NOT NULL
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            age INTEGER,
+            class TEXT,
+            contact TEXT,
+            email TEXT,
+            username TEXT UNIQUE,
+            password TEXT,
+            batch TEXT,
+            parent_contact TEXT DEFAULT '' NOT NULL,
+            student_contact TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            subject TEXT,
+            time TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Attendance (
+            student_id INTEGER,
+            date TEXT,
+            status TEXT,
+            PRIMARY KEY (student_id, date)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Fees (
+            student_id INTEGER PRIMARY KEY,
+            amount_paid REAL DEFAULT 0,
+            pending_amount REAL DEFAULT 0,
+            last_payment_date TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Performance (
+            student_id INTEGER,
+            subject TEXT,
+            marks REAL,
+            date TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            message_text TEXT,
+            date_sent TEXT,
+            sender_type TEXT,
+            recipient TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Teachers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            subjects TEXT,
+            availability TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Timetable (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch TEXT,
+            day TEXT,
+            time_slot TEXT,
+            subject TEXT,
+            teacher_id INTEGER
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Homework (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch TEXT,
+            title TEXT,
+            due_date TEXT,
+            description TEXT,
+            posted_at TEXT,
+            is_optional INTEGER DEFAULT 0
+        )
+        """
+    )
+    # columns added after the first release
+    if not _column_exists(cur, "Students", "parent_contact"):
+        cur.execute("ALTER TABLE Students ADD COLUMN parent_contact TEXT DEFAULT '' NOT NULL")
+    if not _column_exists(cur, "Students", "student_contact"):
+        cur.execute("ALTER TABLE Students ADD COLUMN student_contact TEXT")
+    if not _column_exists(cur, "Batches", "time"):
+        cur.execute("ALTER TABLE Batches ADD COLUMN time TEXT")
+
+    # default admin
+    cur.execute("INSERT OR IGNORE INTO Admin(username, password) VALUES(?, ?)", ("admin", "admin1"))
+
+
+def _m002_lookup_indexes(cur):
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON Students(name)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_students_batch ON Students(batch, name)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date ON Attendance(date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_performance_student ON Performance(student_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_recipient ON Messages(recipient, date_sent)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_date ON Messages(date_sent)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_timetable_batch ON Timetable(batch, day, time_slot)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_homework_batch ON Homework(batch, due_date)")
+    cur.execute("ANALYZE")
+
+
+def _m003_students_fts(cur):
+    # External-content FTS index over the searchable Students columns. SQLite
+    # builds without FTS5 skip this and Database falls back to LIKE scans.
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS StudentsFTS USING fts5(
+                name, class, batch, username,
+                content='Students', content_rowid='id',
+                prefix='1 2 3'
+            )
+            """
+        )
+    except sqlite3.OperationalError:
+        return
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_fts_ai AFTER INSERT ON Students BEGIN
+            INSERT INTO StudentsFTS(rowid, name, class, batch, username)
+            VALUES (new.id, new.name, new.class, new.batch, new.username);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_fts_ad AFTER DELETE ON Students BEGIN
+            INSERT INTO StudentsFTS(StudentsFTS, rowid, name, class, batch, username)
+            VALUES ('delete', old.id, old.name, old.class, old.batch, old.username);
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_students_fts_au
+        AFTER UPDATE OF name, class, batch, username ON Students BEGIN
+            INSERT INTO StudentsFTS(StudentsFTS, rowid, name, class, batch, username)
+            VALUES ('delete', old.id, old.name, old.class, old.batch, old.username);
+            INSERT INTO StudentsFTS(rowid, name, class, batch, username)
+            VALUES (new.id, new.name, new.class, new.batch, new.username);
+        END
+        """
+    )
+    cur.execute("INSERT INTO StudentsFTS(StudentsFTS) VALUES ('rebuild')")
+
+
+def rebuild_attendance_summary(cur):
+    """Recompute every AttendanceSummary row from the Attendance table."""
+    cur.execute("DELETE FROM AttendanceSummary")
+    cur.execute(
+        """
+        INSERT INTO AttendanceSummary(scope, key, total, present)
+        SELECT 'all', '', COUNT(*), COALESCE(SUM(status='Present'), 0) FROM Attendance
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO AttendanceSummary(scope, key, total, present)
+        SELECT 'student', CAST(student_id AS TEXT), COUNT(*), SUM(status='Present')
+        FROM Attendance GROUP BY student_id
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO AttendanceSummary(scope, key, total, present)
+        SELECT 'batch', s.batch, COUNT(*), SUM(a.status='Present')
+        FROM Attendance a JOIN Students s ON s.id = a.student_id
+        WHERE s.batch IS NOT NULL
+        GROUP BY s.batch
+        """
+    )
+
+
+def _attendance_delta_sql(row: str, sign: str) -> str:
+    # Add (sign) one attendance row to the global, student and batch totals.
+    return f"""
+        INSERT INTO AttendanceSummary(scope, key, total, present)
+        SELECT 'all', '', {sign}1, {sign}({row}.status='Present')
+        UNION ALL
+        SELECT 'student', CAST({row}.student_id AS TEXT), {sign}1, {sign}({row}.status='Present')
+        UNION ALL
+        SELECT 'batch', batch, {sign}1, {sign}({row}.status='Present')
+        FROM Students WHERE id = {row}.student_id AND batch IS NOT NULL
+        ON CONFLICT(scope, key) DO UPDATE SET
+            total = total + excluded.total,
+            present = present + excluded.present;
+    """
+
+
+def _batch_move_sql(batch: str, sign: str) -> str:
+    # Add (sign) a student's totals to one batch row when the student changes batch.
+    return f"""
+        INSERT INTO AttendanceSummary(scope, key, total, present)
+        SELECT 'batch', {batch}, {sign}total, {sign}present
+        FROM AttendanceSummary
+        WHERE scope = 'student' AND key = CAST(old.id AS TEXT) AND {batch} IS NOT NULL
+        ON CONFLICT(scope, key) DO UPDATE SET
+            total = total + excluded.total,
+            present = present + excluded.present;
+    """
+
+
+def _m004_attendance_summary(cur):
+    # Per-scope attendance totals kept current by triggers so percentages are a
+    # single primary-key read. scope is 'all' (key ''), 'student' (key = id as
+    # text) or 'batch' (key = batch name).
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS AttendanceSummary (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            present INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, key)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_ai AFTER INSERT ON Attendance BEGIN
+            {_attendance_delta_sql("new", "+")}
+        END
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_ad AFTER DELETE ON Attendance BEGIN
+            {_attendance_delta_sql("old", "-")}
+        END
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_au
+        AFTER UPDATE OF student_id, status ON Attendance BEGIN
+            {_attendance_delta_sql("old", "-")}
+            {_attendance_delta_sql("new", "+")}
+        END
+        """
+    )
+    cur.execute(
+        f"""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_student_batch
+        AFTER UPDATE OF batch ON Students WHEN old.batch IS NOT new.batch BEGIN
+            {_batch_move_sql("old.batch", "-")}
+            {_batch_move_sql("new.batch", "+")}
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_summary_student_ad AFTER DELETE ON Students BEGIN
+            DELETE FROM AttendanceSummary WHERE scope = 'student' AND key = CAST(old.id AS TEXT);
+        END
+        """
+    )
+    rebuild_attendance_summary(cur)
+
+
+def rebuild_fees(cur):
+    """Recompute the Fees balance cache and PaymentTotals from the Payments ledger."""
+    cur.execute(
+        """
+        UPDATE Fees SET amount_paid = 0, pending_amount = 0, last_payment_date = NULL
+        WHERE student_id NOT IN (SELECT student_id FROM Payments)
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO Fees(student_id, amount_paid, pending_amount, last_payment_date)
+        SELECT student_id, amount_paid, pending_amount, last_payment_date FROM FeeBalances
+        WHERE student_id IN (SELECT id FROM Students)
+        ON CONFLICT(student_id) DO UPDATE SET
+            amount_paid = excluded.amount_paid,
+            pending_amount = excluded.pending_amount,
+            last_payment_date = excluded.last_payment_date
+        """
+    )
+    cur.execute("DELETE FROM PaymentTotals")
+    cur.execute(
+        """
+        INSERT INTO PaymentTotals(day, batch, total, entries)
+        SELECT date, COALESCE(batch, ''), SUM(amount), COUNT(*) FROM Payments GROUP BY date, COALESCE(batch, '')
+        """
+    )
+
+
+def _m005_payments_ledger(cur):
+    # Payments is the append-only source of truth; corrections are new
+    # (negative) entries. Fees becomes a per-student balance cache and
+    # PaymentTotals a per-day, per-batch rollup, both fed by the insert
+    # trigger. batch is the student's batch when the payment was made.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS Payments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            amount REAL NOT NULL,
+            pending_after REAL NOT NULL DEFAULT 0,
+            batch TEXT,
+            note TEXT NOT NULL DEFAULT ''
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payments_student ON Payments(student_id, date)")
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS PaymentTotals (
+            day TEXT NOT NULL,
+            batch TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, batch)
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_payment_totals_batch ON PaymentTotals(batch, day)")
+    cur.execute(
+        """
+        CREATE VIEW IF NOT EXISTS FeeBalances AS
+        SELECT p.student_id,
+               SUM(p.amount) AS amount_paid,
+               (SELECT q.pending_after FROM Payments q WHERE q.student_id = p.student_id
+                ORDER BY q.date DESC, q.id DESC LIMIT 1) AS pending_amount,
+               MAX(p.date) AS last_payment_date
+        FROM Payments p
+        GROUP BY p.student_id
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_no_update BEFORE UPDATE ON Payments BEGIN
+            SELECT RAISE(ABORT, 'Payments is append-only; record a correcting entry instead');
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_no_delete BEFORE DELETE ON Payments BEGIN
+            SELECT RAISE(ABORT, 'Payments is append-only; record a correcting entry instead');
+        END
+        """
+    )
+    cur.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_payments_ai AFTER INSERT ON Payments BEGIN
+            INSERT INTO Fees(student_id, amount_paid, pending_amount, last_payment_date)
+            VALUES (new.student_id, new.amount, new.pending_after, new.date)
+            ON CONFLICT(student_id) DO UPDATE SET
+                amount_paid = amount_paid + excluded.amount_paid,
+                pending_amount = CASE
+                    WHEN last_payment_date IS NULL OR excluded.last_payment_date >= last_payment_date
+                    THEN excluded.pending_amount ELSE pending_amount END,
+                last_payment_date = MAX(COALESCE(last_payment_date, ''), excluded.last_payment_date);
+            INSERT INTO PaymentTotals(day, batch, total, entries)
+            VALUES (new.date, COALESCE(new.batch, ''), new.amount, 1)
+            ON CONFLICT(day, batch) DO UPDATE SET
+                total = total + excluded.total,
+                entries = entries + 1;
+        END
+        """
+    )
+    # Carry existing balances over as one opening entry per student.
+    cur.execute(
+        """
+        INSERT INTO Payments(student_id, date, amount, pending_after, batch, note)
+        SELECT f.student_id, COALESCE(f.last_payment_date, date('now')), COALESCE(f.amount_paid, 0),
+               COALESCE(f.pending_amount, 0), s.batch, 'Opening balance'
+        FROM Fees f LEFT JOIN Students s ON s.id = f.student_id
+        WHERE COALESCE(f.amount_paid, 0) != 0 OR COALESCE(f.pending_amount, 0) != 0
+        """
+    )
+    rebuild_fees(cur)
+
+
+def _m006_performance_indexes(cur):
+    # (student_id, subject, date) serves a student's marks by subject and the
+    # per-test replace in record_marks_many; (subject, date, marks) covers
+    # per-test ranking. Not unique: existing data may hold two tests in one
+    # subject on the same day, and both marks are kept.
+    cur.execute("DROP INDEX IF EXISTS idx_performance_student")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_performance_student_subject ON Performance(student_id, subject, date)"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_performance_test ON Performance(subject, date, marks)")
+    cur.execute("ANALYZE Performance")
+
+
+def _m007_message_inbox(cur):
+    # Read state is a per-user high-water mark: every inbox message with a
+    # larger id is unread. (recipient, id) lets "recipient IN (user, 'all')
+    # AND id > ?" run as two index range scans.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS MessageReads (
+            username TEXT PRIMARY KEY,
+            last_read_id INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_messages_recipient_id ON Messages(recipient, id)")
+
+
+def _m008_timetable_week_minute(cur):
+    # Slots are free text ('4-5', '16:00', '9:30 AM'), so their start is
+    # parsed in Python (app.schedule) on every write. week_minute orders a
+    # batch's week correctly and (batch, week_minute) lets "next classes"
+    # be a range scan; unparseable rows keep NULL and never come up next.
+    for column in ("day_index", "week_minute"):
+        if not _column_exists(cur, "Timetable", column):
+            cur.execute(f"ALTER TABLE Timetable ADD COLUMN {column} INTEGER")
+    rows = cur.execute("SELECT id, day, time_slot FROM Timetable").fetchall()
+    cur.executemany(
+        "UPDATE Timetable SET day_index=?, week_minute=? WHERE id=?",
+        [(day_index(day), week_minute(day, slot), tid) for tid, day, slot in rows],
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_timetable_week ON Timetable(batch, week_minute)")
+    cur.execute("ANALYZE Timetable")
+
+
+MIGRATIONS: List[Tuple[int, Callable]] = [
+    (1, _m001_baseline),
+    (2, _m002_lookup_indexes),
+    (3, _m003_students_fts),
+    (4, _m004_attendance_summary),
+    (5, _m005_payments_ledger),
+    (6, _m006_performance_indexes),
+    (7, _m007_message_inbox),
+    (8, _m008_timetable_week_minute),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(con: sqlite3.Connection) -> List[int]:
+    """Apply pending migrations and return the versions that ran.
+
+    All pending steps share one transaction, so a failure leaves the schema at
+    its previous version.
+    """
+    version = current_version(con)
+    if version >= LATEST_VERSION:
+        return []
+    applied = []
+    cur = con.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # re-read under the write lock in case another process just migrated
+        version = current_version(con)
+        for number, step in MIGRATIONS:
+            if number <= version:
+                continue
+            step(cur)
+            cur.execute(f"PRAGMA user_version={number}")
+            applied.append(number)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return applied
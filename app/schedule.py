@@ -0,0 +1,61 @@
+import datetime
+import re
+from typing import Optional, Union
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+_TIME = r"(\d{1,2})(?:[:.](\d{2}))?\s*([ap]\.?m\.?)?"
+_SLOT_RE = re.compile(rf"^\s*{_TIME}\s*(?:(?:-|–|to)\s*{_TIME})?\s*$", re.IGNORECASE)
+
+
+def normalize_day(value) -> Optional[str]:
+    """'monday', 'MON', 'Mon.' -> 'Mon'; None if it is not a weekday."""
+    d3 = str(value or "").strip()[:3].title()
+    return d3 if d3 in DAYS else None
+
+
+def day_index(value) -> Optional[int]:
+    """0 = Monday … 6 = Sunday, or None."""
+    d = normalize_day(value)
+    return DAYS.index(d) if d else None
+
+
+def format_time_slot(value: Union[str, datetime.time, datetime.datetime, None]) -> str:
+    """Render spreadsheet time cells as 'HH:MM'; strings are only stripped."""
+    if isinstance(value, datetime.datetime):
+        value = value.time()
+    if isinstance(value, datetime.time):
+        return value.strftime("%H:%M")
+    return str(value or "").strip()
+
+
+def start_minute(time_slot) -> Optional[int]:
+    """Minute of the day a slot starts at, or None if it can't be parsed.
+
+    Accepts '16:00', '9:30 AM', '16:00-17:00' and the short batch slots such
+    as '4-5' / '6-7', where hours below 8 without am/pm are read as the
+    afternoon (classes run after school).
+    """
+    m = _SLOT_RE.match(format_time_slot(time_slot))
+    if not m:
+        return None
+    hour, minute, ampm = int(m.group(1)), int(m.group(2) or 0), (m.group(3) or "").lower()
+    if minute > 59 or hour > 23 or (ampm and not 1 <= hour <= 12):
+        return None
+    if ampm.startswith("p") and hour != 12:
+        hour += 12
+    elif ampm.startswith("a") and hour == 12:
+        hour = 0
+    elif not ampm and 1 <= hour < 8:
+        hour += 12
+    return hour * 60 + minute
+
+
+def week_minute(day, time_slot) -> Optional[int]:
+    """Minutes from Monday 00:00 to the start of a class, or None if either part can't be parsed."""
+    d, m = day_index(day), start_minute(time_slot)
+    if d is None or m is None:
+        return None
+    return d * MINUTES_PER_DAY + m
@@ -0,0 +1,238 @@
+"""Opt-in instrumentation of ``Database`` calls.
+
+``Database.enable_tracing()`` wraps the public query methods of that instance
+and installs ``sqlite3`` trace callbacks on its pooled connections. Every
+outermost call then records its wall time, rows returned, the SQL it ran and
+the UI view that made it. Calls at or above ``slow_ms`` get the
+``EXPLAIN QUERY PLAN`` of their statements written to a rotating log.
+
+``disable_tracing()`` removes the wrappers and callbacks again, so a Database
+that is not being traced runs exactly the code it would without this module.
+"""
+import datetime
+import functools
+import heapq
+import inspect
+import itertools
+import logging
+import logging.handlers
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.config import TRACE_SETTINGS
+
+# Database methods that are plumbing rather than queries
+UNTRACED = frozenset({
+    "connect", "close", "close_all", "enable_cache", "disable_cache", "cache_stats",
+    "generation", "query_plan", "enable_tracing", "disable_tracing", "tracer",
+})
+MAX_STATEMENTS = 20       # SQL statements kept per call
+MAX_EXPLAINED = 5         # statements explained per slow call
+_EXPLAINABLE = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE")
+
+log = logging.getLogger("app.slow_queries")
+log.propagate = False
+
+
+@dataclass
+class Call:
+    method: str
+    caller: str
+    ms: float
+    rows: Optional[int]
+    sql: Tuple[str, ...]
+    thread: str
+    at: datetime.datetime
+    plan: Tuple[str, ...] = ()   # filled in for slow calls
+
+
+@dataclass
+class MethodStats:
+    calls: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    rows: int = 0
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.calls if self.calls else 0.0
+
+
+class Tracer:
+    def __init__(self, slow_ms: Optional[float] = None, log_path: Optional[str] = None, top_n: Optional[int] = None):
+        s = TRACE_SETTINGS
+        self.slow_ms = s["slow_ms"] if slow_ms is None else slow_ms
+        self.log_path = log_path or s["log_path"]
+        self.top_n = top_n or s["top_n"]
+        self.db = None
+        self._names: List[str] = []
+        self._handler: Optional[logging.Handler] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self.reset()
+
+    # --- Session data ---
+    def reset(self):
+        with self._lock:
+            self._stats: Dict[str, MethodStats] = {}
+            self._slowest: List[Tuple[float, int, Call]] = []   # min-heap of the top_n slowest
+            self.started = datetime.datetime.now()
+
+    def slowest(self, n: Optional[int] = None) -> List[Call]:
+        """The slowest calls this session, slowest first."""
+        with self._lock:
+            calls = [c for _ms, _seq, c in sorted(self._slowest, reverse=True)]
+        return calls[:n] if n else calls
+
+    def method_stats(self) -> List[Tuple[str, MethodStats]]:
+        """(method, stats) pairs, most total time first."""
+        with self._lock:
+            items = [(name, MethodStats(**vars(st))) for name, st in self._stats.items()]
+        items.sort(key=lambda item: item[1].total_ms, reverse=True)
+        return items
+
+    def total_calls(self) -> int:
+        with self._lock:
+            return sum(st.calls for st in self._stats.values())
+
+    # --- Installation ---
+    def install(self, db):
+        """Wrap *db*'s query methods and trace its connections."""
+        self.db = db
+        for name, _fn in inspect.getmembers(type(db), inspect.isfunction):
+            if not name.startswith("_") and name not in UNTRACED:
+                # an instance attribute shadows the class method until uninstall()
+                setattr(db, name, self._wrap(name, getattr(db, name)))
+                self._names.append(name)
+        with db._pool_lock:
+            for con in db._pool:
+                self.attach(con)
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        self._handler = logging.handlers.RotatingFileHandler(
+            self.log_path, maxBytes=TRACE_SETTINGS["log_bytes"], backupCount=TRACE_SETTINGS["log_backups"],
+            encoding="utf-8", delay=True,
+        )
+        self._handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        log.addHandler(self._handler)
+        log.setLevel(logging.INFO)
+
+    def uninstall(self):
+        db, self.db = self.db, None
+        if db is None:
+            return
+        for name in self._names:
+            db.__dict__.pop(name, None)
+        self._names = []
+        with db._pool_lock:
+            for con in db._pool:
+                con.set_trace_callback(None)
+        if self._handler is not None:
+            log.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+    def attach(self, con: sqlite3.Connection):
+        con.set_trace_callback(self._statement)
+
+    # --- Recording ---
+    def _statement(self, sql: str):
+        # called by sqlite3 on the thread running the statement
+        statements = getattr(self._local, "sql", None)
+        if statements is None or len(statements) >= MAX_STATEMENTS:
+            return
+        if sql in ("BEGIN ", "COMMIT") or (statements and statements[-1] == sql):
+            return  # transaction noise; trigger bodies repeat the outer statement
+        statements.append(sql)
+
+    def _wrap(self, name: str, method):
+        local = self._local
+
+        @functools.wraps(method)
+        def traced(*args, **kwargs):
+            if getattr(local, "sql", None) is not None:
+                return method(*args, **kwargs)  # nested call: the outermost one is recorded
+            local.sql = []
+            result = None
+            t0 = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                return result
+            finally:
+                ms = (time.perf_counter() - t0) * 1000
+                sql, local.sql = tuple(local.sql), None
+                self._record(name, ms, _rows(result), sql)
+        return traced
+
+    def _record(self, name: str, ms: float, rows: Optional[int], sql: Tuple[str, ...]):
+        with self._lock:
+            st = self._stats.get(name)
+            if st is None:
+                st = self._stats[name] = MethodStats()
+            st.calls += 1
+            st.total_ms += ms
+            st.max_ms = max(st.max_ms, ms)
+            st.rows += rows or 0
+            ranked = len(self._slowest) < self.top_n or ms > self._slowest[0][0]
+        slow = ms >= self.slow_ms
+        if not (ranked or slow):
+            return  # the common case stops at the counters
+        call = Call(name, _caller(), ms, rows, sql, threading.current_thread().name, datetime.datetime.now())
+        if slow:
+            call.plan = self._explain(sql)
+            self._log_slow(call)
+        with self._lock:
+            entry = (ms, next(self._seq), call)
+            if len(self._slowest) < self.top_n:
+                heapq.heappush(self._slowest, entry)
+            elif ms > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def _explain(self, sql: Tuple[str, ...]) -> Tuple[str, ...]:
+        db = self.db
+        if db is None:
+            return ()
+        lines = []
+        for statement in [s for s in sql if s.lstrip().upper().startswith(_EXPLAINABLE)][:MAX_EXPLAINED]:
+            try:
+                rows = db.connect().execute(f"EXPLAIN QUERY PLAN {statement}").fetchall()
+            except sqlite3.Error as e:
+                rows = [(0, 0, 0, f"(not explained: {e})")]
+            lines.append(statement)
+            lines.extend(f"    {detail}" for _id, _parent, _unused, detail in rows)
+        return tuple(lines)
+
+    def _log_slow(self, call: Call):
+        rows = "-" if call.rows is None else f"{call.rows:,}"
+        body = "\n".join(f"  {line}" for line in call.plan) or "  (no SQL – cached or computed in Python)"
+        log.info("slow %s from %s: %.1f ms, %s rows [%s]\n%s", call.method, call.caller, call.ms, rows, call.thread, body)
+
+
+def _rows(result) -> Optional[int]:
+    # only sequences of rows count; dicts (e.g. dashboard_summary), single
+    # rows (a tuple of values) and scalars have no row count
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, tuple) and all(isinstance(r, (tuple, list)) for r in result):
+        return len(result)
+    return None
+
+
+def _caller() -> str:
+    """The UI code that made the current call, as ``View.method``."""
+    frame = sys._getframe(3)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.ui."):
+            owner = frame.f_locals.get("self")
+            where = type(owner).__name__ if owner is not None else module.rsplit(".", 1)[-1]
+            name = frame.f_code.co_name
+            # background loads run lambdas defined in the view; the view is what matters
+            return where if name == "<lambda>" else f"{where}.{name}"
+        frame = frame.f_back
+    return threading.current_thread().name
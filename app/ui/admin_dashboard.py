@@ -1,22 +1,30 @@
 import csv
 import datetime
+import functools
+import threading
 import customtkinter as ctk
-from tkinter import ttk, filedialog, messagebox
-from app.config import COLORS, FONTS
-from app.ui.components import GoldButton, Card, style_treeview, PanelSwitcher
+from tkinter import ttk, filedialog, messagebox, simpledialog
+from app.config import COLORS, FONTS, TRACE_SETTINGS
+from app.ui.components import GoldButton, Card, style_treeview, PanelSwitcher, KeyedTable, VirtualTable, StudentLookup, Debounce
+from app.ui.tasks import AsyncView
 
 
 class AdminApp(ctk.CTkFrame):
-    def __init__(self, master, db, on_logout, on_theme_change=None):
+    def __init__(self, master, db, on_logout, on_theme_change=None, tasks=None, monitor=None):
         super().__init__(master, fg_color=COLORS["bg1"]) 
         self.db = db
         self.on_logout = on_logout
         self.on_theme_change = on_theme_change
+        # BackgroundTasks shared by all views; None keeps loading synchronous
+        self.tasks = tasks
+        # optional UiMonitor timing view refreshes and panel transitions
+        self.monitor = monitor
 
         # Layout
         self.sidebar = ctk.CTkFrame(self, width=220, fg_color=COLORS["panel"], corner_radius=0)
         self.sidebar.pack(side="left", fill="y")
         self.content = PanelSwitcher(self)
+        self.content.monitor = monitor
         self.content.pack(side="right", fill="both", expand=True)
 
         title = ctk.CTkLabel(self.sidebar, text="Admin Panel", font=FONTS["h2"], text_color=COLORS["gold"]) 
@@ -28,21 +36,27 @@ class AdminApp(ctk.CTkFrame):
             values=["Aqua", "Light", "Dark"],
         )
         from app.config import CURRENT_MODE
-        mode_switch.set("Aqua" if CURRENT_MODE=="aqua" else ("Light" if CURRENT_MODE=="light" else "Dark"))
-        def _set_mode(val):
-            from app.config import set_theme
-            theme = val.lower()
-            set_theme(theme)
-            if self.on_theme_change:
-                self.on_theme_change(theme)
-            # rebuild views to apply palette
-            self._rebuild_views()
-        mode_switch.configure(command=_set_mode)
+        mode_switch.set(CURRENT_MODE.title())
+        mode_switch.configure(command=lambda val: self.set_theme(val.lower()))
         mode_switch.pack(fill="x", padx=12, pady=(0, 12))
 
-        self._rebuild_views()
+        # views are built on first navigation (see _view); most sessions open only a few
+        self.view_classes = {
+            "Dashboard": DashboardView,
+            "Students": StudentsView,
+            "Batches": BatchesView,
+            "Time Table": TimetableView,
+            "Attendance": AttendanceView,
+            "Fees": FeesView,
+            "Performance": PerformanceView,
+            "Messages": MessagesView,
+            "Analytics": AnalyticsView,
+            "Reports": ReportsView,
+            "Diagnostics": DiagnosticsView,
+        }
+        self.views = {}
 
-        for name in self.views:
+        for name in self.view_classes:
             btn = ctk.CTkButton(
                 self.sidebar,
                 text=name,
@@ -68,36 +82,56 @@ class AdminApp(ctk.CTkFrame):
         self.current_view = None
         self.show("Dashboard", animate=False)
 
-    def _rebuild_views(self):
-        # apply new palette to chrome
-        from app.config import COLORS
-        self.configure(fg_color=COLORS["bg1"])
-        self.sidebar.configure(fg_color=COLORS["panel"])
-        self.content.configure(fg_color=COLORS["bg1"])
-        # recreate view instances to apply new COLORS
-        self.views = {
-            "Dashboard": DashboardView(self.content, self.db),
-            "Students": StudentsView(self.content, self.db),
-            "Batches": BatchesView(self.content, self.db),
-            "Time Table": TimetableView(self.content, self.db),
-            "Attendance": AttendanceView(self.content, self.db),
-            "Fees": FeesView(self.content, self.db),
-            "Messages": MessagesView(self.content, self.db),
-        }
+    def set_theme(self, theme: str):
+        from app.config import set_theme
+        from app.ui.theme import restyle
+        if not set_theme(theme):
+            return
+        if self.on_theme_change:
+            self.on_theme_change(theme)
+        # recolour every built view in place; views built later read the new COLORS
+        restyle(self.winfo_toplevel())
+
+    def _view(self, name: str):
+        view = self.views.get(name)
+        if view is None:
+            cls = self.view_classes[name]
+            if self.monitor is None:
+                view = cls(self.content, self.db)
+            else:
+                with self.monitor.timed("build", cls.__name__):
+                    view = cls(self.content, self.db)
+            view.tasks = self.tasks
+            self.views[name] = view
+        return view
 
     def show(self, name: str, animate: bool = True):
-        view = self.views[name]
+        view = self._view(name)
+        if self.current_view is not None and self.current_view is not view:
+            # results still loading for the panel being left are dropped
+            self.current_view.cancel_loading()
         if self.current_view is view:
             # Already on this page: just refresh
-            view.refresh()
+            self._refresh(view)
             return
-        view.refresh()
+        self._refresh(view)
         if self.current_view is None or not animate:
             self.content.set(view)
         else:
             self.content.transition_to(view, direction=1)
         self.current_view = view
 
+    def _refresh(self, view):
+        if self.monitor is None:
+            view.refresh()
+        else:
+            with self.monitor.timed("refresh", type(view).__name__):
+                view.refresh()
+
+    def cancel_loading(self):
+        for view in self.views.values():
+            view.cancel_loading()
+
     def _logout(self):
         self.on_logout()
 
@@ -107,81 +141,91 @@ class AdminApp(ctk.CTkFrame):
         self.db.send_message("Timetable updated", datetime.now().isoformat(sep=' ', timespec='seconds'), "admin", "all")
 
 
-class DashboardView(ctk.CTkFrame):
+class DashboardView(AsyncView, ctk.CTkFrame):
+    AUTO_REFRESH_MS = 60_000   # numbers and rows are re-read this often while the view is shown
+    ANNOUNCEMENTS = 10         # latest broadcasts listed
+
     def __init__(self, master, db):
         super().__init__(master, fg_color=COLORS["bg1"])  
         self.db = db
-        self.cards = []
-        self.bottom_frames = []
+        self._refresh_id = None
 
-    def refresh(self):
-        for c in self.cards:
-            c.destroy()
-        self.cards.clear()
-        for f in self.bottom_frames:
-            f.destroy()
-        self.bottom_frames.clear()
         # Metrics
-        total_students = len(self.db.list_students())
-        total_batches = len(self.db.list_batches())
-        fees_collected = self.db.get_fees() or 0
-        attendance_pct = self.db.attendance_percentage()
-
         grid = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
         grid.pack(fill="x", padx=16, pady=(16, 8))
-        metrics = [
-            ("Total Students", str(total_students)),
-            ("Total Batches", str(total_batches)),
-            ("Fees Collected", f"₹ {fees_collected:.2f}"),
-            ("Attendance %", f"{attendance_pct}%"),
-        ]
-        for i, (t, v) in enumerate(metrics):
-            card = Card(grid, t, v)
+        titles = ("Total Students", "Total Batches", "Fees Collected", "Attendance %")
+        self.cards = []
+        for i, t in enumerate(titles):
+            card = Card(grid, t, "-")
             card.grid(row=0, column=i, padx=8, pady=8, sticky="nsew")
-            self.cards.append(card)
-        for i in range(len(metrics)):
             grid.grid_columnconfigure(i, weight=1)
+            self.cards.append(card)
 
         # Recent students
         recent_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         recent_frame.pack(fill="both", expand=True, padx=16, pady=8)
         ctk.CTkLabel(recent_frame, text="Recent Students", text_color=COLORS["gold"], font=FONTS["h2"]).pack(anchor="w", padx=12, pady=6)
-        cols = ("ID", "Name", "Class", "Batch")
-        tv = ttk.Treeview(recent_frame, columns=cols, show="headings", height=6)
-        for c in cols:
-            tv.heading(c, text=c)
-            tv.column(c, width=140, anchor="w")
-        tv.pack(fill="both", expand=True, padx=12, pady=8)
-        style_treeview(tv)
-        rows = self.db.list_students()
-        for r in rows[-10:]:
-            tv.insert('', 'end', values=(r[0], r[1], r[3], r[7]))
-        self.bottom_frames.append(recent_frame)
+        self.recent = KeyedTable(recent_frame, ("ID", "Name", "Class", "Batch"), column_width=140, height=6)
+        self.recent.pack(fill="both", expand=True, padx=12, pady=8)
 
         # Announcements preview
         ann_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         ann_frame.pack(fill="both", expand=True, padx=16, pady=(0, 16))
         ctk.CTkLabel(ann_frame, text="Latest Announcements", text_color=COLORS["gold"], font=FONTS["h2"]).pack(anchor="w", padx=12, pady=6)
-        cols2 = ("Message", "Date", "Sender")
-        tv2 = ttk.Treeview(ann_frame, columns=cols2, show="headings", height=5)
-        for c in cols2:
-            tv2.heading(c, text=c)
-            tv2.column(c, width=220, anchor="w")
-        tv2.pack(fill="both", expand=True, padx=12, pady=8)
-        style_treeview(tv2)
-        for m, d, s in self.db.list_messages_for("all")[:10]:
-            tv2.insert('', 'end', values=(m, d, s))
-        self.bottom_frames.append(ann_frame)
-
-
-class StudentsView(ctk.CTkFrame):
+        self.announcements = KeyedTable(ann_frame, ("Message", "Date", "Sender"), key=lambda r: r[0],
+                                        values=lambda r: r[1:], column_width=220, height=5)
+        self.announcements.pack(fill="both", expand=True, padx=12, pady=8)
+
+    def refresh(self, quiet: bool = False):
+        self.load(lambda: (self.db.dashboard_summary(), self.db.inbox("all", limit=self.ANNOUNCEMENTS)), self._render,
+                  quiet=quiet)
+        self._schedule_refresh()
+
+    def _render(self, data):
+        summary, messages = data
+        values = (
+            str(summary["students"]),
+            str(summary["batches"]),
+            f"₹ {summary['fees_collected']:.2f}",
+            f"{summary['attendance_pct']}%",
+        )
+        for card, value in zip(self.cards, values):
+            card.set_value(value)
+        self.recent.set_rows(summary["recent_students"])
+        self.announcements.set_rows(messages)
+
+    def _schedule_refresh(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+        self._refresh_id = self.after(self.AUTO_REFRESH_MS, self._auto_refresh)
+
+    def _auto_refresh(self):
+        self._refresh_id = None
+        if self.winfo_ismapped():
+            self.refresh(quiet=True)
+        else:
+            self._schedule_refresh()
+
+    def destroy(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        super().destroy()
+
+
+class StudentsView(AsyncView, ctk.CTkFrame):
+    SEARCH_LIMIT = 500
+
     def __init__(self, master, db):
         super().__init__(master, fg_color=COLORS["bg1"]) 
         self.db = db
+        self.query = ""
         top = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
         top.pack(fill="x", padx=12, pady=8)
-        self.search = ctk.CTkEntry(top, placeholder_text="Search by name/class/batch")
+        self.search = ctk.CTkEntry(top, placeholder_text="Search by name/class/batch/username")
         self.search.pack(side="left", padx=6)
+        self.search.bind("<Return>", lambda _e: self.refresh())
+        self.search.bind("<KeyRelease>", Debounce(self, 300, self._on_search_change))
         ctk.CTkButton(top, text="Search", command=self.refresh, fg_color=COLORS["gold"], text_color=COLORS["bg1"]).pack(side="left", padx=6)
         GoldButton(top, text="Add Student", command=self._add_dialog).pack(side="right", padx=6)
 
@@ -189,12 +233,10 @@ class StudentsView(ctk.CTkFrame):
         table_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         table_frame.pack(fill="both", expand=True, padx=12, pady=8)
         cols = ("ID", "Username", "Password", "Name", "Age", "Class", "Contact", "Email", "Batch", "Parent Contact", "Student Contact")
-        self.table = ttk.Treeview(table_frame, columns=cols, show="headings")
-        for c in cols:
-            self.table.heading(c, text=c)
-            self.table.column(c, width=120, anchor="w")
-        self.table.pack(fill="both", expand=True, padx=8, pady=8)
-        style_treeview(self.table)
+        self.rows = VirtualTable(table_frame, cols, fetch=self._fetch_page, cursor=lambda r: (r[3], r[0]),
+                                 loader=functools.partial(self.load, key="rows"))
+        self.rows.pack(fill="both", expand=True, padx=8, pady=8)
+        self.table = self.rows.tree
 
         # actions
         actions = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
@@ -206,12 +248,36 @@ class StudentsView(ctk.CTkFrame):
     def _batch_names(self):
         return [name for name, _subj, _time in self.db.list_batches()]
 
+    def _fetch_page(self, after, limit):
+        # runs on a worker thread: use the query captured by refresh()
+        if self.query:
+            # ranked search results are capped rather than paged
+            return [] if after is not None else self._search(self.query)
+        return self.db.list_students_page(after, limit, full_order=True)
+
+    def _search(self, query):
+        rows = self.db.list_students_full_order(query, limit=self.SEARCH_LIMIT)
+        if not query.isdigit():
+            return rows
+        # digits: students whose id starts with them first, then the text matches (e.g. class)
+        ids = [r[0] for r in self.db.student_index.match(query, self.SEARCH_LIMIT) if str(r[0]).startswith(query)]
+        seen = set(ids)
+        first = self.db.list_students_by_ids(ids, full_order=True)
+        return first + [r for r in rows if r[0] not in seen][:self.SEARCH_LIMIT - len(first)]
+
+    def _on_search_change(self):
+        # search as you type, once typing pauses
+        if self.search.get().strip() != self.query:
+            self.refresh()
+
     def refresh(self):
-        for i in self.table.get_children():
-            self.table.delete(i)
-        rows = self.db.list_students_full_order(self.search.get().strip())
-        for r in rows:
-            self.table.insert('', 'end', values=r)
+        query = self.search.get().strip()
+        if query == self.query and len(self.rows):
+            # same listing (e.g. after an edit): only changed rows are touched
+            self.rows.reload()
+            return
+        self.query = query
+        self.rows.reset()
 
     def _add_dialog(self):
         Dialogs.student_form(self, title="Add Student", on_submit=self._add_student, batch_options=self._batch_names())
@@ -302,7 +368,7 @@ class StudentsView(ctk.CTkFrame):
         GoldButton(win, text="Save", command=do).pack(pady=12)
 
 
-class BatchesView(ctk.CTkFrame):
+class BatchesView(AsyncView, ctk.CTkFrame):
     SUBJECT_CHOICES = ["Maths", "Science", "English", "Physics", "Chemistry", "Biology"]
     TIME_CHOICES = ["4-5", "6-7", "7-8"]
 
@@ -337,21 +403,17 @@ class BatchesView(ctk.CTkFrame):
         table_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         table_frame.pack(fill="both", expand=True, padx=12, pady=8)
         cols = ("Batch", "Subject", "Time")
-        self.table = ttk.Treeview(table_frame, columns=cols, show="headings")
-        for c in cols:
-            self.table.heading(c, text=c)
-            self.table.column(c, width=160, anchor="w")
-        self.table.pack(fill="both", expand=True, padx=8, pady=8)
-        style_treeview(self.table)
+        self.rows = KeyedTable(table_frame, cols, key=lambda r: r[0],
+                               values=lambda r: (r[0], r[1], r[2] or "-"), column_width=160)
+        self.rows.pack(fill="both", expand=True, padx=8, pady=8)
+        self.table = self.rows.tree
         ctk.CTkButton(self, text="Delete Selected", fg_color="#7a1f1f", hover_color="#953232", command=self._delete).pack(pady=8)
 
     def refresh(self):
-        # refresh table
-        for i in self.table.get_children():
-            self.table.delete(i)
-        batches = self.db.list_batches()
-        for name, subj, time in batches:
-            self.table.insert('', 'end', values=(name, subj, time or "-"))
+        self.load(self.db.list_batches, self._render)
+
+    def _render(self, batches):
+        self.rows.set_rows(batches)
         # refresh dropdown
         items = [f"{name} — {subj} — {time or '-'}" for name, subj, time in batches]
         self.batch_dropdown["values"] = items
@@ -378,46 +440,153 @@ class BatchesView(ctk.CTkFrame):
             self.refresh()
 
 
-class AttendanceView(ctk.CTkFrame):
+class AttendanceView(AsyncView, ctk.CTkFrame):
+    ALL_BATCHES = "All batches"
+
     def __init__(self, master, db):
         super().__init__(master, fg_color=COLORS["bg1"]) 
         self.db = db
+        # roster mode: pending status per student id, saved in one transaction
+        self.roster = {}
+        # batch (None = all) and date the table was loaded for
+        self.shown_batch = None
+        self.shown_date = None
+        # item id to select once it has been loaded (see _find_student)
+        self.focus_sid = None
         top = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
         top.pack(fill="x", padx=12, pady=8)
         self.date = ctk.CTkEntry(top, placeholder_text="Date (YYYY-MM-DD)")
         self.date.pack(side="left", padx=6)
+        self.batch = ctk.CTkComboBox(top, values=[self.ALL_BATCHES], width=160, command=lambda _v: self.refresh())
+        self.batch.set(self.ALL_BATCHES)
+        self.batch.pack(side="left", padx=6)
         self.status = ctk.CTkSegmentedButton(top, values=["Present", "Absent"])
         self.status.pack(side="left", padx=6)
         GoldButton(top, text="Mark Selected", command=self._mark).pack(side="left", padx=6)
 
+        roster = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
+        roster.pack(fill="x", padx=12)
+        GoldButton(roster, text="Load Roster", command=self.refresh).pack(side="left", padx=6)
+        ctk.CTkButton(roster, text="All Present", fg_color="#444444", hover_color="#555555",
+                      command=lambda: self._set_all("Present")).pack(side="left", padx=6)
+        ctk.CTkButton(roster, text="All Absent", fg_color="#444444", hover_color="#555555",
+                      command=lambda: self._set_all("Absent")).pack(side="left", padx=6)
+        GoldButton(roster, text="Save Roster", command=self._save_roster).pack(side="left", padx=6)
+        ctk.CTkLabel(roster, text="Pick a batch, double-click rows to toggle, then save once.",
+                     text_color=COLORS["muted"]).pack(side="left", padx=6)
+
+        find = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
+        find.pack(fill="x", padx=12, pady=(8, 0))
+        ctk.CTkLabel(find, text="Find student:", text_color=COLORS["gold"]).pack(side="left", padx=6)
+        StudentLookup(find, db.student_index, on_pick=self._find_student,
+                      loader=functools.partial(self.load, key="lookup", quiet=True)).pack(side="left", padx=6)
+
         table_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         table_frame.pack(fill="both", expand=True, padx=12, pady=8)
-        cols = ("ID", "Name", "Batch")
-        self.table = ttk.Treeview(table_frame, columns=cols, show="headings")
-        for c in cols:
-            self.table.heading(c, text=c)
-            self.table.column(c, width=140, anchor="w")
-        self.table.pack(fill="both", expand=True, padx=8, pady=8)
-        style_treeview(self.table)
+        cols = ("ID", "Name", "Batch", "Status")
+        # roster rows keep None for unmarked students (so they aren't saved); show "-"
+        self.rows = VirtualTable(table_frame, cols, fetch=self._fetch_page, cursor=lambda r: (r[1], r[0]),
+                                 values=lambda r: (r[0], r[1], r[2], r[3] or "-"), column_width=140,
+                                 loader=functools.partial(self.load, key="rows"), on_page=self._on_page)
+        self.rows.pack(fill="both", expand=True, padx=8, pady=8)
+        self.table = self.rows.tree
+        self.table.bind("<Double-1>", self._toggle_row)
+
+    def _date(self) -> str:
+        return self.date.get().strip() or datetime.date.today().isoformat()
+
+    def _roster_batch(self):
+        b = self.batch.get().strip()
+        return None if not b or b == self.ALL_BATCHES else b
+
+    def _fetch_page(self, after, limit):
+        # runs on a worker thread: use the batch/date captured by refresh()
+        if self.shown_batch is None:
+            return [(r[0], r[1], r[7], "") for r in self.db.list_students_page(after, limit)]
+        if after is not None:
+            return []
+        # a roster is one batch, loaded whole so it can be saved at once
+        return self.db.attendance_roster(self.shown_batch, self.shown_date)
+
+    def _on_page(self, rows):
+        if self.shown_batch is not None:
+            self.roster.update({sid: status for sid, _name, _b, status in rows})
+        if self.focus_sid is not None and self.table.exists(self.focus_sid):
+            self._select(self.focus_sid)
+            self.focus_sid = None
+
+    def _find_student(self, row):
+        # jump to the student's row, loading their batch's roster if it isn't shown
+        if row is None:
+            return
+        iid, batch = str(row[0]), row[4]
+        if self.table.exists(iid):
+            self._select(iid)
+        elif batch:
+            self.focus_sid = iid
+            self.batch.set(batch)
+            self.refresh()
+
+    def _select(self, iid: str):
+        self.table.selection_set(iid)
+        self.table.focus(iid)
+        self.table.see(iid)
 
     def refresh(self):
-        for i in self.table.get_children():
-            self.table.delete(i)
-        for r in self.db.list_students():
-            self.table.insert('', 'end', values=(r[0], r[1], r[7]))
+        self.load(self.db.list_batches, self._set_batches, key="batches")
+        self.shown_batch = self._roster_batch()
+        self.shown_date = self._date()
+        self.roster = {}
+        self.rows.reset()
+
+    def _set_batches(self, batches):
+        self.batch.configure(values=[self.ALL_BATCHES] + [name for name, _s, _t in batches])
+
+    def _set_status(self, sid: int, status: str):
+        self.roster[sid] = status
+        self.rows.set(sid, "Status", status)
+
+    def _set_all(self, status: str):
+        if self.shown_batch is None:
+            messagebox.showwarning("Attendance", "Pick a batch to use roster mode")
+            return
+        for sid in self.roster:
+            self._set_status(sid, status)
 
-    def _mark(self):
+    def _toggle_row(self, _evt=None):
         item = self.table.focus()
-        if not item:
+        if not item or self.shown_batch is None:
             return
         sid = int(self.table.item(item, 'values')[0])
-        date = self.date.get().strip() or datetime.date.today().isoformat()
+        self._set_status(sid, "Absent" if self.roster.get(sid) == "Present" else "Present")
+
+    def _save_roster(self):
+        if self.shown_batch is None:
+            messagebox.showwarning("Attendance", "Pick a batch to use roster mode")
+            return
+        marks = [(sid, status) for sid, status in self.roster.items() if status]
+        if not marks:
+            messagebox.showwarning("Attendance", "Nothing to save")
+            return
+        changed = self.db.mark_attendance_many(self.shown_date, marks)
+        messagebox.showinfo("Attendance", f"Saved {len(marks)} students ({changed} changed)")
+
+    def _mark(self):
+        items = self.table.selection() or ((self.table.focus(),) if self.table.focus() else ())
+        if not items:
+            return
         status = self.status.get() or "Present"
-        self.db.mark_attendance(sid, date, status)
+        if self.shown_batch is not None:
+            # roster mode: stage the change, "Save Roster" writes it
+            for item in items:
+                self._set_status(int(self.table.item(item, 'values')[0]), status)
+            return
+        sid = int(self.table.item(items[0], 'values')[0])
+        self.db.mark_attendance(sid, self._date(), status)
         messagebox.showinfo("Attendance", "Saved")
 
 
-class FeesView(ctk.CTkFrame):
+class FeesView(AsyncView, ctk.CTkFrame):
     def __init__(self, master, db):
         super().__init__(master, fg_color=COLORS["bg1"]) 
         self.db = db
@@ -426,14 +595,11 @@ class FeesView(ctk.CTkFrame):
         form = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         form.pack(fill="x", padx=12, pady=8)
 
-        # ID input and matches dropdown
-        ctk.CTkLabel(form, text="Student ID:", text_color=COLORS["gold"]).grid(row=0, column=0, sticky="e", padx=6, pady=6)
-        self.sid = ctk.CTkEntry(form, width=140)
-        self.sid.grid(row=0, column=1, sticky="w", padx=6, pady=6)
-        self.sid.bind("<KeyRelease>", self._on_id_change)
-        self.matches = ttk.Combobox(form, state="readonly", width=40)
-        self.matches.grid(row=0, column=2, padx=6, pady=6)
-        self.matches.bind("<<ComboboxSelected>>", self._on_match_pick)
+        # ID/name input and matches dropdown
+        ctk.CTkLabel(form, text="Student:", text_color=COLORS["gold"]).grid(row=0, column=0, sticky="e", padx=6, pady=6)
+        self.lookup = StudentLookup(form, db.student_index, on_pick=self._on_match_pick,
+                                    loader=functools.partial(self.load, key="lookup", quiet=True))
+        self.lookup.grid(row=0, column=1, columnspan=2, sticky="w", padx=6, pady=6)
 
         # Read-only auto-filled fields
         self.name_var = ctk.StringVar(value="-")
@@ -451,7 +617,7 @@ class FeesView(ctk.CTkFrame):
         self.paid = ctk.CTkEntry(form, width=160)
         self.paid.grid(row=4, column=1, sticky="w", padx=6, pady=6)
         ctk.CTkLabel(form, text="Amount Pending:", text_color=COLORS["gold"]).grid(row=5, column=0, sticky="e")
-        self.pending = ctk.CTkEntry(form, width=160)
+        self.pending = ctk.CTkEntry(form, width=160, placeholder_text="previous - paid")
         self.pending.grid(row=5, column=1, sticky="w", padx=6, pady=6)
 
         GoldButton(form, text="Record Payment", command=self._save).grid(row=6, column=0, columnspan=3, pady=10)
@@ -459,58 +625,183 @@ class FeesView(ctk.CTkFrame):
         self.total_label = ctk.CTkLabel(self, text="", font=FONTS["h2"], text_color=COLORS["gold"]) 
         self.total_label.pack(pady=8)
 
-    def refresh(self):
-        total = self.db.get_fees() or 0
-        self.total_label.configure(text=f"Total Collected: ₹ {total:.2f}")
+        # Payment history of the selected student
+        history = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        history.pack(fill="both", expand=True, padx=12, pady=8)
+        self.history_label = ctk.CTkLabel(history, text="Payment history", text_color=COLORS["gold"])
+        self.history_label.pack(anchor="w", padx=8, pady=(8, 0))
+        cols = ("Date", "Amount", "Pending After", "Note")
+        self.history = ttk.Treeview(history, columns=cols, show="headings", height=8)
+        for c in cols:
+            self.history.heading(c, text=c)
+            self.history.column(c, width=140 if c != "Note" else 260, anchor="w")
+        self.history.pack(fill="both", expand=True, padx=8, pady=8)
+        style_treeview(self.history)
+        ctk.CTkButton(self, text="Reverse Selected", fg_color="#7a1f1f", hover_color="#953232", command=self._reverse).pack(pady=8)
+        self.history_sid = None
 
-    def _on_id_change(self, _evt=None):
-        prefix = self.sid.get().strip()
-        if not prefix:
-            self.matches["values"] = []
+    def refresh(self):
+        month = datetime.date.today().strftime("%Y-%m")
+        self.load(lambda: (self.db.get_fees(), self.db.collections_by_month(month, month)), self._render)
+        if self.history_sid is not None:
+            self._load_history(self.history_sid)
+
+    def _render(self, data):
+        total, this_month = data
+        total = total or 0
+        month_total = this_month[0][1] if this_month else 0
+        self.total_label.configure(text=f"Total Collected: ₹ {total:.2f}    This Month: ₹ {month_total:.2f}")
+
+    def _load_history(self, sid: int):
+        self.history_sid = sid
+        self.load(lambda: self.db.list_payments(sid), self._render_history, key="history")
+
+    def _render_history(self, rows):
+        self.history.delete(*self.history.get_children())
+        for pid, date, amount, pending, note in rows:
+            self.history.insert("", "end", iid=str(pid), values=(date, f"{amount:.2f}", f"{pending:.2f}", note))
+
+    def _on_match_pick(self, row):
+        if row is None:
             self.name_var.set("-")
             self.class_var.set("-")
             self.batch_var.set("-")
             return
-        matches = self.db.search_students_by_id_prefix(prefix)
-        if not matches:
-            self.matches["values"] = []
-            return
-        items = [f"{sid} — {name} ({username})" for sid, name, cls, username, batch in matches]
-        self._matches_cache = {f"{sid} — {name} ({username})": sid for sid, name, cls, username, batch in matches}
-        self.matches["values"] = items
-        if len(items) == 1:
-            self.matches.current(0)
-            self._on_match_pick()
-
-    def _on_match_pick(self, _evt=None):
-        if not getattr(self, "_matches_cache", None):
-            return
-        label = self.matches.get()
-        sid = self._matches_cache.get(label)
-        if not sid:
-            return
-        rec = self.db.get_student_by_id(int(sid))
-        if rec:
-            # id, name, age, class, contact, email, username, batch, parent_contact, student_contact
-            self.name_var.set(rec[1])
-            self.class_var.set(rec[3])
-            self.batch_var.set(rec[7])
-            # leave paid/pending untouched
+        sid, name, cls, _username, batch = row
+        self.name_var.set(name or "-")
+        self.class_var.set(cls or "-")
+        self.batch_var.set(batch or "-")
+        # leave paid/pending untouched
+        self._load_history(sid)
+
+    def _sid(self) -> int:
+        # a typed id wins; otherwise the student picked by name or username
+        text = self.lookup.get()
+        if not text.isdigit() and self.lookup.selected is not None:
+            return self.lookup.selected[0]
+        return int(text)
 
     def _save(self):
         try:
-            sid = int(self.sid.get())
+            sid = self._sid()
             paid = float(self.paid.get() or 0)
-            pend = float(self.pending.get() or 0)
+            pending = self.pending.get().strip()
+            pend = float(pending) if pending else None
             date = datetime.date.today().isoformat()
             self.db.record_payment(sid, paid, pend, date)
             messagebox.showinfo("Fees", "Payment recorded")
+            self.history_sid = sid
+            self.refresh()
+        except Exception as e:
+            messagebox.showerror("Fees", str(e))
+
+    def _reverse(self):
+        item = self.history.focus()
+        if not item:
+            return
+        date, amount = self.history.item(item, "values")[:2]
+        if not messagebox.askyesno("Fees", f"Reverse the payment of ₹ {amount} on {date}?"):
+            return
+        try:
+            self.db.reverse_payment(int(item))
             self.refresh()
         except Exception as e:
             messagebox.showerror("Fees", str(e))
 
 
-class TimetableView(ctk.CTkFrame):
+class PerformanceView(AsyncView, ctk.CTkFrame):
+    def __init__(self, master, db):
+        super().__init__(master, fg_color=COLORS["bg1"]) 
+        self.db = db
+        # marks typed in but not saved yet: student id -> marks
+        self.pending = {}
+        # (batch, subject, date) the sheet was loaded for
+        self.shown = None
+
+        top = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
+        top.pack(fill="x", padx=12, pady=8)
+        ctk.CTkLabel(top, text="Batch:", text_color=COLORS["gold"]).pack(side="left")
+        self.batch = ctk.CTkComboBox(top, values=[""], width=140)
+        self.batch.pack(side="left", padx=6)
+        ctk.CTkLabel(top, text="Subject:", text_color=COLORS["gold"]).pack(side="left")
+        self.subject = ctk.CTkComboBox(top, values=BatchesView.SUBJECT_CHOICES, width=140)
+        self.subject.pack(side="left", padx=6)
+        self.date = ctk.CTkEntry(top, placeholder_text="Date (YYYY-MM-DD)", width=140)
+        self.date.pack(side="left", padx=6)
+        GoldButton(top, text="Load Sheet", command=self.refresh).pack(side="left", padx=6)
+        GoldButton(top, text="Save Marks", command=self._save).pack(side="left", padx=6)
+
+        ctk.CTkLabel(self, text="Double-click a student to enter marks; ranks and percentiles are within the batch.",
+                     text_color=COLORS["muted"]).pack(anchor="w", padx=18)
+        table_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        table_frame.pack(fill="both", expand=True, padx=12, pady=8)
+        cols = ("ID", "Name", "Marks", "Rank", "Percentile")
+        self.table = ttk.Treeview(table_frame, columns=cols, show="headings")
+        for c in cols:
+            self.table.heading(c, text=c)
+            self.table.column(c, width=220 if c == "Name" else 110, anchor="w")
+        self.table.pack(fill="both", expand=True, padx=8, pady=8)
+        style_treeview(self.table)
+        self.table.bind("<Double-1>", self._edit_row)
+        self.summary = ctk.CTkLabel(self, text="", text_color=COLORS["gold"])
+        self.summary.pack(pady=(0, 8))
+
+    def refresh(self):
+        batch, subject = self.batch.get().strip(), self.subject.get().strip()
+        date = self.date.get().strip() or datetime.date.today().isoformat()
+        self.pending = {}
+        self.shown = (batch, subject, date) if batch and subject else None
+        if self.shown is None:
+            self.load(self.db.list_batches, lambda batches: self._render((batches, [])))
+            return
+        self.load(lambda: (self.db.list_batches(), self.db.marks_sheet(batch, subject, date)), self._render)
+
+    def _render(self, data):
+        batches, sheet = data
+        names = [name for name, _s, _t in batches]
+        self.batch.configure(values=names or [""])
+        if not self.batch.get().strip() and names:
+            self.batch.set(names[0])
+        self.table.delete(*self.table.get_children())
+        for sid, name, marks, rank, pct in sheet:
+            self.table.insert("", "end", iid=str(sid), values=(
+                sid, name, "-" if marks is None else f"{marks:g}",
+                rank or "-", "-" if pct is None else f"{pct:g}%",
+            ))
+        scored = [m for _sid, _n, m, _r, _p in sheet if m is not None]
+        if self.shown is None:
+            self.summary.configure(text="Pick a batch and subject, then load the sheet")
+        elif scored:
+            self.summary.configure(text=f"{len(scored)} of {len(sheet)} marked · average {sum(scored) / len(scored):.1f} · best {max(scored):g}")
+        else:
+            self.summary.configure(text=f"No marks yet for {len(sheet)} students")
+
+    def _edit_row(self, _evt=None):
+        item = self.table.focus()
+        if not item or self.shown is None:
+            return
+        name = self.table.set(item, "Name")
+        marks = simpledialog.askfloat("Marks", f"Marks for {name}", parent=self, minvalue=0)
+        if marks is None:
+            return
+        self.pending[int(item)] = marks
+        self.table.set(item, "Marks", f"{marks:g} *")
+
+    def _save(self):
+        if self.shown is None or not self.pending:
+            messagebox.showwarning("Performance", "Nothing to save")
+            return
+        _batch, subject, date = self.shown
+        try:
+            changed = self.db.record_marks_many(subject, date, self.pending.items())
+        except Exception as e:
+            messagebox.showerror("Performance", str(e))
+            return
+        messagebox.showinfo("Performance", f"Saved marks for {len(self.pending)} students ({changed} changed)")
+        self.refresh()
+
+
+class TimetableView(AsyncView, ctk.CTkFrame):
     def __init__(self, master, db):
         super().__init__(master, fg_color=COLORS["bg1"]) 
         self.db = db
@@ -519,9 +810,9 @@ class TimetableView(ctk.CTkFrame):
         top = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
         top.pack(fill="x", padx=12, pady=8)
         ctk.CTkLabel(top, text="Batch:", text_color=COLORS["gold"]).pack(side="left")
-        self.batch = ctk.CTkComboBox(top, values=[b for b,_s,_t in self.db.list_batches()] or [""], width=160)
-        if self.db.list_batches():
-            self.batch.set(self.db.list_batches()[0][0])
+        # filled in by refresh(); the first batch is picked once they arrive
+        self.batch = ctk.CTkComboBox(top, values=[""], width=160)
+        self.batch.set("")
         self.batch.pack(side="left", padx=6)
         GoldButton(top, text="Import Excel", command=lambda: self._import("xlsx")).pack(side="left", padx=6)
         GoldButton(top, text="Import CSV", command=lambda: self._import("csv")).pack(side="left", padx=6)
@@ -533,21 +824,31 @@ class TimetableView(ctk.CTkFrame):
         table_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         table_frame.pack(fill="both", expand=True, padx=12, pady=8)
         cols = ("ID","Batch","Day","Time","Subject","TeacherID")
-        self.table = ttk.Treeview(table_frame, columns=cols, show="headings")
-        for c in cols:
-            self.table.heading(c, text=c)
-            self.table.column(c, width=120, anchor="w")
-        self.table.pack(fill="both", expand=True, padx=8, pady=8)
-        style_treeview(self.table)
+        self.rows = KeyedTable(table_frame, cols)
+        self.rows.pack(fill="both", expand=True, padx=8, pady=8)
+        self.table = self.rows.tree
         ctk.CTkButton(self, text="Delete Selected", fg_color="#7a1f1f", hover_color="#953232", command=self._delete).pack(pady=8)
 
     def refresh(self):
-        for i in self.table.get_children():
-            self.table.delete(i)
-        batch = self.batch.get().strip() if hasattr(self,'batch') else None
-        rows = self.db.list_timetable(batch if batch else None)
-        for r in rows:
-            self.table.insert('', 'end', values=r)
+        self.load(self.db.list_batches, self._set_batches, key="batches")
+        if self.batch.get().strip():
+            self._load_rows()
+
+    def _set_batches(self, batches):
+        names = [b for b, _s, _t in batches]
+        self.batch.configure(values=names or [""])
+        current = self.batch.get().strip()
+        if current not in names:
+            # first visit, or the batch was deleted: show the first one
+            self.batch.set(names[0] if names else "")
+            self._load_rows()
+
+    def _load_rows(self):
+        batch = self.batch.get().strip()
+        self.load(lambda: self.db.list_timetable(batch if batch else None), self._render)
+
+    def _render(self, rows):
+        self.rows.set_rows(rows)
 
     def _clear_batch(self):
         b = self.batch.get().strip()
@@ -561,89 +862,39 @@ class TimetableView(ctk.CTkFrame):
 
     def _import(self, fmt: str):
         from tkinter import filedialog
-        try:
-            b = self.batch.get().strip()
-            if not b:
-                return
-            path = None
-            if fmt == "xlsx":
-                path = filedialog.askopenfilename(filetypes=[("Excel","*.xlsx")])
-            else:
-                path = filedialog.askopenfilename(filetypes=[("CSV","*.csv")])
-            if not path:
-                return
-            # Clear current batch entries
-            self.db.clear_timetable_for_batch(b)
-            if fmt == "xlsx":
-                from openpyxl import load_workbook
-                wb = load_workbook(path); ws = wb.active
-                # Expect header row with Batch,Day,Time,Subject,TeacherID
-                first = True
-                for row in ws.iter_rows(values_only=True):
-                    if first:
-                        first = False; continue
-                    batch, day, tm, subj, tid = row[:5]
-                    if not batch: batch = b
-                    tidv = int(tid) if tid not in (None, "") else None
-                    self.db.upsert_timetable_entry(str(batch), str(day), str(tm), str(subj), tidv)
-            else:
-                import csv as _csv
-                with open(path, newline='', encoding='utf-8') as f:
-                    r = _csv.reader(f)
-                    first = True
-                    for row in r:
-                        if first:
-                            first = False; continue
-                        batch, day, tm, subj, tid = (row + [None]*5)[:5]
-                        if not batch: batch = b
-                        tidv = int(tid) if tid and tid.strip().isdigit() else None
-                        self.db.upsert_timetable_entry(batch, day, tm, subj, tidv)
-            from tkinter import messagebox
-            messagebox.showinfo("Import", "Timetable imported")
-            self.refresh()
-        except Exception as e:
-            from tkinter import messagebox
-            messagebox.showerror("Import", str(e))
+        b = self.batch.get().strip()
+        if not b:
+            return
+        if fmt == "xlsx":
+            path = filedialog.askopenfilename(filetypes=[("Excel","*.xlsx")])
+        else:
+            path = filedialog.askopenfilename(filetypes=[("CSV","*.csv")])
+        if not path:
+            return
+        # Streams and validates the file, then replaces the batch in one transaction
+        from app.importers import import_timetable
+        self.load(lambda: import_timetable(self.db, path, b), self._import_done, key="import")
+
+    def _import_done(self, report):
+        if report.ok:
+            messagebox.showinfo("Import", report.summary())
+        else:
+            messagebox.showerror("Import", report.summary())
+        self.refresh()
 
     def _export(self, format: str = "xlsx"):
-        try:
-            rows = self.db.list_timetable(self.batch.get().strip())
-            if format == "xlsx":
-                try:
-                    from openpyxl import Workbook
-                    from tkinter import filedialog
-                    path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel",".xlsx")])
-                    if not path:
-                        return
-                    wb = Workbook(); ws = wb.active; ws.append(["ID","Batch","Day","Time","Subject","TeacherID"])
-                    for r in rows: ws.append(list(r))
-                    wb.save(path)
-                    messagebox.showinfo("Export","Excel saved")
-                except Exception as e:
-                    messagebox.showerror("Export", f"Excel export failed: {e}")
-            else:
-                try:
-                    from reportlab.lib.pagesizes import A4
-                    from reportlab.pdfgen import canvas
-                    from tkinter import filedialog
-                    path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF",".pdf")])
-                    if not path:
-                        return
-                    c = canvas.Canvas(path, pagesize=A4)
-                    x, y = 40, 800
-                    c.setFont("Helvetica-Bold", 14); c.drawString(x, y, f"Timetable - {self.batch.get().strip()}"); y -= 24
-                    c.setFont("Helvetica", 11)
-                    for r in rows:
-                        c.drawString(x, y, f"{r[0]}  {r[1]}  {r[2]}  {r[3]}  {r[4]}  {r[5] or ''}")
-                        y -= 16
-                        if y < 60:
-                            c.showPage(); y = 800
-                    c.save()
-                    messagebox.showinfo("Export","PDF saved")
-                except Exception as e:
-                    messagebox.showerror("Export", f"PDF export failed: {e}")
-        except Exception as e:
-            messagebox.showerror("Export", str(e))
+        from tkinter import filedialog
+        from app.exporters import export
+        batch = self.batch.get().strip()
+        if format == "xlsx":
+            path = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Excel",".xlsx")])
+        else:
+            path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF",".pdf")])
+        if not path:
+            return
+        label = "Excel" if format == "xlsx" else "PDF"
+        self.load(lambda: export(self.db, "timetable", format, path, batch=batch or None),
+                  lambda _n: messagebox.showinfo("Export", f"{label} saved"), key="export")
 
     def _delete(self):
         item = self.table.focus()
@@ -654,40 +905,454 @@ class TimetableView(ctk.CTkFrame):
         self.refresh()
 
 
-class MessagesView(ctk.CTkFrame):
+class MessagesView(AsyncView, ctk.CTkFrame):
     def __init__(self, master, db):
         super().__init__(master, fg_color=COLORS["bg1"]) 
         self.db = db
         top = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
         top.pack(fill="x", padx=12, pady=8)
-        self.message = ctk.CTkEntry(top, placeholder_text="Type message (to all)", width=420)
+        self.message = ctk.CTkEntry(top, placeholder_text="Type message", width=420)
         self.message.pack(side="left", padx=6)
+        self.recipient = ctk.CTkEntry(top, placeholder_text="To: username (blank = all)", width=200)
+        self.recipient.pack(side="left", padx=6)
         GoldButton(top, text="Send", command=self._send).pack(side="left", padx=6)
 
         # History table (all messages)
         table_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
         table_frame.pack(fill="both", expand=True, padx=12, pady=8)
         cols = ("Message", "Date", "Sender", "Recipient")
-        self.table = ttk.Treeview(table_frame, columns=cols, show="headings")
-        for c in cols:
-            self.table.heading(c, text=c)
-            self.table.column(c, width=220, anchor="w")
-        self.table.pack(fill="both", expand=True, padx=8, pady=8)
-        style_treeview(self.table)
+        self.rows = VirtualTable(table_frame, cols,
+                                 fetch=lambda after, limit: self.db.list_all_messages_page(after, limit),
+                                 cursor=lambda r: (r[2], r[0]), values=lambda r: r[1:],
+                                 key=lambda r: r[0], column_width=220,
+                                 loader=functools.partial(self.load, key="rows"))
+        self.rows.pack(fill="both", expand=True, padx=8, pady=8)
+        self.table = self.rows.tree
 
     def refresh(self):
-        for i in self.table.get_children():
-            self.table.delete(i)
-        for m, d, s, r in self.db.list_all_messages():
-            self.table.insert('', 'end', values=(m, d, s, r))
+        self.rows.reload()
 
     def _send(self):
         text = self.message.get().strip()
         if not text:
             return
-        self.db.send_message(text, datetime.datetime.now().isoformat(sep=' ', timespec='seconds'), "admin", "all")
+        recipient = self.recipient.get().strip() or "all"
+        if recipient != "all" and not self.db.get_student_by_username(recipient):
+            messagebox.showerror("Messages", f"No student with username {recipient!r}")
+            return
+        self.db.send_message(text, datetime.datetime.now().isoformat(sep=' ', timespec='seconds'), "admin", recipient)
         self.message.delete(0, 'end')
         messagebox.showinfo("Messages", "Sent")
+        self.refresh()
+
+
+class AnalyticsView(AsyncView, ctk.CTkFrame):
+    ALL_BATCHES = "All batches"
+    PERIODS = {"Last 30 days": 30, "Last 90 days": 90, "Last 365 days": 365, "All time": None}
+    THRESHOLD = 0.75
+
+    def __init__(self, master, db):
+        super().__init__(master, fg_color=COLORS["bg1"]) 
+        self.db = db
+        self.canvas = None
+        self.stats = None
+
+        top = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
+        top.pack(fill="x", padx=12, pady=8)
+        ctk.CTkLabel(top, text="Batch:", text_color=COLORS["gold"]).pack(side="left")
+        self.batch = ctk.CTkComboBox(top, values=[self.ALL_BATCHES], width=160, command=lambda _v: self.refresh())
+        self.batch.set(self.ALL_BATCHES)
+        self.batch.pack(side="left", padx=6)
+        self.period = ctk.CTkComboBox(top, values=list(self.PERIODS), width=140, command=lambda _v: self.refresh())
+        self.period.set("Last 90 days")
+        self.period.pack(side="left", padx=6)
+        GoldButton(top, text="Refresh", command=self.refresh).pack(side="left", padx=6)
+
+        self.chart_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        self.chart_frame.pack(fill="both", expand=True, padx=12, pady=8)
+
+        table_frame = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        table_frame.pack(fill="x", padx=12, pady=8)
+        ctk.CTkLabel(table_frame, text=f"Below {self.THRESHOLD:.0%} attendance", text_color=COLORS["gold"]).pack(anchor="w", padx=8, pady=(8, 0))
+        cols = ("ID", "Name", "Batch", "Rate", "Days", "Absent Streak", "Longest")
+        self.table = ttk.Treeview(table_frame, columns=cols, show="headings", height=6)
+        for c in cols:
+            self.table.heading(c, text=c)
+            self.table.column(c, width=90 if c not in ("Name", "Batch") else 160, anchor="w")
+        self.table.pack(fill="x", padx=8, pady=8)
+        style_treeview(self.table)
+
+    def refresh(self):
+        batch = self.batch.get().strip()
+        batch = None if not batch or batch == self.ALL_BATCHES else batch
+        days = self.PERIODS.get(self.period.get())
+        start = (datetime.date.today() - datetime.timedelta(days=days)).isoformat() if days else None
+        self.load(lambda: (self.db.list_batches(), self._compute(batch, start)), self._render)
+
+    def _compute(self, batch, start):
+        # worker thread: all NumPy work happens here, the Tk thread only plots
+        from app.analytics import load_attendance
+        m = load_attendance(self.db, batch=batch, start=start)
+        names, heat = m.batch_daily_rates()
+        weeks, weekly = m.weekly_trend()
+        return {
+            "dates": m.dates, "batches": names, "heat": heat,
+            "weeks": weeks, "weekly": weekly, "rolling": m.rolling_rates(7),
+            "absentees": m.chronic_absentees(self.THRESHOLD),
+        }
+
+    def _render(self, data):
+        batches, stats = data
+        self.stats = stats
+        self.batch.configure(values=[self.ALL_BATCHES] + [name for name, _s, _t in batches])
+        self.table.delete(*self.table.get_children())
+        for sid, name, batch, rate, days, current, longest in stats["absentees"]:
+            self.table.insert("", "end", values=(sid, name, batch or "-", f"{rate:.0%}", days, current, longest))
+        self._plot(stats)
+
+    def apply_theme(self):
+        # the chart's colours are baked into the figure; redraw it with the new palette
+        if self.canvas is not None and self.stats is not None:
+            self._plot(self.stats)
+
+    def _plot(self, stats):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        if self.canvas is None:
+            self.figure = Figure(figsize=(8, 4.5), dpi=100)
+            self.canvas = FigureCanvasTkAgg(self.figure, master=self.chart_frame)
+            self.canvas.get_tk_widget().pack(fill="both", expand=True, padx=8, pady=8)
+        fig = self.figure
+        fig.clear()
+        fig.set_facecolor(COLORS["panel"])
+        heat_ax, trend_ax = fig.subplots(2, 1, gridspec_kw={"height_ratios": [3, 2]})
+        for ax in (heat_ax, trend_ax):
+            ax.set_facecolor(COLORS["bg2"])
+            ax.tick_params(colors=COLORS["muted"], labelsize=8)
+            for spine in ax.spines.values():
+                spine.set_color(COLORS["muted"])
+        dates = stats["dates"]
+        if not len(dates):
+            heat_ax.text(0.5, 0.5, "No attendance recorded", ha="center", va="center", color=COLORS["muted"], transform=heat_ax.transAxes)
+            heat_ax.set_xticks([]); heat_ax.set_yticks([])
+            trend_ax.set_visible(False)
+            self.canvas.draw_idle()
+            return
+        image = heat_ax.imshow(stats["heat"], aspect="auto", cmap="RdYlGn", vmin=0, vmax=1, interpolation="nearest")
+        heat_ax.set_yticks(range(len(stats["batches"])), [b or "(none)" for b in stats["batches"]])
+        step = max(len(dates) // 8, 1)
+        heat_ax.set_xticks(range(0, len(dates), step), [str(d)[5:] for d in dates[::step]])
+        heat_ax.set_title("Daily attendance by batch", color=COLORS["gold"], fontsize=10)
+        fig.colorbar(image, ax=heat_ax, fraction=0.03, pad=0.01).ax.tick_params(colors=COLORS["muted"], labelsize=8)
+        x = dates.astype("datetime64[D]").astype(object)
+        trend_ax.plot(x, stats["rolling"] * 100, color=COLORS["muted"], linewidth=1, label="7 class days")
+        trend_ax.plot(stats["weeks"].astype(object), stats["weekly"] * 100, color=COLORS["gold"], marker="o", markersize=3, label="Weekly")
+        trend_ax.set_ylim(0, 100)
+        trend_ax.set_ylabel("%", color=COLORS["muted"])
+        trend_ax.legend(loc="lower left", fontsize=8)
+        trend_ax.tick_params(axis="x", labelrotation=30)
+        fig.tight_layout()
+        self.canvas.draw_idle()
+
+
+class ReportsView(AsyncView, ctk.CTkFrame):
+    def __init__(self, master, db):
+        super().__init__(master, fg_color=COLORS["bg1"]) 
+        self.db = db
+        self.cancel_event = None
+        # (rows written, total) – written by the export worker, read by _poll_progress
+        self.progress_state = (0, 0)
+
+        form = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        form.pack(fill="x", padx=12, pady=8)
+        ctk.CTkLabel(form, text="Export", font=FONTS["h2"], text_color=COLORS["gold"]).grid(row=0, column=0, columnspan=4, sticky="w", padx=8, pady=(8, 4))
+        from app.exporters import DATASETS, FORMATS
+        ctk.CTkLabel(form, text="Data:", text_color=COLORS["gold"]).grid(row=1, column=0, sticky="e", padx=6, pady=6)
+        self.dataset = ctk.CTkComboBox(form, values=[d.title() for d in DATASETS], width=160)
+        self.dataset.set(DATASETS[0].title())
+        self.dataset.grid(row=1, column=1, sticky="w", padx=6, pady=6)
+        ctk.CTkLabel(form, text="Format:", text_color=COLORS["gold"]).grid(row=1, column=2, sticky="e", padx=6, pady=6)
+        self.fmt = ctk.CTkComboBox(form, values=[f.upper() for f in FORMATS], width=100)
+        self.fmt.set(FORMATS[0].upper())
+        self.fmt.grid(row=1, column=3, sticky="w", padx=6, pady=6)
+        ctk.CTkLabel(form, text="Batch:", text_color=COLORS["gold"]).grid(row=2, column=0, sticky="e", padx=6, pady=6)
+        self.batch = ctk.CTkEntry(form, placeholder_text="all", width=160)
+        self.batch.grid(row=2, column=1, sticky="w", padx=6, pady=6)
+        ctk.CTkLabel(form, text="From / To:", text_color=COLORS["gold"]).grid(row=3, column=0, sticky="e", padx=6, pady=6)
+        self.start = ctk.CTkEntry(form, placeholder_text="YYYY-MM-DD", width=160)
+        self.start.grid(row=3, column=1, sticky="w", padx=6, pady=6)
+        self.end = ctk.CTkEntry(form, placeholder_text="YYYY-MM-DD", width=160)
+        self.end.grid(row=3, column=2, columnspan=2, sticky="w", padx=6, pady=6)
+
+        actions = ctk.CTkFrame(form, fg_color="transparent")
+        actions.grid(row=4, column=0, columnspan=4, sticky="w", padx=6, pady=6)
+        GoldButton(actions, text="Export", command=self._export).pack(side="left", padx=6)
+        ctk.CTkButton(actions, text="Cancel", fg_color="#7a1f1f", hover_color="#953232", command=self._cancel).pack(side="left", padx=6)
+        self.progress = ctk.CTkProgressBar(form, width=420)
+        self.progress.set(0)
+        self.progress.grid(row=5, column=0, columnspan=4, sticky="w", padx=12, pady=(4, 2))
+        self.status = ctk.CTkLabel(form, text="", text_color=COLORS["muted"])
+        self.status.grid(row=6, column=0, columnspan=4, sticky="w", padx=12, pady=(0, 10))
+
+        # Backups: online snapshots via app.backup
+        self.backup_running = False
+        self.backup_state = (0, 0)
+        backups = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        backups.pack(fill="both", expand=True, padx=12, pady=8)
+        ctk.CTkLabel(backups, text="Backups", font=FONTS["h2"], text_color=COLORS["gold"]).pack(anchor="w", padx=8, pady=(8, 4))
+        bar = ctk.CTkFrame(backups, fg_color="transparent")
+        bar.pack(fill="x", padx=6)
+        GoldButton(bar, text="Back Up Now", command=self._backup).pack(side="left", padx=6)
+        ctk.CTkButton(bar, text="Restore Selected", fg_color="#7a1f1f", hover_color="#953232", command=self._restore).pack(side="left", padx=6)
+        self.backup_progress = ctk.CTkProgressBar(bar, width=240)
+        self.backup_progress.set(0)
+        self.backup_progress.pack(side="left", padx=12)
+        self.backup_status = ctk.CTkLabel(bar, text="", text_color=COLORS["muted"])
+        self.backup_status.pack(side="left", padx=6)
+        cols = ("Snapshot", "Size", "Created")
+        self.snapshots = ttk.Treeview(backups, columns=cols, show="headings", height=6)
+        for c in cols:
+            self.snapshots.heading(c, text=c)
+            self.snapshots.column(c, width=320 if c == "Snapshot" else 140, anchor="w")
+        self.snapshots.pack(fill="both", expand=True, padx=8, pady=8)
+        style_treeview(self.snapshots)
+
+    def refresh(self):
+        from app import backup
+        self.load(backup.list_snapshots, self._render_snapshots, key="snapshots")
+
+    def _render_snapshots(self, snaps):
+        self.snapshots.delete(*self.snapshots.get_children())
+        for snap in snaps:
+            self.snapshots.insert("", "end", iid=snap.path, values=(snap.name, f"{snap.size / 1024:.0f} KiB", f"{snap.created:%Y-%m-%d %H:%M:%S}"))
+
+    def _run_backup_job(self, job, done, label: str):
+        if self.backup_running:
+            return
+        self.backup_running = True
+        self.backup_state = (0, 0)
+        self.backup_status.configure(text=f"{label}…")
+        if self.tasks is None:
+            try:
+                self._backup_done(done, job())
+            except Exception as e:
+                self._backup_failed(e)
+        else:
+            # like exports, not tied to load(): keeps running across navigation
+            self.tasks.submit((self, "backup"), job, functools.partial(self._backup_done, done), self._backup_failed)
+            self._poll_backup()
+
+    def _backup_progress(self, copied, total):
+        # worker thread: only store the numbers, _poll_backup shows them
+        self.backup_state = (copied, total)
+
+    def _poll_backup(self):
+        if not self.backup_running:
+            return
+        copied, total = self.backup_state
+        self.backup_progress.set(copied / total if total else 0)
+        self.after(100, self._poll_backup)
+
+    def _backup(self):
+        from app import backup
+        self._run_backup_job(lambda: backup.create(self.db, progress=self._backup_progress),
+                             lambda snap: f"Saved {snap.name}", "Backing up")
+
+    def _restore(self):
+        path = self.snapshots.focus()
+        if not path:
+            messagebox.showwarning("Restore", "Select a snapshot to restore")
+            return
+        if not messagebox.askyesno("Restore", f"Replace all current data with {path}?\nThe current data is backed up first."):
+            return
+        from app import backup
+        self._run_backup_job(lambda: backup.restore(self.db, path, progress=self._backup_progress),
+                             lambda safety: f"Restored; previous data saved as {safety.name}", "Restoring")
+
+    def _backup_done(self, describe, result):
+        self.backup_running = False
+        self.backup_progress.set(1)
+        self.backup_status.configure(text=describe(result))
+        self.refresh()
+
+    def _backup_failed(self, exc):
+        self.backup_running = False
+        self.backup_progress.set(0)
+        self.backup_status.configure(text="Failed")
+        messagebox.showerror("Backup", str(exc))
+
+    def _export(self):
+        if self.cancel_event is not None:
+            return
+        from tkinter import filedialog
+        from app.database import EXPORTS
+        from app.exporters import export
+        dataset = self.dataset.get().strip().lower()
+        fmt = self.fmt.get().strip().lower()
+        path = filedialog.asksaveasfilename(defaultextension=f".{fmt}", initialfile=f"{dataset}.{fmt}",
+                                            filetypes=[(fmt.upper(), f"*.{fmt}")])
+        if not path:
+            return
+        allowed = EXPORTS[dataset][2]
+        values = {"batch": self.batch.get().strip(), "start": self.start.get().strip(), "end": self.end.get().strip()}
+        filters = {k: v for k, v in values.items() if k in allowed and v}
+
+        self.cancel_event = cancel = threading.Event()
+        self.progress_state = (0, 0)
+
+        def progress(done, total):
+            self.progress_state = (done, total)
+
+        job = lambda: export(self.db, dataset, fmt, path, progress=progress, cancel=cancel, **filters)
+        self.status.configure(text=f"Exporting {dataset}…")
+        if self.tasks is None:
+            try:
+                self._export_done(job())
+            except Exception as e:
+                self._export_failed(e)
+        else:
+            # not tied to load(): the export keeps running if the admin switches panels
+            self.tasks.submit((self, "export"), job, self._export_done, self._export_failed)
+            self._poll_progress()
+
+    def _poll_progress(self):
+        if self.cancel_event is None:
+            return
+        done, total = self.progress_state
+        self.progress.set(done / total if total else 0)
+        self.status.configure(text=f"Exported {done:,} of {total:,} rows…")
+        self.after(150, self._poll_progress)
+
+    def _cancel(self):
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    def _export_done(self, count):
+        self.cancel_event = None
+        self.progress.set(1)
+        self.status.configure(text=f"Exported {count:,} rows")
+
+    def _export_failed(self, exc):
+        from app.exporters import ExportCancelled
+        self.cancel_event = None
+        self.progress.set(0)
+        if isinstance(exc, ExportCancelled):
+            self.status.configure(text="Export cancelled")
+        else:
+            self.status.configure(text="Export failed")
+            messagebox.showerror("Export", str(exc))
+
+
+class DiagnosticsView(AsyncView, ctk.CTkFrame):
+    """Session view of Database call timings recorded by ``app.tracing``."""
+
+    def __init__(self, master, db):
+        super().__init__(master, fg_color=COLORS["bg1"]) 
+        self.db = db
+        self.calls = []
+
+        top = ctk.CTkFrame(self, fg_color=COLORS["bg1"]) 
+        top.pack(fill="x", padx=12, pady=8)
+        self.tracing = ctk.CTkSwitch(top, text="Trace database calls", text_color=COLORS["gold"], command=self._toggle)
+        self.tracing.pack(side="left", padx=6)
+        ctk.CTkLabel(top, text="Slow at (ms):", text_color=COLORS["gold"]).pack(side="left", padx=(12, 0))
+        self.slow_ms = ctk.CTkEntry(top, width=70)
+        self.slow_ms.pack(side="left", padx=6)
+        GoldButton(top, text="Refresh", command=self.refresh).pack(side="left", padx=6)
+        GoldButton(top, text="Reset", command=self._reset).pack(side="left", padx=6)
+        self.summary = ctk.CTkLabel(self, text="", text_color=COLORS["muted"], anchor="w")
+        self.summary.pack(fill="x", padx=18)
+
+        slow = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        slow.pack(fill="both", expand=True, padx=12, pady=8)
+        ctk.CTkLabel(slow, text="Slowest calls", text_color=COLORS["gold"]).pack(anchor="w", padx=8, pady=(8, 0))
+        cols = ("ms", "Method", "Caller", "Rows", "Thread", "At")
+        self.slowest = ttk.Treeview(slow, columns=cols, show="headings", height=8)
+        for c in cols:
+            self.slowest.heading(c, text=c)
+            self.slowest.column(c, width=200 if c in ("Method", "Caller") else 90, anchor="w")
+        self.slowest.pack(fill="both", expand=True, padx=8, pady=8)
+        style_treeview(self.slowest)
+        self.slowest.bind("<<TreeviewSelect>>", lambda _e: self._show_sql())
+        self.sql = ctk.CTkTextbox(slow, height=110)
+        self.sql.pack(fill="x", padx=8, pady=(0, 8))
+
+        counts = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=12)
+        counts.pack(fill="both", expand=True, padx=12, pady=8)
+        ctk.CTkLabel(counts, text="Calls by method", text_color=COLORS["gold"]).pack(anchor="w", padx=8, pady=(8, 0))
+        cols = ("Method", "Calls", "Total ms", "Avg ms", "Max ms", "Rows")
+        self.counts = ttk.Treeview(counts, columns=cols, show="headings", height=8)
+        for c in cols:
+            self.counts.heading(c, text=c)
+            self.counts.column(c, width=220 if c == "Method" else 100, anchor="w")
+        self.counts.pack(fill="both", expand=True, padx=8, pady=8)
+        style_treeview(self.counts)
+
+    def refresh(self):
+        tracer = self.db.tracer
+        self.slow_ms.delete(0, "end")
+        if tracer is None:
+            self.tracing.deselect()
+            self.slow_ms.insert(0, f"{TRACE_SETTINGS['slow_ms']:g}")
+            self._render((None, [], [], self.db.cache_stats()))
+            return
+        self.tracing.select()
+        self.slow_ms.insert(0, f"{tracer.slow_ms:g}")
+        self.load(lambda: (tracer, tracer.slowest(), tracer.method_stats(), self.db.cache_stats()), self._render, quiet=True)
+
+    def _render(self, data):
+        tracer, slowest, stats, cache = data
+        self.calls = slowest
+        self.slowest.delete(*self.slowest.get_children())
+        self.counts.delete(*self.counts.get_children())
+        self.sql.delete("1.0", "end")
+        cache_text = f"  •  cache hits {cache['hits']:,} / misses {cache['misses']:,}" if cache else ""
+        if tracer is None:
+            self.summary.configure(text="Tracing is off; switch it on to record calls." + cache_text)
+            return
+        total = sum(st.calls for _name, st in stats)
+        self.summary.configure(text=f"Since {tracer.started:%H:%M:%S}: {total:,} calls  •  slow-query log {tracer.log_path}" + cache_text)
+        for i, c in enumerate(slowest):
+            rows = "-" if c.rows is None else c.rows
+            self.slowest.insert("", "end", iid=str(i), values=(f"{c.ms:.1f}", c.method, c.caller, rows, c.thread, f"{c.at:%H:%M:%S}"))
+        for name, st in stats:
+            self.counts.insert("", "end", values=(name, st.calls, f"{st.total_ms:.1f}", f"{st.avg_ms:.2f}", f"{st.max_ms:.1f}", st.rows))
+
+    def _show_sql(self):
+        sel = self.slowest.selection()
+        if not sel:
+            return
+        c = self.calls[int(sel[0])]
+        self.sql.delete("1.0", "end")
+        self.sql.insert("1.0", "\n".join(c.plan or c.sql) or "(no SQL – answered from the query cache)")
+
+    def _slow_ms(self):
+        try:
+            value = float(self.slow_ms.get())
+        except ValueError:
+            messagebox.showerror("Diagnostics", "Slow threshold must be a number of milliseconds")
+            return None
+        return max(value, 0.0)
+
+    def _toggle(self):
+        if self.tracing.get():
+            slow_ms = self._slow_ms()
+            if slow_ms is None:
+                self.tracing.deselect()
+                return
+            self.db.enable_tracing(slow_ms=slow_ms)
+        else:
+            self.db.disable_tracing()
+        self.refresh()
+
+    def _reset(self):
+        tracer = self.db.tracer
+        if tracer is not None:
+            slow_ms = self._slow_ms()
+            if slow_ms is not None:
+                tracer.slow_ms = slow_ms
+            tracer.reset()
+        self.refresh()
 
 
 class Dialogs:
@@ -1,3 +1,6 @@
+import bisect
+import time
+from typing import Optional
 import customtkinter as ctk
 from tkinter import ttk
 from app.config import COLORS, FONTS
@@ -18,22 +21,33 @@ class GoldButton(ctk.CTkButton):
 class Card(ctk.CTkFrame):
     def __init__(self, master, title: str, value: str, **kwargs):
         super().__init__(master, fg_color=COLORS["panel"], corner_radius=12, **kwargs)
-        self.title = ctk.CTkLabel(self, text=title, font=FONTS["h2"], text_color=COLORS["gold"]).pack(
-            anchor="w", padx=12, pady=(12, 2)
-        )
-        self.value = ctk.CTkLabel(
-            self, text=value, font=("Segoe UI", 20, "bold"), text_color=COLORS["white"]
-        ).pack(anchor="w", padx=12, pady=(0, 12))
+        self.title = ctk.CTkLabel(self, text=title, font=FONTS["h2"], text_color=COLORS["gold"])
+        self.title.pack(anchor="w", padx=12, pady=(12, 2))
+        self.value = ctk.CTkLabel(self, text=value, font=("Segoe UI", 20, "bold"), text_color=COLORS["white"])
+        self.value.pack(anchor="w", padx=12, pady=(0, 12))
+
+    def set_value(self, value: str):
+        # configure() redraws the label, so skip it when nothing changed
+        if self.value.cget("text") != value:
+            self.value.configure(text=value)
+
+
+ROW_HEIGHT = 28
 
 
 def style_treeview(tv: ttk.Treeview):
-    style = ttk.Style(tv)
+    apply_treeview_style(tv)
+
+
+def apply_treeview_style(widget):
+    """Configure the shared "Treeview" ttk style from the current ``COLORS``."""
+    style = ttk.Style(widget)
     style.configure(
         "Treeview",
         background=COLORS["bg2"],
         fieldbackground=COLORS["bg2"],
         foreground=COLORS["white"],
-        rowheight=28,
+        rowheight=ROW_HEIGHT,
     )
     style.map(
         "Treeview",
@@ -42,6 +56,342 @@ def style_treeview(tv: ttk.Treeview):
     )
 
 
+class KeyedTable(ctk.CTkFrame):
+    """Scrollable Treeview whose rows are keyed and updated by diffing.
+
+    Usage:
+        table = KeyedTable(parent, cols, key=lambda row: row[0])
+        table.set_rows(db.list_batches())  # only what changed touches Tk
+
+    ``set_rows`` deletes rows whose key is gone, inserts new ones, rewrites
+    changed values and moves rows whose position changed (as few as
+    possible). Untouched rows keep their selection, focus and scroll
+    position. Item ids are ``str(key(row))``; ``tree`` is the Treeview.
+    """
+
+    def __init__(self, master, columns, key=None, values=None, column_width: int = 120,
+                 height: Optional[int] = None, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.columns = tuple(columns)
+        self.key = key or (lambda row: row[0])
+        self.values = values or (lambda row: row)
+
+        self.tree = ttk.Treeview(self, columns=self.columns, show="headings")
+        if height is not None:
+            self.tree.configure(height=height)  # rows shown
+        for c in self.columns:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=column_width, anchor="w")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
+        style_treeview(self.tree)
+
+        # mirror of the tree: item id -> shown values, and item ids in display order
+        self._shown = {}
+        self._order = []
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+
+    def clear(self):
+        if self._order:
+            self.tree.delete(*self._order)
+        self._shown = {}
+        self._order = []
+
+    def set_rows(self, rows):
+        """Show exactly *rows*, in order (the first row wins for a repeated key)."""
+        shown = {}
+        for row in rows:
+            iid = str(self.key(row))
+            if iid not in shown:
+                shown[iid] = tuple(self.values(row))
+        target = list(shown)
+        survivors = [iid for iid in self._order if iid in shown]
+        if len(survivors) < len(self._order):
+            self.tree.delete(*[iid for iid in self._order if iid not in shown])
+        if survivors != [iid for iid in target if iid in self._shown]:
+            # rows outside the longest run already in target order are detached,
+            # then reattached at their new index below
+            position = {iid: i for i, iid in enumerate(target)}
+            keep = _increasing_run([position[iid] for iid in survivors])
+            moving = {iid for i, iid in enumerate(survivors) if i not in keep}
+            self.tree.detach(*moving)
+        else:
+            moving = ()
+        for i, iid in enumerate(target):
+            old = self._shown.get(iid)
+            if old is None:
+                self.tree.insert("", i, iid=iid, values=shown[iid])
+                continue
+            if iid in moving:
+                self.tree.move(iid, "", i)
+            if old != shown[iid]:
+                self.tree.item(iid, values=shown[iid])
+        self._shown = shown
+        self._order = target
+
+    def append_rows(self, rows):
+        """Add *rows* at the end; rows whose key is already shown are updated in place."""
+        for row in rows:
+            iid = str(self.key(row))
+            values = tuple(self.values(row))
+            old = self._shown.get(iid)
+            if old is None:
+                self.tree.insert("", "end", iid=iid, values=values)
+                self._order.append(iid)
+            elif old != values:
+                self.tree.item(iid, values=values)
+            self._shown[iid] = values
+
+    def set(self, key, column: str, value):
+        """Change one cell, keeping the mirror in step with the tree."""
+        iid = str(key)
+        self.tree.set(iid, column, value)
+        values = list(self._shown[iid])
+        values[self.columns.index(column)] = value
+        self._shown[iid] = tuple(values)
+
+
+def _increasing_run(seq):
+    """Indexes of a longest strictly increasing subsequence of *seq*."""
+    tails, tail_at, prev = [], [], [-1] * len(seq)
+    for i, v in enumerate(seq):
+        k = bisect.bisect_left(tails, v)
+        if k == len(tails):
+            tails.append(v)
+            tail_at.append(i)
+        else:
+            tails[k] = v
+            tail_at[k] = i
+        prev[i] = tail_at[k - 1] if k else -1
+    run, i = set(), (tail_at[-1] if tail_at else -1)
+    while i >= 0:
+        run.add(i)
+        i = prev[i]
+    return run
+
+
+class VirtualTable(KeyedTable):
+    """Keyed table that pages rows in from a keyset-paginated source.
+
+    Usage:
+        table = VirtualTable(parent, cols,
+                             fetch=lambda after, limit: db.list_students_page(after, limit),
+                             cursor=lambda row: (row[1], row[0]))
+        table.reset()   # (re)load from the top
+        table.reload()  # after an edit: re-read what is loaded, apply the differences
+
+    Only the visible rows plus ``prefetch`` extra screens are fetched; the next
+    page is requested once less than a screen of loaded rows remains below the
+    viewport. ``fetch(after, limit)`` receives the cursor of the last loaded
+    row (None for the first page). Rows are keyed by ``key`` (default: the
+    first column) as in ``KeyedTable``.
+
+    With ``loader`` (e.g. ``AsyncView.load``) pages are fetched off the Tk
+    thread, so ``fetch`` must not touch widgets. ``on_page(rows)`` runs on the
+    Tk thread after each page is shown.
+    """
+
+    def __init__(self, master, columns, fetch, cursor, key=None, values=None,
+                 prefetch: int = 2, column_width: int = 120, loader=None, on_page=None, **kwargs):
+        super().__init__(master, columns, key=key, values=values, column_width=column_width, **kwargs)
+        self.fetch = fetch
+        self.cursor = cursor
+        self.prefetch = prefetch
+        self.loader = loader
+        self.on_page = on_page
+        self.tree.bind("<Configure>", lambda _e: self._schedule_load())
+
+        self._after = None
+        self._exhausted = True
+        self._pending = None
+        self._loading = False
+
+    def page_size(self) -> int:
+        visible = max(self.tree.winfo_height() // ROW_HEIGHT, 10)
+        return visible * (1 + self.prefetch)
+
+    def reset(self):
+        self._cancel_pending()
+        self.clear()
+        self._after = None
+        self._exhausted = False
+        self._loading = False
+        self._load_more()
+
+    def reload(self):
+        """Re-read the rows loaded so far in one fetch and apply only the changes."""
+        if not self._order:
+            self.reset()
+            return
+        self._cancel_pending()
+        limit = max(len(self._order), self.page_size())
+        self._loading = True
+        if self.loader is None:
+            self._replace(self.fetch(None, limit), limit)
+        else:
+            self.loader(lambda: self.fetch(None, limit), lambda rows: self._replace(rows, limit))
+
+    def _load_more(self):
+        self._pending = None
+        if self._exhausted or self._loading:
+            return
+        limit, after = self.page_size(), self._after
+        self._loading = True
+        if self.loader is None:
+            self._append(self.fetch(after, limit), limit)
+        else:
+            self.loader(lambda: self.fetch(after, limit), lambda rows: self._append(rows, limit))
+
+    def _append(self, rows, limit: int):
+        self._loading = False
+        self.append_rows(rows)
+        if rows:
+            self._after = self.cursor(rows[-1])
+        if len(rows) < limit:
+            self._exhausted = True
+        if self.on_page is not None:
+            self.on_page(rows)
+
+    def _replace(self, rows, limit: int):
+        self._loading = False
+        self.set_rows(rows)
+        self._after = self.cursor(rows[-1]) if rows else None
+        self._exhausted = len(rows) < limit
+        if self.on_page is not None:
+            self.on_page(rows)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        first, last = float(first), float(last)
+        # less than one screen of loaded rows left below the viewport
+        if 1.0 - last < last - first:
+            self._schedule_load()
+
+    def _schedule_load(self):
+        if self._pending is None and not self._exhausted:
+            self._pending = self.after_idle(self._load_more)
+
+    def _cancel_pending(self):
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+            self._pending = None
+
+    def destroy(self):
+        self._cancel_pending()
+        super().destroy()
+
+
+class Debounce:
+    """Call ``fn`` once, ``delay_ms`` after the last of a burst of calls.
+
+    Usage:
+        entry.bind("<KeyRelease>", Debounce(entry, 150, self.search))
+    """
+
+    def __init__(self, widget, delay_ms: int, fn):
+        self.widget = widget
+        self.delay_ms = delay_ms
+        self.fn = fn
+        self._after = None
+
+    def __call__(self, *_args):
+        self.cancel()
+        self._after = self.widget.after(self.delay_ms, self._fire)
+
+    def _fire(self):
+        self._after = None
+        self.fn()
+
+    def cancel(self):
+        if self._after is not None:
+            self.widget.after_cancel(self._after)
+            self._after = None
+
+
+class StudentLookup(ctk.CTkFrame):
+    """Entry plus a dropdown of the students matching what has been typed.
+
+    Usage:
+        lookup = StudentLookup(parent, db.student_index, on_pick=self._show_student,
+                               loader=functools.partial(self.load, key="lookup", quiet=True))
+
+    Matches come from a ``StudentIndex`` (id, username or name prefix).
+    A lookup runs ``DELAY_MS`` after the last keystroke, and with ``loader``
+    it runs off the Tk thread with superseded results dropped. A single match
+    is picked straight away. ``on_pick(row)`` gets ``(id, name, class,
+    username, batch)``, or None once the entry is cleared.
+    """
+
+    DELAY_MS = 150
+
+    def __init__(self, master, index, on_pick, loader=None, limit: int = 20, width: int = 140,
+                 placeholder: str = "ID, name or username", **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.index = index
+        self.on_pick = on_pick
+        self.loader = loader
+        self.limit = limit
+        self.selected = None  # row last passed to on_pick
+        self._rows = []
+        self._text = ""
+
+        self.entry = ctk.CTkEntry(self, width=width, placeholder_text=placeholder)
+        self.entry.pack(side="left", padx=(0, 6))
+        self._debounce = Debounce(self, self.DELAY_MS, self._lookup)
+        self.entry.bind("<KeyRelease>", self._on_key)
+        self.matches = ttk.Combobox(self, state="readonly", width=40)
+        self.matches.pack(side="left")
+        self.matches.bind("<<ComboboxSelected>>", self._on_select)
+
+    def get(self) -> str:
+        return self.entry.get().strip()
+
+    def _on_key(self, _evt=None):
+        text = self.get()
+        if text != self._text:  # not for arrows, Shift, ...
+            self._text = text
+            self._debounce()
+
+    def _lookup(self):
+        text = self._text
+        if not text:
+            self._show([])
+            self._pick(None)
+        elif self.loader is None:
+            self._show(self.index.match(text, self.limit))
+        else:
+            self.loader(lambda: self.index.match(text, self.limit), self._show)
+
+    def _show(self, rows):
+        self._rows = rows
+        self.matches["values"] = [f"{sid} — {name} ({username})" for sid, name, _cls, username, _batch in rows]
+        if len(rows) == 1:
+            self.matches.current(0)
+            self._pick(rows[0])
+        else:
+            self.matches.set("")
+
+    def _on_select(self, _evt=None):
+        i = self.matches.current()
+        if 0 <= i < len(self._rows):
+            self._pick(self._rows[i])
+
+    def _pick(self, row):
+        self.selected = row
+        self.on_pick(row)
+
+    def destroy(self):
+        self._debounce.cancel()
+        super().destroy()
+
+
 class PanelSwitcher(ctk.CTkFrame):
     """Animated panel switcher that slides new content in.
 
@@ -51,6 +401,9 @@ class PanelSwitcher(ctk.CTkFrame):
         switcher.transition_to(next_widget, direction=1)
     """
 
+    # optional UiMonitor: each animation frame is recorded as a "frame" sample
+    monitor = None
+
     def __init__(self, master, **kwargs):
         super().__init__(master, fg_color=COLORS["bg1"], **kwargs)
         self.current = None
@@ -75,7 +428,15 @@ class PanelSwitcher(ctk.CTkFrame):
         def ease_in_out_quad(t: float) -> float:
             return 2 * t * t if t < 0.5 else -1 + (4 - 2 * t) * t
 
+        last = [time.perf_counter()]
+
         def animate(step=0):
+            if self.monitor is not None:
+                # time since the previous frame: the scheduled interval plus any stall
+                now = time.perf_counter()
+                if step:
+                    self.monitor.record("frame", "PanelSwitcher.transition_to", (now - last[0]) * 1000)
+                last[0] = now
             t = step / steps
             prog = ease_in_out_quad(t)
             offset = start_x * (1 - prog)
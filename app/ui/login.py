@@ -1,6 +1,7 @@
 import customtkinter as ctk
 from tkinter import messagebox
-from app.config import COLORS, FONTS, set_mode, CURRENT_MODE
+from app import config
+from app.config import COLORS, FONTS, set_mode
 from app.controllers.auth import login as auth_login
 
 
@@ -21,9 +22,11 @@ class LoginFrame(ctk.CTkFrame):
         title.pack(side="left", padx=16)
         # Theme toggle
         theme = ctk.CTkSegmentedButton(header, values=["Light", "Dark"]) 
-        theme.set("Dark" if CURRENT_MODE == "dark" else "Light")
+        theme.set("Light" if config.CURRENT_MODE == "light" else "Dark")
         def _toggle(val):
-            set_mode("light" if val.lower().startswith("light") else "dark")
+            if set_mode("light" if val.lower().startswith("light") else "dark"):
+                from app.ui.theme import restyle
+                restyle(self.winfo_toplevel())
         theme.configure(command=_toggle)
         theme.pack(side="right", padx=16)
 
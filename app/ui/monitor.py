@@ -0,0 +1,225 @@
+"""Event-loop lag and UI timing probes.
+
+``UiMonitor`` reschedules itself with ``after(probe_ms)``, like
+``AppController._tick_clock``, and records how late each probe fires – time
+the Tk thread spent busy elsewhere. Work on the Tk thread (view ``refresh()``,
+background-load callbacks, ``PanelSwitcher`` frames) is timed with
+``monitor.timed(kind, name)``. A lag sample names the sections that ran since
+the previous probe, so a stall can be pinned on specific code.
+
+Samples go into a fixed-size ring buffer; per-kind histograms cover the whole
+session. ``export_json(path)`` writes both.
+"""
+import bisect
+import collections
+import contextlib
+import datetime
+import json
+import math
+import time
+from typing import Dict, List, Optional, Tuple
+
+import customtkinter as ctk
+from app.config import COLORS, UI_MONITOR_SETTINGS
+
+# histogram bucket upper edges in ms (16/33 ms = one frame at 60/30 fps); the last bucket is open
+BUCKETS_MS = (1, 2, 5, 10, 16, 33, 50, 100, 250, 500, 1000)
+MAX_SECTIONS = 20   # section names remembered between two probes
+
+
+class Histogram:
+    def __init__(self, edges: Tuple[float, ...] = BUCKETS_MS):
+        self.edges = edges
+        self.counts = [0] * (len(edges) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect.bisect_left(self.edges, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def labels(self) -> List[str]:
+        bounds = (0,) + self.edges
+        return [f"{lo:g}-{hi:g}" for lo, hi in zip(bounds, self.edges)] + [f">{self.edges[-1]:g}"]
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets_ms": dict(zip(self.labels(), self.counts)),
+        }
+
+
+class UiMonitor:
+    """Usage:
+        monitor = UiMonitor(root)
+        monitor.start()
+        with monitor.timed("refresh", "StudentsView"):
+            view.refresh()
+    """
+
+    def __init__(self, widget, probe_ms: Optional[int] = None, capacity: Optional[int] = None,
+                 record_lag_ms: Optional[float] = None):
+        s = UI_MONITOR_SETTINGS
+        self.widget = widget
+        self.probe_ms = probe_ms or s["probe_ms"]
+        self.record_lag_ms = s["record_lag_ms"] if record_lag_ms is None else record_lag_ms
+        # (unix time, kind, name, ms) – oldest samples fall off the left
+        self.samples = collections.deque(maxlen=capacity or s["capacity"])
+        self.histograms: Dict[str, Histogram] = {}
+        self.started = datetime.datetime.now()
+        self._sections: List[str] = []
+        self._after = None
+        self._expected = 0.0
+
+    # --- Probe ---
+    def start(self):
+        if self._after is None:
+            self._schedule()
+
+    def stop(self):
+        if self._after is not None:
+            try:
+                self.widget.after_cancel(self._after)
+            except Exception:
+                pass
+            self._after = None
+
+    @property
+    def running(self) -> bool:
+        return self._after is not None
+
+    def _schedule(self):
+        self._expected = time.perf_counter() + self.probe_ms / 1000
+        self._after = self.widget.after(self.probe_ms, self._probe)
+
+    def _probe(self):
+        lag = max(time.perf_counter() - self._expected, 0.0) * 1000
+        during = ", ".join(dict.fromkeys(self._sections)) or "-"
+        self._sections = []
+        self._histogram("lag").add(lag)
+        # idle probes only feed the histogram; the ring keeps the stalls
+        if lag >= self.record_lag_ms:
+            self.samples.append((time.time(), "lag", during, lag))
+        self._schedule()
+
+    # --- Timed sections ---
+    @contextlib.contextmanager
+    def timed(self, kind: str, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(kind, name, (time.perf_counter() - t0) * 1000)
+
+    def record(self, kind: str, name: str, ms: float):
+        self._histogram(kind).add(ms)
+        self.samples.append((time.time(), kind, name, ms))
+        if self._after is not None and len(self._sections) < MAX_SECTIONS:
+            self._sections.append(f"{kind} {name}")
+
+    def _histogram(self, kind: str) -> Histogram:
+        h = self.histograms.get(kind)
+        if h is None:
+            h = self.histograms[kind] = Histogram()
+        return h
+
+    # --- Reporting ---
+    def summary(self) -> List[Tuple[str, str, int, float, float, float]]:
+        """(kind, name, count, p50 ms, p95 ms, max ms) over the ring buffer, worst p95 first."""
+        groups: Dict[Tuple[str, str], List[float]] = {}
+        for _at, kind, name, ms in self.samples:
+            groups.setdefault((kind, name), []).append(ms)
+        rows = []
+        for (kind, name), values in groups.items():
+            values.sort()
+            rows.append((kind, name, len(values), _percentile(values, 0.5), _percentile(values, 0.95), values[-1]))
+        rows.sort(key=lambda r: r[4], reverse=True)
+        return rows
+
+    def as_dict(self) -> Dict:
+        return {
+            "started": self.started.isoformat(sep=" ", timespec="seconds"),
+            "exported": datetime.datetime.now().isoformat(sep=" ", timespec="seconds"),
+            "probe_ms": self.probe_ms,
+            "record_lag_ms": self.record_lag_ms,
+            "histograms": {kind: h.as_dict() for kind, h in self.histograms.items()},
+            "summary": [
+                {"kind": k, "name": n, "count": c, "p50_ms": round(p50, 3), "p95_ms": round(p95, 3), "max_ms": round(mx, 3)}
+                for k, n, c, p50, p95, mx in self.summary()
+            ],
+            "samples": [
+                {"at": datetime.datetime.fromtimestamp(at).isoformat(sep=" ", timespec="milliseconds"),
+                 "kind": kind, "name": name, "ms": round(ms, 3)}
+                for at, kind, name, ms in self.samples
+            ],
+        }
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    # nearest-rank percentile
+    return sorted_values[max(math.ceil(p * len(sorted_values)) - 1, 0)]
+
+
+class MonitorOverlay(ctk.CTkFrame):
+    """Small always-on-top readout of a ``UiMonitor`` in the window corner."""
+
+    REFRESH_MS = 500
+
+    def __init__(self, master, monitor: UiMonitor):
+        super().__init__(master, fg_color=COLORS["panel"], corner_radius=8, border_width=1, border_color=COLORS["gold_dim"])
+        self.monitor = monitor
+        self.text = ctk.CTkLabel(self, text="", text_color=COLORS["white"], font=("Consolas", 11), justify="left", anchor="w")
+        self.text.pack(side="left", padx=8, pady=4)
+        ctk.CTkButton(self, text="Export", width=60, fg_color=COLORS["gold"], hover_color=COLORS["gold_dim"],
+                      text_color=COLORS["bg1"], command=self._export).pack(side="left", padx=(0, 8), pady=4)
+        self._after = None
+
+    def show(self):
+        if self._after is not None:
+            self.after_cancel(self._after)
+        self.place(relx=1.0, rely=0.0, x=-12, y=12, anchor="ne")
+        self.lift()
+        self._update()
+
+    def hide(self):
+        if self._after is not None:
+            self.after_cancel(self._after)
+            self._after = None
+        self.place_forget()
+
+    def toggle(self):
+        if self.winfo_ismapped():
+            self.hide()
+        else:
+            self.show()
+
+    def _update(self):
+        lag = self.monitor.histograms.get("lag")
+        lines = [f"lag  mean {lag.total_ms / lag.count:5.1f}  max {lag.max_ms:7.1f} ms" if lag and lag.count else "lag  –"]
+        for kind, name, count, _p50, p95, worst in self.monitor.summary()[:4]:
+            lines.append(f"{kind:<8} {name[:34]:<34} p95 {p95:7.1f}  max {worst:7.1f}  ×{count}")
+        self.text.configure(text="\n".join(lines))
+        self.lift()
+        self._after = self.after(self.REFRESH_MS, self._update)
+
+    def _export(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(
+            defaultextension=".json", filetypes=[("JSON", "*.json")],
+            initialfile=f"ui-timings-{datetime.datetime.now():%Y%m%d-%H%M%S}.json",
+        )
+        if path:
+            self.monitor.export_json(path)
+
+    def destroy(self):
+        self.hide()
+        super().destroy()
@@ -18,6 +18,7 @@ class SplashScreen(ctk.CTkToplevel):
         self.progress.pack(pady=10)
         self.sub = ctk.CTkLabel(self, text="Loading", font=FONTS["body"], text_color=COLORS["muted"]) 
         self.sub.pack(pady=(4, 0))
+        self._label = "Loading"
         self._dots = 0
         self._animate_dots()
 
@@ -30,11 +31,11 @@ class SplashScreen(ctk.CTkToplevel):
 
     def _animate_dots(self):
         self._dots = (self._dots + 1) % 4
-        self.sub.configure(text="Loading" + "." * self._dots)
+        self.sub.configure(text=self._label + "." * self._dots)
         self.after(300, self._animate_dots)
 
-    def step(self):
-        # ease-in progress
-        val = self.progress.get()
-        inc = 0.02 if val < 0.6 else 0.01
-        self.progress.set(min(val + inc, 1.0))
+    def set_progress(self, fraction: float, label: str):
+        """Show warm-up progress: *fraction* of the work done, *label* the current step."""
+        self.progress.set(min(max(fraction, 0.0), 1.0))
+        self._label = label
+        self.sub.configure(text=label + "." * self._dots)
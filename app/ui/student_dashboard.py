@@ -2,24 +2,34 @@ import customtkinter as ctk
 from tkinter import ttk
 from app.config import COLORS, FONTS
 from app.ui.components import style_treeview
+from app.ui.tasks import AsyncView
 
 
-class StudentApp(ctk.CTkFrame):
-    def __init__(self, master, db, user_record, on_logout):
+class StudentApp(AsyncView, ctk.CTkFrame):
+    INBOX_LIMIT = 200          # announcements loaded when the dashboard opens
+    INBOX_POLL_MS = 60_000     # then only newer ones are fetched this often
+
+    def __init__(self, master, db, user_record, on_logout, tasks=None):
         super().__init__(master, fg_color=COLORS["bg1"]) 
         self.db = db
         self.user = user_record
         self.on_logout = on_logout
+        self.tasks = tasks
+        # largest message id shown so far (the inbox cursor)
+        self.last_message_id = 0
+        self._poll_id = None
 
         header = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=0)
         header.pack(fill="x")
         ctk.CTkLabel(header, text=f"Welcome, {self.user['name']}", font=FONTS["h2"], text_color=COLORS["gold"]).pack(side="left", padx=12, pady=8)
+        self.unread_badge = ctk.CTkButton(header, text="", width=40, fg_color=COLORS["gold"], text_color=COLORS["bg1"],
+                                          command=lambda: self._open_tab("Announcements"))
         # Logout bottom-left anchor
         footer = ctk.CTkFrame(self, fg_color=COLORS["panel"], corner_radius=0)
         footer.pack(side="bottom", fill="x")
         ctk.CTkButton(footer, text="Logout", fg_color=COLORS["gold"], text_color=COLORS["bg1"], command=self.on_logout).pack(side="left", padx=12, pady=8)
 
-        self.tabs = ctk.CTkTabview(self)
+        self.tabs = ctk.CTkTabview(self, command=self._on_tab)
         self.tabs.pack(fill="both", expand=True, padx=12, pady=12)
         self.home = self.tabs.add("Home")
         self.timetable = self.tabs.add("Timetable")
@@ -39,14 +49,11 @@ class StudentApp(ctk.CTkFrame):
             tv.column(c, width=160, anchor="w")
         tv.pack(fill="both", expand=True, padx=8, pady=8)
         style_treeview(tv)
-        for d, s in self.db.get_attendance(self.user['id']):
-            tv.insert('', 'end', values=(d, s))
+        self.attendance_table = tv
 
         # Fees summary
-        f = self.db.get_fees(self.user['id'])
-        paid, pending, last = (f or (0, 0, None))
-        ctk.CTkLabel(self.fees, text=f"Paid: ₹ {paid:.2f}\nPending: ₹ {pending:.2f}\nLast Payment: {last or '-'}",
-                     font=FONTS["h2"], text_color=COLORS["gold"]).pack(pady=16)
+        self.fees_label = ctk.CTkLabel(self.fees, text="", font=FONTS["h2"], text_color=COLORS["gold"])
+        self.fees_label.pack(pady=16)
 
         # Messages
         cols2 = ("Message", "Date", "Sender")
@@ -56,31 +63,114 @@ class StudentApp(ctk.CTkFrame):
             tv2.column(c, width=220, anchor="w")
         tv2.pack(fill="both", expand=True, padx=8, pady=8)
         style_treeview(tv2)
-        for m, d, s in self.db.list_messages_for(self.user['username']):
-            tv2.insert('', 'end', values=(m, d, s))
+        self.messages_table = tv2
 
         # Profile + Change Password
         self._build_profile()
 
+        # Everything above is filled in once the queries finish off the Tk thread
+        self.load(self._fetch, self._populate)
+
+    def _fetch(self):
+        sid, username = self.user['id'], self.user['username']
+        return {
+            "inbox": self.db.inbox(username, limit=self.INBOX_LIMIT),
+            "unread": self.db.unread_count(username),
+            "pct": self.db.attendance_percentage(sid),
+            "next_classes": self.db.next_classes_for(self.user.get('batch', '')) or [],
+            "attendance": self.db.get_attendance(sid),
+            "fees": self.db.get_fees(sid),
+            "averages": self.db.subject_averages(student_id=sid),
+            "ranks": self.db.student_ranks(sid, limit=1),
+        }
+
+    def _populate(self, data):
+        self.attendance_card.set_value(f"{data['pct']}%")
+        for _id, b, d, t, s, tid, starts_at in data["next_classes"]:
+            self.upcoming_table.insert('', 'end', values=(f"{d} {starts_at:%d %b}", t, s))
+        self._add_messages((data["inbox"], data["unread"]))
+        averages = [(sub, avg, n) for sub, avg, n, _best in data["averages"] if avg is not None]
+        if averages:
+            overall = sum(avg * n for _s, avg, n in averages) / sum(n for _s, _a, n in averages)
+            lines = [f"Average: {overall:.1f}", "  ".join(f"{sub}: {avg:g}" for sub, avg, _n in averages)]
+            if data["ranks"]:
+                sub, date, marks, rank, sat, pct = data["ranks"][0]
+                lines.append(f"Latest {sub} test ({date}): {marks:g}, rank {rank} of {sat} ({pct:g} percentile)")
+            self.perf_label.configure(text="\n".join(lines), font=FONTS["h2"], text_color=COLORS["white"], justify="left")
+        else:
+            self.perf_label.configure(text="No marks available")
+
+        for d, s in data["attendance"]:
+            self.attendance_table.insert('', 'end', values=(d, s))
+        paid, pending, last = (data["fees"] or (0, 0, None))
+        self.fees_label.configure(text=f"Paid: ₹ {paid:.2f}\nPending: ₹ {pending:.2f}\nLast Payment: {last or '-'}")
+        self._poll_id = self.after(self.INBOX_POLL_MS, self._poll_inbox)
+
+    def _poll_inbox(self):
+        username, since = self.user['username'], self.last_message_id
+        self.load(lambda: (self.db.inbox(username, since_id=since), self.db.unread_count(username)),
+                  self._add_messages, key="inbox", quiet=True)
+        self._poll_id = self.after(self.INBOX_POLL_MS, self._poll_inbox)
+
+    def _add_messages(self, data):
+        rows, unread = data
+        # rows are newest first; insert oldest first at the top to keep that order
+        for mid, m, d, s in reversed(rows):
+            if mid <= self.last_message_id:
+                continue
+            self.last_message_id = mid
+            self.messages_table.insert('', 0, values=(m, d, s))
+            self.recent_ann_table.insert('', 0, values=(m, d))
+        extra = self.recent_ann_table.get_children()[8:]
+        if extra:
+            self.recent_ann_table.delete(*extra)
+        if self.tabs.get() == "Announcements":
+            self._mark_read()
+        else:
+            self._set_unread(unread)
+
+    def _set_unread(self, count: int):
+        if count:
+            self.unread_badge.configure(text=f"{count} new")
+            self.unread_badge.pack(side="right", padx=12, pady=8)
+        else:
+            self.unread_badge.pack_forget()
+
+    def _open_tab(self, name: str):
+        self.tabs.set(name)
+        self._on_tab()
+
+    def _on_tab(self):
+        if self.tabs.get() == "Announcements":
+            self._mark_read()
+
+    def _mark_read(self):
+        self._set_unread(0)
+        if self.last_message_id:
+            username, up_to = self.user['username'], self.last_message_id
+            self.load(lambda: self.db.mark_read(username, up_to), lambda _r: None, key="read", quiet=True)
+
+    def destroy(self):
+        if self._poll_id is not None:
+            self.after_cancel(self._poll_id)
+            self._poll_id = None
+        super().destroy()
+
     def _build_home(self):
         grid = ctk.CTkFrame(self.home, fg_color=COLORS["bg1"]) 
         grid.pack(fill="both", expand=True, padx=12, pady=12)
         # Top metrics
         from app.ui.components import Card
-        # Attendance %
-        try:
-            pct = self.db.attendance_percentage(self.user['id'])
-        except Exception:
-            pct = 0
         metrics = [
             ("Name", self.user['name']),
             ("Roll No", str(self.user['id'])),
             ("Class", self.user['class']),
-            ("Attendance", f"{pct}%"),
+            ("Attendance", "…"),
         ]
         for i,(t,v) in enumerate(metrics):
             card = Card(grid, t, v)
             card.grid(row=0, column=i, padx=8, pady=8, sticky="nsew")
+        self.attendance_card = card
         for i in range(len(metrics)):
             grid.grid_columnconfigure(i, weight=1)
 
@@ -94,8 +184,7 @@ class StudentApp(ctk.CTkFrame):
             tv.heading(c, text=c); tv.column(c, width=120, anchor="w")
         tv.pack(fill="both", expand=True, padx=12, pady=8)
         style_treeview(tv)
-        for _id,b,d,t,s,tid in (self.db.next_classes_for(self.user.get('batch','')) or []):
-            tv.insert('', 'end', values=(d,t,s))
+        self.upcoming_table = tv
 
         # Announcements preview
         ann = ctk.CTkFrame(grid, fg_color=COLORS["panel"], corner_radius=12)
@@ -107,22 +196,14 @@ class StudentApp(ctk.CTkFrame):
             tv2.heading(c, text=c); tv2.column(c, width=220, anchor="w")
         tv2.pack(fill="both", expand=True, padx=12, pady=8)
         style_treeview(tv2)
-        for m,d,_s in self.db.list_messages_for(self.user['username'])[:8]:
-            tv2.insert('', 'end', values=(m,d))
+        self.recent_ann_table = tv2
 
         # Performance summary (average marks if any)
         perf = ctk.CTkFrame(grid, fg_color=COLORS["panel"], corner_radius=12)
         perf.grid(row=2, column=0, columnspan=4, padx=8, pady=8, sticky="nsew")
         ctk.CTkLabel(perf, text="Performance Summary", text_color=COLORS["gold"], font=FONTS["h2"]).pack(anchor="w", padx=12, pady=6)
-        try:
-            marks = self.db.get_marks(self.user['id'])
-            if marks:
-                avg = sum(m for _sub,m,_d in marks)/len(marks)
-                ctk.CTkLabel(perf, text=f"Average: {avg:.1f}", font=FONTS["h2"], text_color=COLORS["white"]).pack(anchor="w", padx=12, pady=6)
-            else:
-                ctk.CTkLabel(perf, text="No marks available", font=FONTS["body"], text_color=COLORS["muted"]).pack(anchor="w", padx=12, pady=6)
-        except Exception:
-            ctk.CTkLabel(perf, text="No marks available", font=FONTS["body"], text_color=COLORS["muted"]).pack(anchor="w", padx=12, pady=6)
+        self.perf_label = ctk.CTkLabel(perf, text="…", font=FONTS["body"], text_color=COLORS["muted"])
+        self.perf_label.pack(anchor="w", padx=12, pady=6)
 
         for i in range(4):
             grid.grid_columnconfigure(i, weight=1)
@@ -0,0 +1,153 @@
+import itertools
+import queue
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import customtkinter as ctk
+from tkinter import messagebox
+from app.config import COLORS
+
+
+class BackgroundTasks:
+    """Run blocking work (mostly Database calls) off the Tk thread.
+
+    Usage:
+        tasks = BackgroundTasks(root)
+        tasks.submit(view, lambda: db.list_batches(), on_done=view.render)
+
+    Workers never touch Tk: finished futures are queued and drained by an
+    ``after`` poll on the Tk thread, which then calls ``on_done(result)`` or
+    ``on_error(exc)``. Each request belongs to an *owner* (usually a view);
+    a newer request or ``cancel(owner)`` makes older results stale and they
+    are dropped on arrival.
+    """
+
+    POLL_MS = 15
+
+    def __init__(self, widget, max_workers: int = 3, monitor=None):
+        self.widget = widget
+        # optional UiMonitor: result callbacks are timed as "render" sections
+        self.monitor = monitor
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._done = queue.SimpleQueue()
+        self._latest = {}
+        self._tokens = itertools.count(1)
+        self._poll_id = None
+        self._closed = False
+
+    def submit(self, owner, fetch, on_done, on_error=None) -> int:
+        token = next(self._tokens)
+        self._latest[owner] = token
+        future = self._pool.submit(fetch)
+        future.add_done_callback(lambda f: self._done.put((owner, token, f, on_done, on_error)))
+        self._schedule_poll()
+        return token
+
+    def cancel(self, owner):
+        self._latest.pop(owner, None)
+
+    def busy(self, owner) -> bool:
+        return owner in self._latest
+
+    def shutdown(self):
+        self._closed = True
+        self._latest.clear()
+        if self._poll_id is not None:
+            try:
+                self.widget.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule_poll(self):
+        if self._poll_id is None and not self._closed:
+            self._poll_id = self.widget.after(self.POLL_MS, self._drain)
+
+    def _drain(self):
+        self._poll_id = None
+        while True:
+            try:
+                owner, token, future, on_done, on_error = self._done.get_nowait()
+            except queue.Empty:
+                break
+            if self._latest.get(owner) != token:
+                continue  # superseded, cancelled or owner navigated away
+            del self._latest[owner]
+            if self.monitor is None:
+                self._finish(future, on_done, on_error)
+            else:
+                with self.monitor.timed("render", _owner_name(owner)):
+                    self._finish(future, on_done, on_error)
+        if self._latest:
+            self._schedule_poll()
+
+    @staticmethod
+    def _finish(future, on_done, on_error):
+        exc = future.exception()
+        if exc is None:
+            on_done(future.result())
+        elif on_error is not None:
+            on_error(exc)
+        else:
+            traceback.print_exception(type(exc), exc, exc.__traceback__)
+
+
+def _owner_name(owner) -> str:
+    # AsyncView owners are (view, key) pairs
+    if isinstance(owner, tuple) and len(owner) == 2:
+        view, key = owner
+        return f"{type(view).__name__}:{key}"
+    return type(owner).__name__
+
+
+class AsyncView:
+    """Mixin for frames whose ``refresh()`` loads data via ``BackgroundTasks``.
+
+    Set ``tasks`` to enable background loading; without it ``load`` runs
+    synchronously, so views still work on their own. Loads with the same
+    *key* supersede each other; different keys (e.g. the view's data and a
+    table's next page) run independently. ``quiet`` loads (background polls)
+    skip the "Loading…" overlay.
+    """
+
+    tasks = None
+    _loading_label = None
+    _load_keys = frozenset()
+
+    def load(self, fetch, apply, key: str = "refresh", quiet: bool = False):
+        if self.tasks is None:
+            apply(fetch())
+            return
+        self._load_keys = self._load_keys | {key}
+        if not quiet:
+            self._show_loading()
+
+        def done(result):
+            self._update_loading()
+            apply(result)
+
+        def failed(exc):
+            self._update_loading()
+            messagebox.showerror("Error", str(exc))
+
+        self.tasks.submit((self, key), fetch, done, failed)
+
+    def cancel_loading(self):
+        if self.tasks is not None:
+            for key in self._load_keys:
+                self.tasks.cancel((self, key))
+        self._update_loading()
+
+    def _update_loading(self):
+        pending = self.tasks is not None and any(
+            self.tasks.busy((self, key)) for key in self._load_keys
+        )
+        if not pending and self._loading_label is not None:
+            self._loading_label.place_forget()
+
+    def _show_loading(self):
+        if self._loading_label is None:
+            self._loading_label = ctk.CTkLabel(self, text="Loading…", text_color=COLORS["muted"])
+        self._loading_label.place(relx=0.5, rely=0.5, anchor="center")
+        self._loading_label.lift()
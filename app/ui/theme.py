@@ -0,0 +1,69 @@
+"""Restyle live widgets after ``config.set_theme``.
+
+Every ``COLORS`` value is a ``ThemeColor`` that carries its palette key, so a
+widget built with ``fg_color=COLORS["panel"]`` has registered that it uses
+"panel". ``restyle(root)`` walks the widget tree and points each such option
+at the current palette's colour – existing widgets are recoloured in place,
+nothing is rebuilt. Widgets whose colours live outside CTk options (ttk
+styles, matplotlib figures) define ``apply_theme()``, which is called too.
+"""
+import tkinter
+from typing import Dict, Tuple
+
+import customtkinter as ctk
+from app.config import COLORS, ThemeColor
+from app.ui.components import apply_treeview_style
+
+# CTk options that may hold a palette colour
+COLOR_OPTIONS = (
+    "fg_color", "bg_color", "text_color", "hover_color", "border_color",
+    "button_color", "button_hover_color", "progress_color", "placeholder_text_color",
+    "selected_color", "selected_hover_color", "unselected_color", "unselected_hover_color",
+    "dropdown_fg_color", "dropdown_hover_color", "dropdown_text_color",
+    "scrollbar_button_color", "scrollbar_button_hover_color",
+    "segmented_button_fg_color", "segmented_button_selected_color",
+    "segmented_button_selected_hover_color", "segmented_button_unselected_color",
+)
+
+# widget class -> the COLOR_OPTIONS it supports, probed once per class
+_options: Dict[type, Tuple[str, ...]] = {}
+
+
+def _color_options(widget) -> Tuple[str, ...]:
+    cls = type(widget)
+    options = _options.get(cls)
+    if options is None:
+        supported = []
+        for name in COLOR_OPTIONS:
+            try:
+                widget.cget(name)
+            except (ValueError, KeyError, AttributeError, tkinter.TclError):
+                continue
+            supported.append(name)
+        options = _options[cls] = tuple(supported)
+    return options
+
+
+def restyle(root) -> int:
+    """Recolour *root* and its descendants for the current ``COLORS``; returns widgets changed."""
+    apply_treeview_style(root)
+    changed = 0
+    stack = [root]
+    while stack:
+        widget = stack.pop()
+        # parents first: a CTkFrame passes its new fg_color on to its children's bg_color
+        stack.extend(widget.winfo_children())
+        hook = getattr(widget, "apply_theme", None)
+        if hook is not None:
+            hook()
+        if not isinstance(widget, (ctk.CTkBaseClass, ctk.CTk, ctk.CTkToplevel)):
+            continue
+        updates = {}
+        for name in _color_options(widget):
+            value = widget.cget(name)
+            if isinstance(value, ThemeColor) and value is not COLORS[value.key]:
+                updates[name] = COLORS[value.key]
+        if updates:
+            widget.configure(**updates)
+            changed += 1
+    return changed
@@ -0,0 +1,52 @@
+"""Compare per-row ``mark_attendance`` with batched ``mark_attendance_many``.
+
+Run from the repo root:
+    python -m benchmarks.attendance_bulk [--students 60] [--days 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.database import Database
+
+
+def _setup(path: str, students: int):
+    db = Database(path)
+    db.init_db()
+    db.upsert_batch("Bench", "Maths", "4-5")
+    ids = [db.add_student({"name": f"Student {i:03d}", "username": f"bench{i}", "batch": "Bench"})
+           for i in range(students)]
+    return db, ids
+
+
+def run(students: int = 60, days: int = 20):
+    with tempfile.TemporaryDirectory() as tmp:
+        db, ids = _setup(os.path.join(tmp, "bench.db"), students)
+        dates = [f"2024-01-{d + 1:02d}" for d in range(days)]
+
+        t0 = time.perf_counter()
+        for date in dates:
+            for sid in ids:
+                db.mark_attendance(sid, date, "Present")
+        per_row = (time.perf_counter() - t0) / days
+
+        t0 = time.perf_counter()
+        for date in dates:
+            db.mark_attendance_many(date, [(sid, "Absent") for sid in ids])
+        bulk = (time.perf_counter() - t0) / days
+        db.close_all()
+
+    print(f"{students} students x {days} days")
+    print(f"  per-row mark_attendance : {per_row * 1000:8.2f} ms / roster")
+    print(f"  mark_attendance_many    : {bulk * 1000:8.2f} ms / roster")
+    print(f"  speed-up                : {per_row / bulk:8.1f}x")
+    return per_row, bulk
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--students", type=int, default=60)
+    ap.add_argument("--days", type=int, default=20)
+    args = ap.parse_args()
+    run(args.students, args.days)
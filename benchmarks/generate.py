@@ -0,0 +1,149 @@
+"""Fill a scratch database with seeded, realistically shaped data.
+
+At ``--scale 1`` that is 10k students in 200 batches, ~2M attendance rows
+(200 class days), 100k messages, a weekly timetable per batch, fee payments
+and test marks. The same seed always produces the same database.
+
+Run from the repo root:
+    python -m benchmarks.generate PATH [--scale 0.1] [--seed 42]
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+from typing import Dict
+
+from app.database import TIMETABLE_INSERT, Database
+from app.schedule import DAYS, week_minute
+
+FULL = {
+    "students": 10_000,
+    "batches": 200,
+    "class_days": 200,     # attendance rows ~= students * class_days
+    "messages": 100_000,
+    "teachers": 40,
+    "tests": 12,           # per batch
+}
+
+SUBJECTS = ["Maths", "Science", "English", "Physics", "Chemistry", "Biology"]
+SLOTS = ["4-5", "5-6", "6-7", "7-8"]
+_FIRST = ["Aarav", "Vivaan", "Aditya", "Ishaan", "Riya", "Ananya", "Diya", "Kabir", "Meera", "Arjun",
+          "Saanvi", "Rohan", "Priya", "Karan", "Neha", "Vikram", "Pooja", "Rahul", "Sneha", "Aryan"]
+_LAST = ["Sharma", "Verma", "Gupta", "Singh", "Kumar", "Patel", "Reddy", "Nair", "Iyer", "Das",
+         "Mehta", "Joshi", "Arora", "Kapoor", "Malhotra", "Chopra", "Bose", "Rao", "Jain", "Khan"]
+START = datetime.date(2024, 6, 3)  # a Monday
+
+
+def volumes(scale: float) -> Dict[str, int]:
+    v = {k: max(1, int(round(n * scale))) for k, n in FULL.items()}
+    # keep class sizes realistic at small scales; history length stays fixed
+    v["batches"] = max(1, min(v["batches"], v["students"] // 20 or 1))
+    v["class_days"] = FULL["class_days"] if scale >= 0.1 else max(20, v["class_days"])
+    v["tests"] = FULL["tests"]
+    return v
+
+
+def _class_dates(n: int):
+    # Mon-Sat, skipping Sundays
+    d, out = START, []
+    while len(out) < n:
+        if d.weekday() != 6:
+            out.append(d.isoformat())
+        d += datetime.timedelta(days=1)
+    return out
+
+
+def generate(path: str, scale: float = 1.0, seed: int = 42, log=print) -> Dict[str, int]:
+    """Create *path* (must not exist) and fill it; returns the row counts."""
+    if os.path.exists(path):
+        raise FileExistsError(path)
+    rng = random.Random(seed)
+    v = volumes(scale)
+    db = Database(path)
+    db.init_db()
+    con = db.connect()
+    counts: Dict[str, int] = {}
+    t0 = time.perf_counter()
+
+    def step(name: str, sql: str, rows):
+        with con:
+            counts[name] = con.executemany(sql, rows).rowcount
+        log(f"  {name:<12} {counts[name]:>10,}  ({time.perf_counter() - t0:6.1f}s)")
+
+    batches = [(f"B{i + 1:03d}", SUBJECTS[i % len(SUBJECTS)], SLOTS[i % len(SLOTS)]) for i in range(v["batches"])]
+    step("batches", "INSERT INTO Batches(name, subject, time) VALUES(?,?,?)", batches)
+    step("teachers", "INSERT INTO Teachers(name, subjects, availability) VALUES(?,?,?)",
+         ((f"{rng.choice(_FIRST)} {rng.choice(_LAST)}", ", ".join(rng.sample(SUBJECTS, 2)), "Mon-Sat")
+          for _ in range(v["teachers"])))
+
+    students = []
+    for i in range(v["students"]):
+        name = f"{rng.choice(_FIRST)} {rng.choice(_LAST)}"
+        batch = batches[i % len(batches)][0]
+        students.append((name, rng.randint(11, 18), str(rng.randint(6, 12)), f"98{rng.randint(10**7, 10**8 - 1)}",
+                         f"s{i + 1}@example.com", f"s{i + 1}", "pass", batch, "", f"97{rng.randint(10**7, 10**8 - 1)}"))
+    step("students", """
+        INSERT INTO Students(name, age, class, contact, email, username, password, batch, parent_contact, student_contact)
+        VALUES(?,?,?,?,?,?,?,?,?,?)""", students)
+    ids = [r[0] for r in con.execute("SELECT id FROM Students ORDER BY id")]
+
+    # each student has a steady attendance habit; most attend 80-95%
+    habit = {sid: rng.betavariate(9, 1.6) for sid in ids}
+    dates = _class_dates(v["class_days"])
+    step("attendance", "INSERT INTO Attendance(student_id, date, status) VALUES(?,?,?)",
+         ((sid, d, "Present" if rng.random() < habit[sid] else "Absent") for d in dates for sid in ids))
+
+    week = len(SLOTS) * 6
+
+    def timetable():
+        for b, (name, _s, _t) in enumerate(batches):
+            for k in rng.sample(range(week), 6):
+                day, slot = DAYS[k % 6], SLOTS[(b + k) % len(SLOTS)]
+                yield name, day, slot, rng.choice(SUBJECTS), rng.randint(1, v["teachers"]), k % 6, week_minute(day, slot)
+    step("timetable", TIMETABLE_INSERT, timetable())
+
+    usernames = [s[5] for s in students]
+    span = (datetime.date.fromisoformat(dates[-1]) - START).days * 86400
+    stamps = sorted(rng.randrange(span) for _ in range(v["messages"]))
+    base = datetime.datetime.combine(START, datetime.time(8))
+    step("messages", "INSERT INTO Messages(message_text, date_sent, sender_type, recipient) VALUES(?,?,?,?)",
+         ((f"Notice {i + 1}: " + rng.choice(["class rescheduled", "test on Friday", "fees due", "holiday", "homework posted"]),
+           (base + datetime.timedelta(seconds=s)).isoformat(sep=" ", timespec="seconds"),
+           "admin", "all" if rng.random() < 0.2 else rng.choice(usernames))
+          for i, s in enumerate(stamps)))
+
+    # a term fee in three instalments, each paid with 85% probability
+    def payments():
+        for sid, s in zip(ids, students):
+            fee, paid = rng.choice([6000.0, 7500.0, 9000.0]), 0.0
+            for k in range(3):
+                if rng.random() < 0.85:
+                    paid += fee / 3
+                    day = START + datetime.timedelta(days=60 * k + rng.randint(0, 20))
+                    yield sid, day.isoformat(), round(fee / 3, 2), round(fee - paid, 2), s[7]
+    step("payments", "INSERT INTO Payments(student_id, date, amount, pending_after, batch) VALUES(?,?,?,?,?)", payments())
+
+    test_days = dates[:: max(len(dates) // v["tests"], 1)][: v["tests"]]
+    by_batch: Dict[str, list] = {}
+    for sid, s in zip(ids, students):
+        by_batch.setdefault(s[7], []).append(sid)
+    step("performance", "INSERT INTO Performance(student_id, subject, marks, date) VALUES(?,?,?,?)",
+         ((sid, subject, float(min(100, max(0, round(rng.gauss(45 + 40 * habit[sid], 12))))), d)
+          for (name, subject, _t), members in ((b, by_batch.get(b[0], [])) for b in batches)
+          for d in test_days for sid in members))
+
+    with con:
+        con.execute("ANALYZE")
+    db.close_all()
+    log(f"  done in {time.perf_counter() - t0:.1f}s, {os.path.getsize(path) / 2**20:.0f} MiB")
+    return counts
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("path")
+    ap.add_argument("--scale", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+    generate(args.path, args.scale, args.seed)
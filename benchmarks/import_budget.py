@@ -0,0 +1,84 @@
+"""Check that ``import main`` stays fast and does not pull in heavy modules.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters, takes the
+best of ``--runs`` for the total, and fails (exit 1) if it exceeds the budget
+or if any module in ``DEFERRED`` was imported at startup. Those modules are
+loaded on demand (exports, charts) or by the splash warm-up instead.
+
+Run from the repo root:
+    python -m benchmarks.import_budget [--budget-ms 250] [--runs 5] [--top 15]
+``tests/test_import_budget.py`` runs the deferred-module check under pytest
+(the timing check too when ``IMPORT_BUDGET_TIMING=1`` is set).
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+BUDGET_MS = 250
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# must not be imported by `import main`
+DEFERRED = (
+    "matplotlib", "numpy", "openpyxl", "reportlab", "ttkthemes",
+    "app.ui.admin_dashboard", "app.ui.student_dashboard", "app.analytics",
+    "app.exporters", "app.importers", "app.tracing",
+)
+
+
+def deferred_imported(modules) -> List[str]:
+    """The names in *modules* that are, or are submodules of, a ``DEFERRED`` module."""
+    return sorted(m for m in modules if any(m == d or m.startswith(d + ".") for d in DEFERRED))
+
+
+def loaded_modules(module: str = "main") -> List[str]:
+    """``sys.modules`` after importing *module* in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-c", f"import sys, {module}; print('\\n'.join(sys.modules))"],
+                          capture_output=True, text=True, check=True, cwd=ROOT)
+    return proc.stdout.split()
+
+
+def measure(module: str = "main") -> Tuple[float, Dict[str, float]]:
+    """(total ms, {module: self ms}) for importing *module* in a fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          capture_output=True, text=True, check=True, cwd=ROOT)
+    self_ms: Dict[str, float] = {}
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if not own.isdigit():
+            continue  # header line
+        self_ms[name] = int(own) / 1000
+        if name == module:
+            total = int(cumulative) / 1000
+    return total, self_ms
+
+
+def check(budget_ms: float = BUDGET_MS, runs: int = 5, top: int = 15) -> List[str]:
+    results = [measure() for _ in range(runs)]
+    total, self_ms = min(results, key=lambda r: r[0])
+    print(f"import main: {total:.1f} ms (best of {runs}, budget {budget_ms:g} ms)")
+    for name, ms in sorted(self_ms.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {ms:8.1f} ms  {name}")
+    problems = []
+    if total > budget_ms:
+        problems.append(f"import main took {total:.1f} ms, over the {budget_ms:g} ms budget")
+    eager = deferred_imported(self_ms)
+    if eager:
+        problems.append("imported at startup but should be deferred: " + ", ".join(eager))
+    return problems
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15, help="slowest modules to list")
+    args = ap.parse_args()
+    problems = check(args.budget_ms, args.runs, args.top)
+    for p in problems:
+        print("FAIL:", p)
+    raise SystemExit(1 if problems else 0)
@@ -0,0 +1,231 @@
+"""Time ``Database`` methods on generated data and keep JSON baselines.
+
+Each case runs against a database from ``benchmarks.generate`` at every
+requested scale, with the query cache off, and reports p50/p95 latency and
+rows per second. Generated databases are reused from ``--data-dir`` (keyed by
+scale and seed), so only the first run pays for generation.
+
+Run from the repo root:
+    python -m benchmarks.suite [--scales 0.01,0.1,1] [--repeat 30] [--only list_students]
+    python -m benchmarks.suite --save benchmarks/baselines/main.json
+    python -m benchmarks.suite --compare benchmarks/baselines/main.json
+    python -m benchmarks.suite --trace --compare ...   # tracing overhead
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from app import analytics
+from app.database import Database
+from benchmarks.generate import generate
+
+REGRESSION = 0.20  # p50 slower than baseline by more than this is flagged
+
+
+def _ids(db: Database, sql: str) -> List:
+    with db.connect() as con:
+        return [r[0] for r in con.execute(sql)]
+
+
+class Fixture:
+    """Random but seeded arguments drawn from the generated data."""
+
+    def __init__(self, db: Database, seed: int):
+        self.rng = random.Random(seed)
+        self.student_ids = _ids(db, "SELECT id FROM Students")
+        self.usernames = _ids(db, "SELECT username FROM Students")
+        self.batches = _ids(db, "SELECT name FROM Batches")
+        self.names = _ids(db, "SELECT DISTINCT substr(name, 1, 3) FROM Students")
+        with db.connect() as con:
+            self.tests = con.execute("SELECT DISTINCT subject, date FROM Performance").fetchall()
+            self.last_date = con.execute("SELECT MAX(date) FROM Attendance").fetchone()[0]
+
+    def student(self):
+        return self.rng.choice(self.student_ids)
+
+    def username(self):
+        return self.rng.choice(self.usernames)
+
+    def batch(self):
+        return self.rng.choice(self.batches)
+
+    def prefix(self):
+        return self.rng.choice(self.names)
+
+    def test(self):
+        return self.rng.choice(self.tests)
+
+
+# name -> fn(db, fixture) returning the rows produced (for rows/s)
+CASES: Dict[str, Callable[[Database, Fixture], object]] = {
+    "list_students": lambda db, f: db.list_students(),
+    "list_students_page": lambda db, f: db.list_students_page(None, 200),
+    "search_students": lambda db, f: db.search_students(f.prefix()),
+    "search_students_by_id_prefix": lambda db, f: db.search_students_by_id_prefix(str(f.student())[:2]),
+    "student_index_match_id": lambda db, f: db.student_index.match(str(f.student())[:2]),
+    "student_index_match_name": lambda db, f: db.student_index.match(f.prefix()),
+    "get_student_by_id": lambda db, f: db.get_student_by_id(f.student()),
+    "attendance_percentage_student": lambda db, f: db.attendance_percentage(student_id=f.student()),
+    "attendance_percentage_batch": lambda db, f: db.attendance_percentage(batch=f.batch()),
+    "get_attendance": lambda db, f: db.get_attendance(f.student()),
+    "attendance_roster": lambda db, f: db.attendance_roster(f.batch(), f.last_date),
+    "attendance_matrix_batch": lambda db, f: analytics.load_attendance(db, batch=f.batch()).values,
+    "dashboard_summary": lambda db, f: db.dashboard_summary(),
+    "list_messages_for": lambda db, f: db.list_messages_for(f.username()),
+    "inbox_latest_50": lambda db, f: db.inbox(f.username(), limit=50),
+    "unread_count": lambda db, f: db.unread_count(f.username()),
+    "list_all_messages_page": lambda db, f: db.list_all_messages_page(None, 100),
+    "list_timetable": lambda db, f: db.list_timetable(f.batch()),
+    "next_classes_for": lambda db, f: db.next_classes_for(f.batch()),
+    "get_fees": lambda db, f: db.get_fees(f.student()),
+    "list_payments": lambda db, f: db.list_payments(f.student()),
+    "collections_by_month": lambda db, f: db.collections_by_month(),
+    "get_marks": lambda db, f: db.get_marks(f.student()),
+    "test_ranks": lambda db, f: db.test_ranks(*f.test()),
+    "student_ranks": lambda db, f: db.student_ranks(f.student()),
+}
+
+
+def _count(result) -> int:
+    if result is None:
+        return 0
+    if hasattr(result, "size"):  # numpy arrays
+        return int(result.shape[0]) if result.ndim else 1
+    if isinstance(result, (list, tuple, dict)):
+        return len(result)
+    return 1
+
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    # nearest-rank percentile
+    k = max(math.ceil(p * len(sorted_values)) - 1, 0)
+    return sorted_values[k]
+
+
+def time_case(db: Database, fixture: Fixture, fn, repeat: int, warmup: int = 2) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn(db, fixture)
+    samples, rows = [], 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(db, fixture)
+        samples.append(time.perf_counter() - t0)
+        rows += _count(result)
+    samples.sort()
+    total = sum(samples)
+    return {
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 3),
+        "mean_ms": round(total / repeat * 1000, 3),
+        "rows_per_s": round(rows / total) if total else 0,
+        "runs": repeat,
+    }
+
+
+def scratch_db(data_dir: str, scale: float, seed: int) -> str:
+    path = os.path.join(data_dir, f"bench-s{scale:g}-seed{seed}.db")
+    if not os.path.exists(path):
+        print(f"Generating scale {scale:g} into {path}")
+        tmp = path + ".part"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        generate(tmp, scale, seed)
+        os.replace(tmp, path)
+    return path
+
+
+def run(scales: List[float], repeat: int = 30, seed: int = 42, only: Optional[List[str]] = None,
+        data_dir: Optional[str] = None, trace: bool = False) -> Dict:
+    data_dir = data_dir or os.path.join(tempfile.gettempdir(), "arora-bench")
+    os.makedirs(data_dir, exist_ok=True)
+    cases = {k: v for k, v in CASES.items() if not only or k in only}
+    results: Dict[str, Dict] = {}
+    for scale in scales:
+        db = Database(scratch_db(data_dir, scale, seed))
+        db.init_db()
+        fixture = Fixture(db, seed)
+        if trace:
+            # measures tracing overhead; nothing is slow enough to be explained
+            db.enable_tracing(slow_ms=float("inf"), log_path=os.path.join(data_dir, "trace.log"))
+        print(f"\nscale {scale:g} ({len(fixture.student_ids):,} students)")
+        print(f"  {'case':<32}{'p50 ms':>10}{'p95 ms':>10}{'rows/s':>14}")
+        results[f"{scale:g}"] = per_scale = {}
+        for name, fn in cases.items():
+            per_scale[name] = r = time_case(db, fixture, fn, repeat)
+            print(f"  {name:<32}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['rows_per_s']:>14,}")
+        db.close_all()
+    return {"meta": {**_meta(seed, repeat), "trace": trace}, "results": results}
+
+
+def _meta(seed: int, repeat: int) -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "seed": seed,
+        "repeat": repeat,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = REGRESSION) -> int:
+    """Print p50 changes against *baseline*; returns the number of regressions."""
+    print(f"\nvs baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('created')})")
+    regressions = 0
+    for scale, cases in current["results"].items():
+        base = baseline["results"].get(scale, {})
+        for name, r in cases.items():
+            if name not in base:
+                continue
+            before, after = base[name]["p50_ms"], r["p50_ms"]
+            change = (after - before) / before if before else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  << slower"
+                regressions += 1
+            elif change < -threshold:
+                flag = "  faster"
+            print(f"  {scale:>5} {name:<32}{before:>10.3f} -> {after:<10.3f}{change:+8.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--scales", default="0.01,0.1,1", help="comma-separated data scales (1 = 10k students)")
+    ap.add_argument("--repeat", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--only", help="comma-separated case names")
+    ap.add_argument("--data-dir", help="where generated databases are kept (default: system temp dir)")
+    ap.add_argument("--trace", action="store_true", help="run with Database tracing on (to measure its overhead)")
+    ap.add_argument("--save", help="write results as a JSON baseline")
+    ap.add_argument("--compare", help="baseline JSON to compare against; exits 1 on regressions")
+    args = ap.parse_args()
+
+    only = args.only.split(",") if args.only else None
+    unknown = set(only or ()) - set(CASES)
+    if unknown:
+        ap.error(f"unknown case(s): {', '.join(sorted(unknown))}")
+    report = run([float(s) for s in args.scales.split(",")], args.repeat, args.seed, only, args.data_dir, args.trace)
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved {args.save}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            slower = compare(report, json.load(f))
+        raise SystemExit(1 if slower else 0)
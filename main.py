@@ -1,16 +1,17 @@
+import importlib
 import os
 import threading
 import tkinter as tk
 import customtkinter as ctk
 from tkinter import ttk, messagebox
-from ttkthemes import ThemedStyle
 
 from app.database import Database
 from app.ui.splash import SplashScreen
+from app.ui.tasks import BackgroundTasks
+from app.ui.monitor import UiMonitor, MonitorOverlay
 from app.ui.login import LoginFrame
-from app.ui.admin_dashboard import AdminApp
-from app.ui.student_dashboard import StudentApp
-from app.config import COLORS, APP_INFO
+# the dashboards are imported by the splash warm-up (or on login), not here
+from app.config import COLORS, APP_INFO, TRACE_SETTINGS, UI_MONITOR_SETTINGS
 
 
 class AppController:
@@ -29,12 +30,20 @@ class AppController:
         self.root.resizable(True, True)
 
 
-        self.style = ThemedStyle(self.root)
-        self._apply_ttk_theme("dark")
+        # ttkthemes is imported during the splash and applied just before login
+        self.style = None
 
 
-        self.db = Database()
-        self.db.init_db()
+        # the schema check and cache priming run during the splash (see _warmup_steps)
+        self.db = Database(settings={"query_cache_size": 512})
+        # event-loop lag probe; F12 shows its overlay
+        self.monitor = UiMonitor(self.root)
+        if UI_MONITOR_SETTINGS["enabled"]:
+            self.monitor.start()
+        self.overlay = None
+        self.root.bind("<F12>", lambda e: self.toggle_overlay())
+        # worker pool for view queries; results come back via root.after
+        self.tasks = BackgroundTasks(self.root, monitor=self.monitor)
 
 
         self.status_bar = ctk.CTkLabel(self.root, text="", text_color=COLORS["gold"], anchor="e")
@@ -42,10 +51,22 @@ class AppController:
         self._tick_clock()
 
         self.current_frame = None
+        if UI_MONITOR_SETTINGS["overlay"]:
+            self.toggle_overlay()
         self.show_splash()
 
+    @staticmethod
+    def _import_ttk_themes():
+        try:
+            importlib.import_module("ttkthemes")
+        except ImportError:
+            pass  # optional: ttk widgets keep the default theme
+
     def _apply_ttk_theme(self, mode: str):
         try:
+            if self.style is None:
+                from ttkthemes import ThemedStyle
+                self.style = ThemedStyle(self.root)
             if mode == "light":
                 self.style.set_theme("arc")
             else:
@@ -59,19 +80,54 @@ class AppController:
         self.status_bar.configure(text=f"{APP_INFO['title']}  •  {now}")
         self.root.after(1000, self._tick_clock)
 
+    def toggle_overlay(self):
+        if self.overlay is None:
+            self.overlay = MonitorOverlay(self.root, self.monitor)
+        self.monitor.start()
+        self.overlay.toggle()
+
+    def _warmup_steps(self):
+        """(label, work) pairs run off the Tk thread while the splash is shown."""
+        steps = [("Checking database", self.db.init_db)]
+        if TRACE_SETTINGS["enabled"]:
+            steps.append(("Starting query tracing", self.db.enable_tracing))
+        steps += [
+            ("Loading screens", lambda: [importlib.import_module(m) for m in
+                                         ("app.ui.admin_dashboard", "app.ui.student_dashboard")]),
+            ("Loading themes", self._import_ttk_themes),
+            # first Dashboard load: warms SQLite's page cache and the query cache
+            ("Preparing dashboard", lambda: (self.db.dashboard_summary(), self.db.inbox("all", limit=10),
+                                            self.db.list_batches())),
+        ]
+        return steps
+
     def show_splash(self):
         splash = SplashScreen(self.root, title=APP_INFO["title"])
-        def load():
+        steps = self._warmup_steps()
 
-            for _ in range(80):
-                self.root.after(0, splash.step)
-                import time; time.sleep(0.02)
+        def load():
+            for i, (label, work) in enumerate(steps):
+                self.root.after(0, lambda f=i / len(steps), t=label: splash.set_progress(f, t))
+                try:
+                    work()
+                except Exception as e:
+                    self.root.after(0, lambda e=e, t=label: self._startup_failed(t, e))
+                    return
+            self.root.after(0, lambda: splash.set_progress(1.0, "Ready"))
+            # ThemedStyle needs the Tk thread; its module is already imported by now
+            self.root.after(0, lambda: self._apply_ttk_theme("dark"))
             self.root.after(0, splash.destroy)
             self.root.after(50, self.show_login)
         threading.Thread(target=load, daemon=True).start()
 
+    def _startup_failed(self, step: str, exc: Exception):
+        messagebox.showerror("Startup failed", f"{step} failed:\n{exc}")
+        self.root.destroy()
+
     def clear_frame(self):
         if self.current_frame is not None:
+            if hasattr(self.current_frame, "cancel_loading"):
+                self.current_frame.cancel_loading()
             self.current_frame.destroy()
             self.current_frame = None
 
@@ -82,18 +138,30 @@ class AppController:
 
     def _on_login(self, user_type: str, user_record: dict):
         self.clear_frame()
-        if user_type == "admin":
-            self.current_frame = AdminApp(self.root, self.db, on_logout=self.show_login, on_theme_change=self._on_theme_change)
-        else:
-            self.current_frame = StudentApp(self.root, self.db, user_record, on_logout=self.show_login)
-        self.current_frame.pack(fill="both", expand=True)
+        from app.ui.admin_dashboard import AdminApp
+        from app.ui.student_dashboard import StudentApp
+        with self.monitor.timed("build", "AdminApp" if user_type == "admin" else "StudentApp"):
+            if user_type == "admin":
+                self.current_frame = AdminApp(self.root, self.db, on_logout=self.show_login,
+                                              on_theme_change=self._on_theme_change, tasks=self.tasks,
+                                              monitor=self.monitor)
+            else:
+                self.current_frame = StudentApp(self.root, self.db, user_record, on_logout=self.show_login, tasks=self.tasks)
+            self.current_frame.pack(fill="both", expand=True)
+        if self.overlay is not None and self.overlay.winfo_ismapped():
+            self.overlay.lift()
 
     def _on_theme_change(self, mode: str):
 
         self._apply_ttk_theme(mode)
 
     def run(self):
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            self.monitor.stop()
+            self.tasks.shutdown()
+            self.db.close_all()
 
 
 if __name__ == "__main__":
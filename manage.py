@@ -0,0 +1,102 @@
+"""Maintenance commands for the tuition database.
+
+Usage:
+    python manage.py migrate
+    python manage.py rebuild-attendance-summary
+    python manage.py rebuild-fees
+    python manage.py backup [--keep N]
+    python manage.py list-backups
+    python manage.py verify PATH
+    python manage.py restore PATH
+"""
+import argparse
+import sys
+
+from app import backup
+from app.config import BACKUP_SETTINGS
+from app.database import Database, DB_PATH
+
+
+def cmd_migrate(db: Database, _args):
+    applied = db.init_db()
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+
+def cmd_rebuild_attendance_summary(db: Database, _args):
+    db.init_db()
+    db.rebuild_attendance_summary()
+    total, present = db.attendance_summary()
+    print(f"AttendanceSummary rebuilt: {total} records, {present} present ({db.attendance_percentage()}%)")
+
+
+def cmd_rebuild_fees(db: Database, _args):
+    db.init_db()
+    db.rebuild_fees()
+    print(f"Fees rebuilt from the Payments ledger: {db.get_fees():.2f} collected")
+
+
+def _print_progress(copied: int, total: int):
+    print(f"\r  {copied}/{total} pages", end="", flush=True)
+
+
+def cmd_backup(db: Database, args):
+    snap = backup.create(db, args.dir, keep=args.keep, progress=_print_progress)
+    print(f"\nSnapshot written and verified: {snap.path} ({snap.size / 1024:.0f} KiB)")
+
+
+def cmd_list_backups(_db: Database, args):
+    snaps = backup.list_snapshots(args.dir)
+    if not snaps:
+        print(f"No snapshots in {args.dir}")
+    for snap in snaps:
+        print(f"{snap.created:%Y-%m-%d %H:%M:%S}  {snap.size / 1024:>8.0f} KiB  {snap.path}")
+
+
+def cmd_verify(_db: Database, args):
+    problems = backup.verify(args.path)
+    if problems:
+        print("\n".join(problems))
+        sys.exit(1)
+    print(f"{args.path}: ok")
+
+
+def cmd_restore(db: Database, args):
+    safety = backup.restore(db, args.path, args.dir, progress=_print_progress)
+    print(f"\nRestored {args.path} into {db.path}; previous data saved as {safety.path}")
+
+
+# name -> (function, help, extra arguments as (flags, add_argument kwargs))
+_DIR_ARG = (("--dir",), {"default": BACKUP_SETTINGS["dir"], "help": "snapshot directory"})
+_PATH_ARG = (("path",), {"help": "snapshot database file"})
+
+COMMANDS = {
+    "migrate": (cmd_migrate, "apply pending schema migrations", ()),
+    "rebuild-attendance-summary": (cmd_rebuild_attendance_summary, "recompute AttendanceSummary from Attendance", ()),
+    "rebuild-fees": (cmd_rebuild_fees, "recompute Fees balances and PaymentTotals from Payments", ()),
+    "backup": (cmd_backup, "write a verified online snapshot and rotate old ones", (
+        _DIR_ARG, (("--keep",), {"type": int, "default": BACKUP_SETTINGS["keep"], "help": "snapshots to keep"}),
+    )),
+    "list-backups": (cmd_list_backups, "list snapshots, newest first", (_DIR_ARG,)),
+    "verify": (cmd_verify, "integrity-check a snapshot", (_PATH_ARG,)),
+    "restore": (cmd_restore, "verify a snapshot and restore it (current data is snapshotted first)", (_PATH_ARG, _DIR_ARG)),
+}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Arora Teacher database maintenance")
+    ap.add_argument("--db", default=DB_PATH, help=f"database path (default: {DB_PATH})")
+    sub = ap.add_subparsers(dest="command", required=True)
+    for name, (_fn, help_text, arguments) in COMMANDS.items():
+        cmd = sub.add_parser(name, help=help_text)
+        for flags, kwargs in arguments:
+            cmd.add_argument(*flags, **kwargs)
+    args = ap.parse_args(argv)
+    db = Database(args.db)
+    try:
+        COMMANDS[args.command][0](db, args)
+    finally:
+        db.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""Cold-start guard: ``import main`` must not pull in the deferred heavy modules.
+
+Wall-clock timing depends on the machine, so the budget is only asserted when
+``IMPORT_BUDGET_TIMING=1`` is set; ``python -m benchmarks.import_budget``
+reports it either way.
+"""
+import os
+import unittest
+
+from benchmarks import import_budget
+
+
+class ImportBudgetTest(unittest.TestCase):
+    def test_import_main_defers_heavy_modules(self):
+        eager = import_budget.deferred_imported(import_budget.loaded_modules("main"))
+        self.assertEqual(eager, [], "imported at startup but should be deferred")
+
+    @unittest.skipUnless(os.environ.get("IMPORT_BUDGET_TIMING") == "1", "set IMPORT_BUDGET_TIMING=1 to check timing")
+    def test_import_main_within_budget(self):
+        problems = import_budget.check(import_budget.BUDGET_MS, runs=3, top=0)
+        self.assertEqual(problems, [], "\n".join(problems))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""``EXPLAIN QUERY PLAN`` checks for the listing and search queries.
+
+Each case calls a real ``Database`` method on a small generated database,
+captures the statements it runs with a trace callback and asserts that their
+plans use the expected index and never scan a table row by row.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.database import Database
+from benchmarks.generate import generate
+
+# method name -> (call, index its plan must use)
+CASES = {
+    "list_students": (lambda db: db.list_students(limit=50), "idx_students_name"),
+    "list_students_page": (lambda db: db.list_students_page(("M", 5), 50), "idx_students_name"),
+    "search_students": (lambda db: db.search_students("riya"), "StudentsFTS"),
+    "search_students_by_id_prefix": (lambda db: db.search_students_by_id_prefix("1"), "INTEGER PRIMARY KEY"),
+    "attendance_roster": (lambda db: db.attendance_roster("B001", "2024-06-03"), "idx_students_batch"),
+    "get_attendance": (lambda db: db.get_attendance(3), "sqlite_autoindex_Attendance_1"),
+    "list_messages_for": (lambda db: db.list_messages_for("s3"), "idx_messages_recipient"),
+    "inbox": (lambda db: db.inbox("s3", limit=10), "idx_messages_recipient_id"),
+    "list_timetable": (lambda db: db.list_timetable("B001"), "idx_timetable_week"),
+    "next_classes_for": (lambda db: db.next_classes_for("B001"), "idx_timetable_week"),
+    "list_homework_for": (lambda db: db.list_homework_for("B001"), "idx_homework_batch"),
+    "get_marks": (lambda db: db.get_marks(3), "idx_performance_student_subject"),
+}
+
+
+def _is_table_scan(detail: str) -> bool:
+    # "SCAN t USING [COVERING] INDEX ..." walks an index in order; FTS5 reads
+    # its virtual table and shadow tables by design
+    return detail.startswith("SCAN ") and " USING " not in detail and "StudentsFTS" not in detail
+
+
+class QueryPlanTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        path = os.path.join(cls.dir, "plans.db")
+        generate(path, scale=0.01, seed=1, log=lambda *_a: None)
+        cls.db = Database(path)
+        cls.db.init_db()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close_all()
+        shutil.rmtree(cls.dir, ignore_errors=True)
+
+    def plans(self, call):
+        """(statement, plan lines) for every query *call* runs."""
+        con = self.db.connect()
+        statements = []
+        con.set_trace_callback(statements.append)
+        try:
+            call(self.db)
+        finally:
+            con.set_trace_callback(None)
+        return [(sql, self.db.query_plan(sql)) for sql in statements
+                if sql.lstrip().upper().startswith(("SELECT", "WITH"))]
+
+    def test_listing_and_search_queries_use_indexes(self):
+        for name, (call, index) in CASES.items():
+            with self.subTest(name):
+                plans = self.plans(call)
+                self.assertTrue(plans, "no query ran")
+                for sql, plan in plans:
+                    scans = [line for line in plan if _is_table_scan(line)]
+                    self.assertEqual(scans, [], f"{sql}\n" + "\n".join(plan))
+                self.assertTrue(any(index in line for _sql, plan in plans for line in plan),
+                                f"{index} not used:\n" + "\n".join(l for _s, p in plans for l in p))
+
+
+if __name__ == "__main__":
+    unittest.main()